@@ -0,0 +1,102 @@
+"""Compares parsing of a synthetic RM application list: full materialization vs. streamed field projection.
+
+Usage: python benchmarks/bench_app_list_parsing.py [--apps 10000] [--repeat 5]
+"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import argparse
+import gzip
+import json
+import time
+import tracemalloc
+
+from yarn_kernel_provider.applist import iter_applications, stream_chunk_size
+
+
+def synthetic_app(i):
+    """Returns an application resembling those listed by a Hadoop 3 RM."""
+    app_id = 'application_1575000000000_{:05d}'.format(i)
+    return {
+        'id': app_id, 'user': 'user{}'.format(i % 50), 'name': 'kernel-{:08x}-0000-0000-0000-000000000000'.format(i),
+        'queue': 'root.default', 'state': 'FINISHED' if i % 10 else 'RUNNING', 'finalStatus': 'SUCCEEDED',
+        'progress': 100.0, 'trackingUI': 'History',
+        'trackingUrl': 'http://rm.example.com:8088/proxy/{}/'.format(app_id),
+        'diagnostics': 'Application {} finished.  Attempt recovered after AM container exited with code 0 on host '
+                       'node{}.example.com.  Shutdown hook invoked.'.format(app_id, i % 200),
+        'clusterId': 1575000000000, 'applicationType': 'SPARK', 'applicationTags': 'jupyter,kernel',
+        'priority': 0, 'startedTime': 1575000000000 + i, 'launchTime': 1575000000500 + i,
+        'finishedTime': 1575000100000 + i, 'elapsedTime': 100000, 'amContainerLogs':
+            'http://node{0}.example.com:8042/node/containerlogs/container_{1}_01_000001/user'.format(i % 200, app_id),
+        'amHostHttpAddress': 'node{}.example.com:8042'.format(i % 200), 'amRPCAddress': 'node{}:40000'.format(i % 200),
+        'masterNodeId': 'node{}.example.com:45454'.format(i % 200), 'allocatedMB': 2048, 'allocatedVCores': 2,
+        'reservedMB': 0, 'reservedVCores': 0, 'runningContainers': 2, 'memorySeconds': 204800, 'vcoreSeconds': 200,
+        'queueUsagePercentage': 0.5, 'clusterUsagePercentage': 0.1, 'preemptedResourceMB': 0,
+        'preemptedResourceVCores': 0, 'numNonAMContainerPreempted': 0, 'numAMContainerPreempted': 0,
+        'preemptedMemorySeconds': 0, 'preemptedVcoreSeconds': 0, 'logAggregationStatus': 'SUCCEEDED',
+        'unmanagedApplication': False, 'amNodeLabelExpression': '',
+        'resourceRequests': [{'capability': {'memory': 1024, 'vCores': 1}, 'nodeLabelExpression': '',
+                              'numContainers': 1, 'priority': {'priority': 0}, 'relaxLocality': True,
+                              'resourceName': '*'}],
+        'timeouts': {'timeout': [{'type': 'LIFETIME', 'expiryTime': 'UNLIMITED', 'remainingTimeInSeconds': -1}]},
+    }
+
+
+def find_full(body, kernel_id):
+    """The prior approach: materialize the whole response (as requests' json() does), then scan it."""
+    data = json.loads(body.decode('utf-8'))
+    target = None
+    for app in data['apps']['app']:
+        if app.get('name', '').find(kernel_id) >= 0 and (target is None or app['id'] > target['id']):
+            target = app
+    return target
+
+
+def find_streamed(body, kernel_id):
+    """The streamed approach: project id, name and state from chunks as they'd arrive."""
+    chunks = (body[i:i + stream_chunk_size] for i in range(0, len(body), stream_chunk_size))
+    target = None
+    for app in iter_applications(chunks):
+        if app['name'].find(kernel_id) >= 0 and (target is None or app['id'] > target['id']):
+            target = app
+    return target
+
+
+def measure(func, body, kernel_id, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(body, kernel_id)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(body, kernel_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--apps', type=int, default=10000, help='Number of applications in the response.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions (best is reported).')
+    args = parser.parse_args()
+
+    body = json.dumps({'apps': {'app': [synthetic_app(i) for i in range(args.apps)]}}).encode('utf-8')
+    kernel_id = 'kernel-{:08x}'.format(args.apps - 1)
+    assert find_full(body, kernel_id)['id'] == find_streamed(body, kernel_id)['id']
+
+    print("Applications: {}, response: {:.1f} MB, gzipped: {:.1f} MB".
+          format(args.apps, len(body) / 2 ** 20, len(gzip.compress(body)) / 2 ** 20))
+    results = {}
+    for name, func in (('full', find_full), ('streamed', find_streamed)):
+        results[name] = measure(func, body, kernel_id, args.repeat)
+        print("{:>9}: {:8.1f} ms  peak memory {:8.1f} MB".
+              format(name, results[name][0] * 1000, results[name][1] / 2 ** 20))
+    print("  savings: {:.1f}x CPU, {:.1f}x memory".format(results['full'][0] / results['streamed'][0],
+                                                          results['full'][1] / results['streamed'][1]))
+
+
+if __name__ == '__main__':
+    main()
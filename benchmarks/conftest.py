@@ -0,0 +1,78 @@
+"""Fixtures shared by the lifecycle manager benchmarks, which run against a stubbed resource manager."""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import json
+import mock
+import pytest
+
+from yarn_kernel_provider import clusters, yarn
+from yarn_kernel_provider.applist import stream_chunk_size
+from yarn_kernel_provider.circuitbreaker import CircuitBreaker
+from yarn_kernel_provider.tests.stubs import MockKernelManager, MockResourceManager, MockResponse
+
+from bench_app_list_parsing import synthetic_app
+
+
+class CachedStreamedResponse(object):
+    def __init__(self, body):
+        self.status_code = 200
+        self.body = body
+
+    def iter_content(self, chunk_size=stream_chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class StubResourceManager(MockResourceManager):
+    """Serves a pre-serialized application list and applications whose kill takes `kill_transitions` queries."""
+
+    def __init__(self, service_endpoints=None, auth=None):
+        super(StubResourceManager, self).__init__(service_endpoints, auth)
+        self.body = None
+        self.kill_transitions = 0
+        self.pending_queries = {}
+        self.app_queries = 0
+
+    def load_apps(self, count, kernel_id):
+        """Lists `count` synthetic applications, the last of which is the kernel's."""
+        apps = [synthetic_app(i) for i in range(count - 1)]
+        apps.append(self.add_app('application_1575000000000_{:05d}'.format(count), kernel_id, state='RUNNING'))
+        self.body = json.dumps({'apps': {'app': apps}}).encode('utf-8')
+
+    def get(self, url, params=None, **kwargs):
+        return CachedStreamedResponse(self.body)
+
+    def _request(self, name, application_id=None):
+        pass  # calls are not recorded, which would otherwise grow unbounded across rounds
+
+    def cluster_application(self, application_id):
+        self.app_queries += 1
+        return super(StubResourceManager, self).cluster_application(application_id)
+
+    def cluster_application_state(self, application_id):
+        pending = self.pending_queries.get(application_id, 0)
+        if pending:
+            self.pending_queries[application_id] = pending - 1
+            return MockResponse({'state': 'RUNNING'})
+        return MockResponse({'state': self.apps[application_id]['state']})
+
+    def cluster_application_kill(self, application_id):
+        self.pending_queries[application_id] = self.kill_transitions
+        return super(StubResourceManager, self).cluster_application_kill(application_id)
+
+
+@pytest.fixture()
+def lifecycle_manager():
+    with mock.patch.object(clusters, 'ResourceManager', StubResourceManager):
+        manager = yarn.YarnKernelLifecycleManager(MockKernelManager(), {})
+    manager.rm_breaker = CircuitBreaker(manager.rm_addr)
+    manager.start_time = yarn.RemoteKernelLifecycleManager.get_current_time()
+    manager._decrypt = lambda data: data
+    yield manager
+    if manager.response_socket:
+        manager.response_socket.close()
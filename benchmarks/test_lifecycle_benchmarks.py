@@ -0,0 +1,114 @@
+"""Benchmarks of the lifecycle manager's and installer's hot paths.
+
+Run via `make benchmark` to record a baseline and `make benchmark-compare` to compare against it.
+"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+import mock
+import os
+import pytest
+import shutil
+
+from tempfile import mkdtemp
+
+from yarn_kernel_provider import yarn
+from yarn_kernel_provider.kernelspecapp import KERNEL_JSON, YKP_SpecInstaller
+from yarn_kernel_provider.tests.stubs import send_connection_info
+
+# Number of state queries the monitor performs before the connection info arrives during startup.
+startup_iterations = 20
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_poll(benchmark, lifecycle_manager):
+    lifecycle_manager.resource_mgr.add_app('application_1_0001', lifecycle_manager.kernel_id, state='RUNNING')
+    lifecycle_manager.application_id = 'application_1_0001'
+    assert benchmark(lifecycle_manager.poll) is None
+
+
+def test_send_signal_zero(benchmark, lifecycle_manager):
+    lifecycle_manager.resource_mgr.add_app('application_1_0001', lifecycle_manager.kernel_id, state='RUNNING')
+    lifecycle_manager.application_id = 'application_1_0001'
+    assert benchmark(lifecycle_manager.send_signal, 0) is None
+
+
+@pytest.mark.parametrize('app_count', [100, 1000, 10000])
+def test_query_app_by_name(benchmark, lifecycle_manager, app_count):
+    lifecycle_manager.resource_mgr.load_apps(app_count, lifecycle_manager.kernel_id)
+    app = benchmark(lifecycle_manager._query_app_by_name, lifecycle_manager.kernel_id)
+    assert app['name'] == lifecycle_manager.kernel_id
+
+
+def test_confirm_remote_startup(benchmark, lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0001', lifecycle_manager.kernel_id, state='ACCEPTED', host='localhost')
+
+    def setup():
+        lifecycle_manager._prepare_response_socket()
+        lifecycle_manager.application_id = 'application_1_0001'
+        lifecycle_manager.assigned_host = ''
+        lifecycle_manager.assigned_ip = None
+        lifecycle_manager.connection_info = None
+        rm.app_queries = 0
+
+    async def launcher():
+        while rm.app_queries < startup_iterations:
+            await asyncio.sleep(0)
+        await send_connection_info(lifecycle_manager.kernel_manager.response_address)
+
+    async def startup():
+        asyncio.ensure_future(launcher())
+        await lifecycle_manager.confirm_remote_startup()
+
+    with mock.patch.object(yarn, 'poll_interval', 0):
+        benchmark.pedantic(lambda: run(startup()), setup=setup, rounds=50)
+    assert lifecycle_manager.connection_info is not None
+
+
+def test_kill_with_slow_transition(benchmark, lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.kill_transitions = 5
+
+    def setup():
+        rm.add_app('application_1_0001', lifecycle_manager.kernel_id, state='RUNNING')
+        lifecycle_manager.application_id = 'application_1_0001'
+
+    with mock.patch.object(yarn, 'shutdown_poll_min', 0):
+        result = benchmark.pedantic(lambda: run(lifecycle_manager.kill()), setup=setup, rounds=100)
+    assert result is None
+
+
+def test_build_submit_cmd(benchmark, lifecycle_manager):
+    lifecycle_manager.launch_description = {'argv': [
+        '/opt/spark/bin/spark-submit', {'env': 'SPARK_OPTS'}, {'impersonation': '--proxy-user'},
+        '/opt/kernels/scripts/launch_ipykernel.py', {'env': 'LAUNCH_OPTS'}]}
+    kernel_cmd = ['/opt/kernels/bin/run.sh', '--RemoteProcessProxy.kernel-id', lifecycle_manager.kernel_id,
+                  '--RemoteProcessProxy.response-address', '10.0.0.1:8877']
+    env = {'KERNEL_ID': lifecycle_manager.kernel_id, 'KERNEL_USERNAME': 'alice', 'EG_IMPERSONATION_ENABLED': 'True',
+           'KERNEL_EXTRA_SPARK_OPTS': '--queue etl', 'PATH': '/usr/bin:/bin', 'LAUNCH_OPTS': '',
+           'SPARK_OPTS': '--master yarn --deploy-mode cluster --name ${KERNEL_ID:-ERROR__NO__KERNEL_ID} '
+                         '--conf spark.yarn.submit.waitAppCompletion=false '
+                         '--conf spark.yarn.appMasterEnv.PATH=/opt/conda/bin:$PATH ${KERNEL_EXTRA_SPARK_OPTS}'}
+    argv = benchmark(lifecycle_manager._get_submit_cmd, kernel_cmd, env)
+    assert argv[0] == '/opt/spark/bin/spark-submit' and argv[-1] == '10.0.0.1:8877'
+
+
+def test_finalize_kernel_json(benchmark):
+    installer = YKP_SpecInstaller()
+    installer.template_dir = 'yarnkp_spark_python'
+    source = os.path.join(os.path.dirname(yarn.__file__), 'kernelspecs', installer.template_dir, KERNEL_JSON)
+    install_dir = mkdtemp(prefix='kernelspec_')
+
+    def setup():
+        shutil.copy(source, install_dir)
+
+    try:
+        benchmark.pedantic(installer._finalize_kernel_json, args=(install_dir,), setup=setup, rounds=100)
+    finally:
+        shutil.rmtree(install_dir)
@@ -66,6 +66,7 @@ setup_args = dict(
         'entrypoints',
         'requests',
         'yarn-api-client>=1.0',
+        'pyzmq>=17',
     ],
     extras_require = {
         "kerberos": ['requests_kerberos'],
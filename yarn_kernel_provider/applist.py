@@ -0,0 +1,95 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Streaming, field-projected parsing of the application lists returned by YARN resource managers."""
+
+import codecs
+import json
+import re
+
+from yarn_api_client.errors import APIError
+
+# Fields retained for each application unless the caller requests others
+default_app_fields = ('id', 'name', 'state')
+stream_chunk_size = 64 * 1024
+
+_app_array_pattern = re.compile(r'"app"\s*:\s*\[')
+_empty_apps_pattern = re.compile(r'"apps"\s*:\s*null')
+_separator_pattern = re.compile(r'[\s,]*')
+_decoder = json.JSONDecoder()
+
+
+def iter_applications(chunks, fields=default_app_fields):
+    """Yields a compact dict of `fields` for each application in an RM application list response.
+
+    `chunks` is an iterable of the response body's bytes (or str) chunks, as produced by a streamed response's
+    `iter_content()`.  Only the application currently being parsed is materialized, so memory consumption
+    is bounded by the size of a single application rather than that of the whole response.
+    """
+    utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    in_array = False
+    exhausted = False
+
+    while True:
+        if not in_array:
+            match = _app_array_pattern.search(buffer)
+            if match:
+                in_array = True
+                pos = match.end()
+            elif _empty_apps_pattern.search(buffer):
+                return
+        else:
+            pos = _separator_pattern.match(buffer, pos).end()
+            if pos < len(buffer):
+                if buffer[pos] == ']':
+                    return
+                try:
+                    app, end = _decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if exhausted:
+                        raise
+                    end = None  # the application is incomplete, read more
+                if end is not None:
+                    pos = end
+                    yield {field: app.get(field) for field in fields}
+                    continue
+
+        if exhausted:
+            if in_array:
+                raise ValueError("Application list response ended unexpectedly.")
+            return
+
+        # Discard what's been consumed and append the next chunk
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            chunk = utf8_decoder.decode(b'', final=True)
+        elif isinstance(chunk, bytes):
+            chunk = utf8_decoder.decode(chunk)
+        if in_array:
+            buffer = buffer[pos:] + chunk
+            pos = 0
+        else:  # retain a tail in case the array's key straddles the chunk boundary
+            buffer = buffer[-32:] + chunk
+
+
+def stream_applications(resource_mgr, fields=default_app_fields, **params):
+    """Issues an RM applications query, yielding each application's `fields` as the response is received.
+
+    Compressed transfer is requested, which the response's decoding will handle transparently for RMs that
+    support it.  Other query parameters are those of the RM's `/ws/v1/cluster/apps` resource.
+    """
+    url = resource_mgr.service_uri.to_url('/ws/v1/cluster/apps')
+    headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'}
+    response = resource_mgr.session.get(url, params=params, headers=headers, stream=True,
+                                        timeout=resource_mgr.timeout)
+    try:
+        if response.status_code not in (200, 202):
+            raise APIError("Response finished with status: {status}. Details: {msg}".
+                           format(status=response.status_code, msg=response.text))
+        for app in iter_applications(response.iter_content(chunk_size=stream_chunk_size), fields):
+            yield app
+    finally:
+        response.close()
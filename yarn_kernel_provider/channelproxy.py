@@ -0,0 +1,199 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""A relay of a kernel's channels, through which its clients remain connected while the kernel is suspended."""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import uuid
+
+from datetime import datetime
+
+import zmq
+import zmq.asyncio
+
+from traitlets.log import get_logger
+
+DELIMITER = b'<IDS|MSG>'
+
+# The socket types of each channel facing the kernel's clients and facing the kernel, respectively.  Heartbeats
+# are relayed like requests, the kernel echoing them.
+channel_socket_types = {
+    'shell': (zmq.ROUTER, zmq.DEALER),
+    'control': (zmq.ROUTER, zmq.DEALER),
+    'stdin': (zmq.ROUTER, zmq.DEALER),
+    'hb': (zmq.ROUTER, zmq.DEALER),
+    'iopub': (zmq.PUB, zmq.SUB),
+}
+
+# Requests answered by the relay itself while disconnected, since they don't warrant resuming the kernel.
+local_replies = {
+    'shutdown_request': lambda content: {'status': 'ok', 'restart': content.get('restart', False)},
+    'interrupt_request': lambda content: {'status': 'ok'},
+}
+
+
+class KernelChannelProxy(object):
+    """Relays the channels of a kernel through local sockets, the ports of which are those given to its clients.
+
+    The kernel to which the channels are relayed is set by `connect()`.  Once `disconnect()`ed, the clients'
+    requests are held - `on_request` being called for each - until a kernel is next connected, heartbeats then
+    being answered by the relay.  The messages of a kernel connected with a key other than that of the first are
+    re-signed with the clients' key, and vice versa.  The time of the last message other than a heartbeat, along
+    with whether the kernel last reported itself as busy, is tracked so that idle kernels can be suspended.
+    """
+
+    def __init__(self, ip, on_request, log=None):
+        self.ip = ip
+        self.on_request = on_request
+        self.log = log or get_logger()
+        self.context = zmq.asyncio.Context.instance()
+        self.identity = uuid.uuid4().hex.encode('ascii')
+        self.key = None
+        self.kernel_key = None
+        self.digest_mod = hashlib.sha256
+        self.busy = False
+        self.last_activity = time.monotonic()
+        self.pending = []
+        self.frontends = {}
+        self.ports = {}
+        self.backends = {}
+        self.relays = []
+        for channel, (socket_type, _) in channel_socket_types.items():
+            socket = self.context.socket(socket_type)
+            socket.linger = 0
+            self.ports[channel] = socket.bind_to_random_port('tcp://{}'.format(ip))
+            self.frontends[channel] = socket
+        self.listeners = [asyncio.ensure_future(self._relay_requests(channel))
+                          for channel, (socket_type, _) in channel_socket_types.items() if socket_type == zmq.ROUTER]
+
+    @property
+    def connected(self):
+        return bool(self.backends)
+
+    def idle_time(self):
+        """Returns the seconds since the last message, other than a heartbeat, was relayed."""
+        return time.monotonic() - self.last_activity
+
+    async def connect(self, connection_info):
+        """Relays the channels to the kernel of `connection_info`, forwarding any requests held meanwhile.
+
+        :return: The connection info of the relay, to which clients connect.
+        """
+        await self.disconnect()
+        self.kernel_key = connection_info.get('key', '').encode('utf-8')
+        if self.key is None:
+            self.key = self.kernel_key
+            self.digest_mod = getattr(hashlib, connection_info.get('signature_scheme', 'hmac-sha256').split('-')[-1])
+        for channel, (_, socket_type) in channel_socket_types.items():
+            socket = self.context.socket(socket_type)
+            socket.linger = 0
+            if socket_type == zmq.SUB:
+                socket.subscribe(b'')
+            else:  # the kernel routes its stdin requests to the identity of the shell channel
+                socket.identity = self.identity
+            socket.connect('{}://{}:{}'.format(connection_info.get('transport', 'tcp'), connection_info['ip'],
+                                               connection_info['{}_port'.format(channel)]))
+            self.backends[channel] = socket
+            self.relays.append(asyncio.ensure_future(self._relay_replies(channel, socket)))
+
+        self.busy = False
+        self.last_activity = time.monotonic()
+        pending, self.pending = self.pending, []
+        for channel, frames in pending:
+            await self.backends[channel].send_multipart(self._resign(frames, self.kernel_key))
+
+        relay_info = dict(connection_info)
+        relay_info.update({'{}_port'.format(channel): port for channel, port in self.ports.items()})
+        relay_info.update({'ip': self.ip, 'key': self.key.decode('utf-8')})
+        return relay_info
+
+    async def disconnect(self):
+        """Stops relaying the channels to the kernel, holding the clients' requests until one is next connected."""
+        relays, self.relays = self.relays, []
+        for relay in relays:
+            relay.cancel()
+        if relays:
+            await asyncio.wait(relays)
+        backends, self.backends = self.backends, {}
+        for socket in backends.values():
+            socket.close()
+
+    async def close(self):
+        await self.disconnect()
+        for listener in self.listeners:
+            listener.cancel()
+        await asyncio.wait(self.listeners)
+        for socket in self.frontends.values():
+            socket.close()
+        self.pending = []
+
+    async def _relay_requests(self, channel):
+        frontend = self.frontends[channel]
+        while True:
+            frames = await frontend.recv_multipart()
+            if channel != 'hb':
+                self.last_activity = time.monotonic()
+            if self.backends:
+                await self.backends[channel].send_multipart(self._resign(frames, self.kernel_key))
+            elif channel == 'hb':
+                await frontend.send_multipart(frames)
+            elif not await self._reply_locally(channel, frames):
+                self.pending.append((channel, frames))
+                self.on_request()
+
+    async def _relay_replies(self, channel, backend):
+        frontend = self.frontends[channel]
+        while True:
+            frames = await backend.recv_multipart()
+            if channel == 'iopub':
+                self._observe_status(frames)
+            if channel != 'hb':
+                self.last_activity = time.monotonic()
+            await frontend.send_multipart(self._resign(frames, self.key))
+
+    def _observe_status(self, frames):
+        """Tracks whether the kernel is busy from the status messages it publishes."""
+        try:
+            i = frames.index(DELIMITER)
+            if json.loads(frames[i + 2].decode('utf-8')).get('msg_type') == 'status':
+                self.busy = json.loads(frames[i + 5].decode('utf-8')).get('execution_state') == 'busy'
+        except (ValueError, IndexError):
+            pass
+
+    async def _reply_locally(self, channel, frames):
+        """Replies to the requests not warranting a kernel while disconnected, returning whether it did."""
+        try:
+            i = frames.index(DELIMITER)
+            request_header = json.loads(frames[i + 2].decode('utf-8'))
+            reply_content = local_replies[request_header.get('msg_type')](json.loads(frames[i + 5].decode('utf-8')))
+        except (ValueError, IndexError, KeyError):
+            return False
+
+        header = {'msg_id': uuid.uuid4().hex, 'msg_type': request_header['msg_type'].replace('_request', '_reply'),
+                  'session': self.identity.decode('ascii'), 'username': request_header.get('username', ''),
+                  'date': datetime.utcnow().isoformat() + 'Z', 'version': request_header.get('version', '5.3')}
+        reply = frames[:i + 1] + [b''] + [json.dumps(part).encode('utf-8')
+                                          for part in (header, request_header, {}, reply_content)]
+        await self.frontends[channel].send_multipart(self._sign(reply, self.key))
+        self.log.debug("Replied to {} on behalf of the disconnected kernel.".format(request_header['msg_type']))
+        return True
+
+    def _resign(self, frames, key):
+        """Re-signs a relayed message with `key` when the kernel's key differs from the clients'."""
+        return frames if self.kernel_key == self.key else self._sign(frames, key)
+
+    def _sign(self, frames, key):
+        try:
+            i = frames.index(DELIMITER)
+        except ValueError:
+            return frames
+        signature = b''
+        if key:
+            mac = hmac.new(key, digestmod=self.digest_mod)
+            for frame in frames[i + 2:i + 6]:
+                mac.update(frame)
+            signature = mac.hexdigest().encode('ascii')
+        return frames[:i + 1] + [signature] + frames[i + 2:]
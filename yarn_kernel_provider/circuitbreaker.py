@@ -0,0 +1,101 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Circuit breakers that fail fast while a YARN resource manager is unavailable."""
+
+import os
+import re
+import socket
+import time
+
+from traitlets.log import get_logger
+from yarn_api_client.errors import APIError
+
+# Number of consecutive failed requests that open the circuit, and seconds until a half-open probe is permitted.
+rm_failure_threshold = int(os.getenv('EG_YARN_RM_FAILURE_THRESHOLD', '5'))
+rm_reset_timeout = float(os.getenv('EG_YARN_RM_RESET_TIMEOUT', '30.0'))
+
+# yarn_api_client reports non-2xx responses as APIErrors whose message contains the status code
+server_error_pattern = re.compile(r'status: 5\d\d')
+
+
+class CircuitBreaker(object):
+    """Tracks the health of an endpoint shared by all lifecycle managers within the process.
+
+    While CLOSED, requests flow normally.  Once `failure_threshold` consecutive requests have failed the
+    circuit OPENs and requests are refused until `reset_timeout` seconds have elapsed.  The circuit is
+    then HALF_OPEN, permitting a single probe request whose outcome either closes or re-opens the circuit.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, name, failure_threshold=rm_failure_threshold, reset_timeout=rm_reset_timeout, log=None):
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.log = log or get_logger()
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.opened_time = 0.0
+        self.probe_time = 0.0
+        self.rejected = 0
+
+    @property
+    def is_open(self):
+        """True if requests are currently being refused."""
+        if self.state == CircuitBreaker.OPEN:
+            return time.monotonic() - self.opened_time < self.reset_timeout
+        if self.state == CircuitBreaker.HALF_OPEN:
+            return time.monotonic() - self.probe_time < self.reset_timeout
+        return False
+
+    def allow_request(self):
+        """Returns True if a request may be issued.  Callers must then report its outcome."""
+        if self.state == CircuitBreaker.CLOSED:
+            return True
+
+        # Permit a single probe once the reset timeout has elapsed - or should the prior probe never have reported.
+        if not self.is_open:
+            self.state = CircuitBreaker.HALF_OPEN
+            self.probe_time = time.monotonic()
+            self.log.info("Circuit for '{}' is half-open, probing with a single request...".format(self.name))
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self.state != CircuitBreaker.CLOSED:
+            self.log.info("Circuit for '{}' closed after {} refused requests.".format(self.name, self.rejected))
+        self.state = CircuitBreaker.CLOSED
+        self.failures = 0
+        self.rejected = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == CircuitBreaker.HALF_OPEN or \
+                (self.state == CircuitBreaker.CLOSED and self.failures >= self.failure_threshold):
+            self.log.warning("Circuit for '{}' opened after {} consecutive failures.  Requests will be refused "
+                             "for {} seconds.".format(self.name, self.failures, self.reset_timeout))
+            self.state = CircuitBreaker.OPEN
+            self.opened_time = time.monotonic()
+
+
+_circuit_breakers = {}
+
+
+def record_rm_failure(breaker, e):
+    """Reports a failed request to an RM to its circuit breaker.  Errors reported by the RM itself (other than
+       server errors), such as those for unknown applications, indicate that the RM is available.
+    """
+    if isinstance(e, socket.error) or (isinstance(e, APIError) and server_error_pattern.search(str(e))):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def get_circuit_breaker(name, log=None):
+    """Returns the process-wide circuit breaker associated with `name` (e.g., an RM endpoint)."""
+    if name not in _circuit_breakers:
+        _circuit_breakers[name] = CircuitBreaker(name, log=log)
+    return _circuit_breakers[name]
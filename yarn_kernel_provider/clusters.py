@@ -0,0 +1,187 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Registry of the YARN clusters to which kernels can be routed."""
+
+import asyncio
+import os
+import time
+
+from traitlets.log import get_logger
+from yarn_api_client.resource_manager import ResourceManager
+
+from .circuitbreaker import get_circuit_breaker, record_rm_failure
+from .ratelimit import RequestPriority, rm_rate_limiter
+
+# Seconds for which a cluster's metrics (its headroom) are cached before being refreshed.
+cluster_metrics_ttl = float(os.getenv('EG_YARN_CLUSTER_METRICS_TTL', '30.0'))
+# Launch latency, in seconds, at which a cluster's headroom is weighted by half when routing launches.
+launch_latency_scale = float(os.getenv('EG_YARN_LAUNCH_LATENCY_SCALE', '60.0'))
+# Smoothing factor applied to the moving average of each cluster's launch latency.
+launch_latency_alpha = 0.3
+
+
+def create_resource_manager(yarn_endpoint=None, alt_yarn_endpoint=None, yarn_endpoint_security_enabled=False):
+    """Creates a ResourceManager for the given endpoints.  If no endpoint is given, the YARN library will
+       use the files within the local HADOOP_CONFIG_DIR to determine the active resource manager.
+    """
+    endpoints = None
+    if yarn_endpoint:
+        endpoints = [yarn_endpoint]
+
+        # Only check alternate if "primary" is set.
+        if alt_yarn_endpoint:
+            endpoints.append(alt_yarn_endpoint)
+
+    auth = None
+    if yarn_endpoint_security_enabled:
+        from requests_kerberos import HTTPKerberosAuth
+        auth = HTTPKerberosAuth()
+
+    return ResourceManager(service_endpoints=endpoints, auth=auth)
+
+
+class YarnCluster(object):
+    """A YARN cluster known to the provider, its cached metrics and recent launch latency.
+
+    The cluster's configuration consists of its `yarn_endpoint`, `alt_yarn_endpoint` and
+    `yarn_endpoint_security_enabled` values, along with an optional `env` dictionary that is applied to the
+    environment of the kernels launched on it (e.g., HADOOP_CONF_DIR) so the submitter targets this cluster.
+    """
+
+    def __init__(self, name, config, log=None):
+        self.name = name
+        self.config = config
+        self.yarn_endpoint = config.get('yarn_endpoint')
+        self.alt_yarn_endpoint = config.get('alt_yarn_endpoint')
+        self.yarn_endpoint_security_enabled = config.get('yarn_endpoint_security_enabled', False)
+        self.env = config.get('env', {})
+        self.log = log or get_logger()
+        self.metrics = None
+        self.metrics_time = None
+        self.launch_latency = None
+        self.launches = 0
+        self._resource_mgr = None
+
+    @property
+    def resource_mgr(self):
+        """The ResourceManager shared by the kernels running on this cluster - created on first use."""
+        if self._resource_mgr is None:
+            self._resource_mgr = create_resource_manager(self.yarn_endpoint, self.alt_yarn_endpoint,
+                                                         self.yarn_endpoint_security_enabled)
+        return self._resource_mgr
+
+    @property
+    def breaker(self):
+        return get_circuit_breaker(self.resource_mgr.get_active_endpoint(), log=self.log)
+
+    async def refresh_metrics(self):
+        """Refreshes the cluster's metrics should those cached have expired."""
+        now = time.monotonic()
+        if self.metrics_time is not None and now - self.metrics_time < cluster_metrics_ttl:
+            return
+        self.metrics_time = now  # regardless of outcome, so an unavailable cluster isn't retried until expiry
+
+        breaker = None
+        try:
+            breaker = self.breaker
+            await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+            if not breaker.allow_request():
+                self.metrics = None
+                return
+            self.metrics = self.resource_mgr.cluster_metrics().data.get('clusterMetrics')
+            breaker.record_success()
+        except Exception as e:
+            if breaker:
+                record_rm_failure(breaker, e)
+            self.metrics = None
+            self.log.warning("Query for metrics of YARN cluster '{}' failed with exception: {} - '{}'.  "
+                             "Continuing...".format(self.name, type(e), e))
+
+    def get_headroom(self):
+        """Returns the fraction of the cluster's memory or vcores (whichever is lower) that's available."""
+        if not self.metrics:
+            return None
+        headroom = []
+        for available, total in (('availableMB', 'totalMB'), ('availableVirtualCores', 'totalVirtualCores')):
+            if self.metrics.get(total):
+                headroom.append(float(self.metrics.get(available, 0)) / self.metrics[total])
+        return min(headroom) if headroom else None
+
+    def get_score(self):
+        """Returns the cluster's routing score - its headroom weighted by recent launch latency."""
+        headroom = self.get_headroom()
+        if headroom is None:
+            return None
+        return headroom / (1.0 + (self.launch_latency or 0.0) / launch_latency_scale)
+
+    def record_launch(self, latency):
+        """Folds the time, in seconds, taken to launch a kernel into the cluster's launch latency."""
+        self.launches += 1
+        if self.launch_latency is None:
+            self.launch_latency = latency
+        else:
+            self.launch_latency += launch_latency_alpha * (latency - self.launch_latency)
+
+
+class YarnClusterRegistry(object):
+    """The provider-level set of YARN clusters, from which a kernelspec's pool of clusters is drawn."""
+
+    def __init__(self):
+        self.clusters = {}
+
+    def configure(self, clusters_config, log=None):
+        """Registers the clusters in `clusters_config` - a dictionary of cluster configurations indexed by name.
+           Clusters whose configuration is unchanged retain their state.
+        """
+        for name, config in (clusters_config or {}).items():
+            cluster = self.clusters.get(name)
+            if cluster is None or cluster.config != config:
+                self.clusters[name] = YarnCluster(name, config, log=log)
+
+    def get_cluster(self, name):
+        return self.clusters.get(name)
+
+    async def select_cluster(self, pool, log=None):
+        """Selects the cluster from the named `pool` to which the next launch should be routed.
+
+        Clusters are scored by their cached headroom, weighted by their recent launch latency.  If no
+        cluster's metrics are available, the first cluster of the pool whose RM is not known to be
+        unavailable is used.
+        """
+        log = log or get_logger()
+        candidates = []
+        for name in pool:
+            cluster = self.clusters.get(name)
+            if cluster is None:
+                log.warning("YARN cluster '{}' of the cluster pool has not been configured - ignoring.".format(name))
+            else:
+                candidates.append(cluster)
+        if not candidates:
+            return None
+
+        await asyncio.gather(*[cluster.refresh_metrics() for cluster in candidates])
+
+        selected = None
+        best_score = None
+        for cluster in candidates:
+            score = cluster.get_score()
+            log.debug("YARN cluster '{}' headroom: {}, launch latency: {}, score: {}".
+                      format(cluster.name, cluster.get_headroom(), cluster.launch_latency, score))
+            if score is not None and (best_score is None or score > best_score):
+                selected = cluster
+                best_score = score
+
+        if selected is None:
+            for cluster in candidates:
+                try:
+                    if not cluster.breaker.is_open:
+                        selected = cluster
+                        break
+                except Exception:
+                    continue  # no active RM could be located
+            else:
+                selected = candidates[0]
+        return selected
+
+
+yarn_cluster_registry = YarnClusterRegistry()
@@ -3,6 +3,7 @@
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
 
+import glob
 import os
 import os.path
 import json
@@ -128,6 +129,10 @@ class YKP_SpecInstaller(JupyterApp):
 
     dask = Bool(False, config=True, help="Kernelspec will be configured for Dask YARN.")
 
+    shared_skein_driver = Bool(False, config=True,
+                               help="Dask kernels will be submitted through a long-lived skein driver shared "
+                                    "by the server's Dask kernels.")
+
     aliases = {
         'prefix': 'YKP_SpecInstaller.prefix',
         'kernel_name': 'YKP_SpecInstaller.kernel_name',
@@ -150,6 +155,8 @@ class YKP_SpecInstaller(JupyterApp):
                             "Install to Python's sys.prefix. Useful in conda/virtual environments."),
              'dask': ({'YKP_SpecInstaller': {'dask': True}},
                       "Install kernelspec for Dask YARN."),
+             'shared-skein-driver': ({'YKP_SpecInstaller': {'shared_skein_driver': True}},
+                                     "Submit Dask kernels through a shared skein driver."),
              'debug': base_flags['debug'], }
 
     def parse_command_line(self, argv=None):
@@ -191,6 +198,15 @@ class YKP_SpecInstaller(JupyterApp):
         post_subs = Template(kernel_json_str).safe_substitute(subs)
         kernel_json = json.loads(post_subs)
 
+        # The launch description lets the lifecycle manager run the submitter directly rather than via run.sh.
+        # Should any of its files not have been found, it's dropped - leaving run.sh to report what's missing.
+        lifecycle_config = kernel_json.get('metadata', {}).get('lifecycle_manager', {}).get('config', {})
+        launch = lifecycle_config.get('launch')
+        if launch and '' in [item for item in launch.get('argv', []) if isinstance(item, str)]:
+            self.log.warning("Kernel '{}' will be launched via run.sh since its launch files could not be found.".
+                             format(self.display_name))
+            lifecycle_config.pop('launch')
+
         # Instantiate default KernelSpec, then update with the substitutions.  This allows for new fields
         # to be added that we might not yet know about.
         kernel_spec = KernelSpec().to_dict()
@@ -238,6 +254,9 @@ class YKP_SpecInstaller(JupyterApp):
             if len(self.extra_dask_opts) > 0:
                 self.log.warning("--extra_dask_opts will be ignored for Spark-based kernelspecs.")
                 self.extra_dask_opts = ''
+            if self.shared_skein_driver:
+                self.log.warning("--shared-skein-driver will be ignored for Spark-based kernelspecs.")
+                self.shared_skein_driver = False
 
         self.spark_init_mode = self.spark_init_mode.lower()
         if self.spark_init_mode not in SPARK_INIT_MODES:
@@ -257,11 +276,14 @@ class YKP_SpecInstaller(JupyterApp):
         substitutions['yarn_endpoint_security_enabled'] = str(self.yarn_endpoint_security_enabled).lower()
         substitutions['extra_spark_opts'] = self.extra_spark_opts
         substitutions['extra_dask_opts'] = self.extra_dask_opts
+        substitutions['shared_skein_driver'] = str(self.shared_skein_driver).lower()
         substitutions['spark_init_mode'] = self.spark_init_mode
         substitutions['python_root'] = self.python_root
         substitutions['display_name'] = self.display_name
         substitutions['install_dir'] = install_dir
         substitutions['py4j_path'] = ''
+        substitutions['toree_assembly'] = self._find_lib(install_dir, 'toree-assembly-*.jar')
+        substitutions['toree_launcher'] = self._find_lib(install_dir, 'toree-launcher*.jar')
 
         # If this is a python kernel, attempt to get the path to the py4j file.
         if self.language == PYTHON and not self.dask:
@@ -275,6 +297,12 @@ class YKP_SpecInstaller(JupyterApp):
                 self.log.warn('Unable to find py4j, installing without PySpark support.')
         return substitutions
 
+    @staticmethod
+    def _find_lib(install_dir, pattern):
+        """Returns the path of the kernelspec's library file matching `pattern`, or '' if there is none."""
+        matches = sorted(glob.glob(os.path.join(install_dir, 'lib', pattern)))
+        return matches[0] if matches else ''
+
     def _log_and_exit(self, msg, exit_status=1):
         self.log.error(msg)
         self.exit(exit_status)
@@ -0,0 +1,48 @@
+"""Runs the dask-yarn command line, submitting through the shared skein driver at SKEIN_DRIVER_ADDRESS.
+
+dask-yarn creates a skein client - starting a driver of its own - for each submission.  When the lifecycle
+manager has provided the address of its shared driver, that driver is used instead.
+"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import os
+import sys
+import warnings
+
+import skein
+
+from dask_yarn import cli
+
+
+class SharedDriverClient(object):
+    """Delegates to the shared driver's client.  Because the driver's credentials secure the connection to
+       it, any application-specific credentials are conveyed via the application's specification.
+    """
+
+    def __init__(self, client, security=None):
+        self.client = client
+        self.security = security
+
+    def submit(self, spec):
+        if self.security is not None and spec.master.security is None:
+            spec.master.security = self.security
+        return self.client.submit(spec)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def get_shared_driver_client(skein_client=None, security=None):
+    if skein_client is not None:
+        return skein_client
+    with warnings.catch_warnings():  # silences the warning about credentials not being written yet
+        warnings.simplefilter("ignore")
+        return SharedDriverClient(skein.Client(address=os.environ['SKEIN_DRIVER_ADDRESS']), security=security)
+
+
+if __name__ == '__main__':
+    if os.environ.get('SKEIN_DRIVER_ADDRESS') and hasattr(cli, '_get_skein_client'):
+        cli._get_skein_client = get_shared_driver_client
+    cli.main(sys.argv[1:])
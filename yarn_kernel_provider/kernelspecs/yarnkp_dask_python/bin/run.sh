@@ -14,9 +14,16 @@ echo
 
 PROG_HOME="$(cd "`dirname "$0"`"/..; pwd)"
 
+# Submit through the shared skein driver when the lifecycle manager provides one, rather than starting a driver.
+if [ -n "${SKEIN_DRIVER_ADDRESS}" ]; then
+    DASK_SUBMIT="${DASK_YARN_PYTHON} ${PROG_HOME}/bin/dask_submit.py"
+else
+    DASK_SUBMIT="${DASK_YARN_EXE}"
+fi
+
 set -x
 eval exec \
-     "${DASK_YARN_EXE}" submit \
+     "${DASK_SUBMIT}" submit \
      "${DASK_OPTS}" \
      "${IMPERSONATION_OPTS}" \
      "${PROG_HOME}/scripts/launch_ipykernel.py" \
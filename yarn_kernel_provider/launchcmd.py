@@ -0,0 +1,140 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Submitter commands built from a kernelspec's launch description, in place of its run.sh script.
+
+A launch description - the `launch` entry of the lifecycle manager's config - holds the submitter's argv, the
+kernel's arguments (those following run.sh in the kernelspec's argv) being appended to it.  Its items are either
+strings, used as is, or objects:
+
+    {"env": "SPARK_OPTS"}   The options held by the variable (or the first non-empty of a list of variables),
+                            expanded and split into words as run.sh's `eval` would have.
+    {"impersonation": "--proxy-user"}   The option, followed by KERNEL_USERNAME, when EG_IMPERSONATION_ENABLED
+                            is 'True'.
+    {"if_env": "SKEIN_DRIVER_ADDRESS", "then": [...], "else": [...]}   The items of `then` when the variable is
+                            non-empty, otherwise those of `else`.
+"""
+
+import functools
+import re
+
+_reference_pattern = re.compile(r'\$(?:\{(\w+)(?::-([^}]*))?\}|(\w+))')
+_whitespace_pattern = re.compile(r'\s+')
+
+
+def expand_variables(value, env):
+    """Expands the $NAME, ${NAME} and ${NAME:-default} references of `value` per `env` - unset names being
+       empty - as the shell would.
+    """
+    def expand(match):
+        name = match.group(1) or match.group(3)
+        result = env.get(name) or ''
+        if not result and match.group(2) is not None:
+            result = expand_variables(match.group(2), env)
+        return result
+    return _reference_pattern.sub(expand, value)
+
+
+@functools.lru_cache(maxsize=256)
+def _tokenize(options):
+    """Splits an options string into words, each a tuple of its segments and their quote characters ('' when
+       unquoted), so that the string need only be parsed once however many kernels are launched with it.
+    """
+    words = []
+    segments, text, quote, in_word = [], '', '', False
+    chars = iter(options)
+    for char in chars:
+        if quote == "'":
+            if char == "'":
+                segments.append((text, quote))
+                text, quote = '', ''
+            else:
+                text += char
+        elif quote == '"':
+            if char == '"':
+                segments.append((text, quote))
+                text, quote = '', ''
+            elif char == '\\':
+                escaped = next(chars, '')
+                if escaped == '$':  # a literal '$', which mustn't start a reference once expanded
+                    segments.append((text, quote))
+                    segments.append((escaped, "'"))
+                    text = ''
+                else:
+                    text += escaped if escaped in ('"', '\\') else char + escaped
+            else:
+                text += char
+        elif char.isspace():
+            if in_word:
+                segments.append((text, ''))
+                words.append(tuple(segments))
+                segments, text, in_word = [], '', False
+        elif char in ('"', "'"):
+            segments.append((text, ''))
+            text, quote, in_word = '', char, True
+        elif char == '\\':
+            segments.append((text, ''))
+            segments.append((next(chars, ''), "'"))
+            text, in_word = '', True
+        elif char == '{' and text.endswith('$'):  # a braced reference is a unit, its default possibly holding spaces
+            text += char
+            for char in chars:
+                text += char
+                if char == '}':
+                    break
+            else:
+                raise ValueError("No closing brace in options: {}".format(options))
+            in_word = True
+        else:
+            text += char
+            in_word = True
+    if quote:
+        raise ValueError("No closing quotation in options: {}".format(options))
+    if in_word:
+        segments.append((text, ''))
+        words.append(tuple(segments))
+    return tuple(tuple(segment for segment in word if segment[0] or segment[1]) for word in words)
+
+
+def split_options(options, env):
+    """Returns the words of an options string once its references have been expanded per `env`.  As with the
+       shell, the expansions of unquoted references are split on whitespace and those that are empty are dropped.
+    """
+    argv = []
+    for word in _tokenize(options):
+        fields = ['']
+        for text, quote in word:
+            value = text if quote == "'" else expand_variables(text, env)
+            if quote or '$' not in text:
+                fields[-1] += value
+            else:
+                pieces = _whitespace_pattern.split(value)
+                fields[-1] += pieces[0]
+                fields.extend(pieces[1:])
+        quoted = any(quote for text, quote in word)
+        argv.extend(field for field in fields if field or (quoted and len(fields) == 1))
+    return argv
+
+
+def build_launch_argv(launch, kernel_args, env):
+    """Returns the submitter's argv per the launch description, followed by the kernel's arguments."""
+    argv = []
+    _append_items(argv, launch.get('argv', []), env)
+    argv.extend(kernel_args)
+    return argv
+
+
+def _append_items(argv, items, env):
+    for item in items:
+        if isinstance(item, str):
+            argv.append(item)
+        elif 'env' in item:
+            names = item['env'] if isinstance(item['env'], list) else [item['env']]
+            options = next((env[name] for name in names if env.get(name)), '')
+            argv.extend(split_options(options, env))
+        elif 'impersonation' in item:
+            if env.get('EG_IMPERSONATION_ENABLED') == 'True':
+                argv.extend([item['impersonation'], env.get('KERNEL_USERNAME') or 'UNSPECIFIED'])
+        elif 'if_env' in item:
+            _append_items(argv, item.get('then' if env.get(item['if_env']) else 'else', []), env)
+        else:
+            raise ValueError("Unrecognized item in kernel launch description: {}".format(item))
@@ -0,0 +1,85 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Selection of the node label (partition) on which a kernel's application master is placed."""
+
+import os
+import time
+
+# Seconds for which a snapshot of a cluster's nodes is used before being refreshed.
+nodes_snapshot_ttl = float(os.getenv('EG_YARN_NODES_SNAPSHOT_TTL', '30.0'))
+# Resource profile of a kernel's AM unless the kernel specifies KERNEL_AM_MEMORY_MB or KERNEL_AM_VCORES.
+# The memory default corresponds to Spark's default driver memory (1g) plus its minimum overhead (384m).
+am_memory_mb = int(os.getenv('EG_YARN_AM_MEMORY_MB', '1408'))
+am_vcores = int(os.getenv('EG_YARN_AM_VCORES', '1'))
+
+DEFAULT_PARTITION = ''
+
+
+class NodeSnapshot(object):
+    """The RUNNING nodes of a cluster, as reported by the RM's nodes resource, grouped by node label."""
+
+    def __init__(self, nodes):
+        self.time = time.monotonic()
+        self.partitions = {}
+        for node in nodes:
+            if node.get('state', 'RUNNING') != 'RUNNING':
+                continue
+            labels = node.get('nodeLabels') or [DEFAULT_PARTITION]
+            self.partitions.setdefault(labels[0], []).append(node)
+
+    @property
+    def expired(self):
+        return time.monotonic() - self.time >= nodes_snapshot_ttl
+
+
+def get_free_fraction(node):
+    """Returns the fraction of the node's memory or vcores (whichever is lower) that's available."""
+    fractions = []
+    for used, available in (('usedMemoryMB', 'availMemoryMB'), ('usedVirtualCores', 'availableVirtualCores')):
+        total = node.get(used, 0) + node.get(available, 0)
+        if total:
+            fractions.append(float(node.get(available, 0)) / total)
+    return min(fractions) if fractions else 0.0
+
+
+def select_node_label(snapshot, memory_mb=am_memory_mb, vcores=am_vcores, labels=None):
+    """Returns the node label best able to host an AM of the given resource profile, and its score.
+
+    Only the nodes able to host the AM are considered and each label is scored by their average free
+    fraction, so that AMs are directed away from partitions whose nodes are saturated.  Ties are broken
+    in favor of the label with more such nodes.  `labels`, if given, restricts the candidate labels
+    (e.g., to those accessible to the kernel's queue).  Returns (None, None) if no node can host the AM.
+    """
+    best_label, best_key = None, None
+    for label, nodes in snapshot.partitions.items():
+        if labels is not None and label not in labels:
+            continue
+        fitting = [node for node in nodes if node.get('availMemoryMB', 0) >= memory_mb and
+                   node.get('availableVirtualCores', 0) >= vcores]
+        if not fitting:
+            continue
+        key = (sum(get_free_fraction(node) for node in fitting) / len(fitting), len(fitting))
+        if best_key is None or key > best_key:
+            best_label, best_key = label, key
+
+    if best_key is None:
+        return None, None
+    return best_label, best_key[0]
+
+
+_node_snapshots = {}
+
+
+def get_node_snapshot(rm_addr):
+    """Returns the cached, unexpired snapshot of the nodes of the cluster managed by `rm_addr`."""
+    snapshot = _node_snapshots.get(rm_addr)
+    if snapshot is None or snapshot.expired:
+        return None
+    return snapshot
+
+
+def cache_node_snapshot(rm_addr, nodes):
+    """Caches a snapshot of `nodes` for the cluster managed by `rm_addr`, which is shared by all kernels."""
+    snapshot = NodeSnapshot(nodes)
+    _node_snapshots[rm_addr] = snapshot
+    return snapshot
@@ -2,9 +2,24 @@
 
 from remote_kernel_provider.provider import RemoteKernelProviderBase
 
+from .clusters import yarn_cluster_registry
+from .snapshot import cluster_snapshot
+
 
 class YarnKernelProvider(RemoteKernelProviderBase):
 
     id = 'yarnkp'
     kernel_file = 'yarnkp_kernel.json'
     lifecycle_manager_classes = ['yarn_kernel_provider.yarn.YarnKernelLifecycleManager']
+
+    def load_config(self, config=None):
+        super(YarnKernelProvider, self).load_config(config=config)
+        # Clusters to which kernelspecs naming a 'yarn_cluster_pool' are routed
+        yarn_cluster_registry.configure(self.provider_config.get('yarn_clusters'), log=self.log)
+
+    async def get_cluster_snapshot(self):
+        """Returns the YARN application state, queue, AM host, allocated resources and elapsed time of each kernel
+           managed by this server.  The snapshot is built from a single applications query per resource manager
+           and cached for EG_YARN_SNAPSHOT_TTL seconds, so monitoring costs are independent of the kernel count.
+        """
+        return await cluster_snapshot.get_snapshot()
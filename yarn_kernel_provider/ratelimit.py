@@ -0,0 +1,125 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Process-wide rate limiting of the requests issued against YARN resource managers."""
+
+import asyncio
+import os
+import time
+
+from collections import deque
+from enum import IntEnum
+
+# Requests per second permitted against the RM (0 disables rate limiting) and the size of bursts above that rate.
+rm_rate_limit = float(os.getenv('EG_YARN_RM_RATE_LIMIT', '0'))
+rm_rate_burst = int(os.getenv('EG_YARN_RM_RATE_BURST', '20'))
+
+
+class RequestPriority(IntEnum):
+    """Priority classes of RM requests.  Lower values are served first."""
+    KILL = 0
+    DISCOVERY = 1
+    POLL = 2
+
+
+class RequestRateLimiter(object):
+    """Token-bucket rate limiter whose queued requests are granted tokens in priority order.
+
+    Asynchronous callers wait for a token via `acquire()`.  Synchronous callers (e.g., liveness polls) use
+    `try_acquire()`, which never waits and is refused while requests of equal or higher priority are queued.
+    """
+
+    def __init__(self, rate=rm_rate_limit, burst=rm_rate_burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.waiters = {priority: deque() for priority in RequestPriority}
+        self.granted = {priority: 0 for priority in RequestPriority}
+        self.refused = {priority: 0 for priority in RequestPriority}
+        self.max_queue_depth = {priority: 0 for priority in RequestPriority}
+        self.total_wait_time = {priority: 0.0 for priority in RequestPriority}
+        self._dispatch_handle = None
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _is_queued(self, priority):
+        """Returns True if requests of equal or higher priority than `priority` are waiting."""
+        return any(self.waiters[p] for p in RequestPriority if p <= priority)
+
+    def try_acquire(self, priority):
+        """Takes a token if one is immediately available to `priority`, returning True if taken."""
+        if not self.enabled:
+            return True
+
+        self._refill()
+        if self.tokens >= 1 and not self._is_queued(priority):
+            self.tokens -= 1
+            self.granted[priority] += 1
+            return True
+
+        self.refused[priority] += 1
+        return False
+
+    async def acquire(self, priority):
+        """Waits for a token, which is granted ahead of those requested with lower priority."""
+        if not self.enabled or self.try_acquire(priority):
+            return
+
+        self.refused[priority] -= 1  # queued rather than refused
+        loop = asyncio.get_event_loop()
+        waiter = loop.create_future()
+        self.waiters[priority].append((waiter, time.monotonic()))
+        self.max_queue_depth[priority] = max(self.max_queue_depth[priority], len(self.waiters[priority]))
+        self._schedule_dispatch(loop)
+        try:
+            await waiter
+        finally:
+            if not waiter.done():  # cancelled while queued
+                waiter.cancel()
+
+    def _schedule_dispatch(self, loop):
+        if self._dispatch_handle is None:
+            delay = max(0.0, (1 - self.tokens) / self.rate)
+            self._dispatch_handle = loop.call_later(delay, self._dispatch, loop)
+
+    def _dispatch(self, loop):
+        self._dispatch_handle = None
+        self._refill()
+        for priority in RequestPriority:
+            queue = self.waiters[priority]
+            while queue and self.tokens >= 1:
+                waiter, queued_time = queue.popleft()
+                if waiter.done():
+                    continue
+                self.tokens -= 1
+                self.granted[priority] += 1
+                self.total_wait_time[priority] += time.monotonic() - queued_time
+                waiter.set_result(None)
+
+        if self._is_queued(max(RequestPriority)):
+            self._schedule_dispatch(loop)
+
+    def get_metrics(self):
+        """Returns the limiter's configuration, current queue depths and per-priority counters."""
+        self._refill()
+        metrics = {'rate': self.rate, 'burst': self.burst, 'tokens': self.tokens, 'priorities': {}}
+        for priority in RequestPriority:
+            granted = self.granted[priority]
+            metrics['priorities'][priority.name.lower()] = {
+                'queue_depth': len(self.waiters[priority]),
+                'max_queue_depth': self.max_queue_depth[priority],
+                'granted': granted,
+                'refused': self.refused[priority],
+                'avg_wait_time': self.total_wait_time[priority] / granted if granted else 0.0,
+            }
+        return metrics
+
+
+rm_rate_limiter = RequestRateLimiter()
@@ -0,0 +1,133 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Process-wide scheduling of kernel launches, fairly queued across users."""
+
+import asyncio
+import os
+import time
+
+# Launches in progress at any one time (0 is unlimited) and per user (0 is unlimited).
+max_concurrent_launches = int(os.getenv('EG_YARN_MAX_CONCURRENT_LAUNCHES', '0'))
+max_user_launches = int(os.getenv('EG_YARN_MAX_USER_LAUNCHES', '0'))
+# Relative shares of launch capacity, e.g. 'etl=0.5,alice=2'.  Users not listed have a weight of 1.
+launch_weights = os.getenv('EG_YARN_LAUNCH_WEIGHTS', '')
+
+
+def parse_weights(weights):
+    """Parses a string of comma-separated `user=weight` pairs into a dictionary."""
+    parsed = {}
+    for entry in weights.split(','):
+        if entry.strip():
+            user, _, weight = entry.partition('=')
+            parsed[user.strip()] = float(weight)
+    return parsed
+
+
+class LaunchRequest(object):
+    def __init__(self, user, start_tag, finish_tag, waiter):
+        self.user = user
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.waiter = waiter
+        self.queued_time = time.monotonic()
+
+
+class LaunchScheduler(object):
+    """Admits launches using weighted fair queuing keyed by user.
+
+    Each request is tagged with a virtual finish time - its start (the later of the current virtual time and
+    its user's previous finish) plus the inverse of its user's weight - and queued requests are admitted in
+    finish order as capacity becomes available.  A user's burst of launches therefore receives increasingly
+    later tags, while a light user's launch is tagged relative to the current virtual time and is admitted
+    ahead of the rest of the burst.  Users at their concurrency cap are passed over until one of their
+    launches completes.
+    """
+
+    def __init__(self, max_launches=max_concurrent_launches, max_user_launches=max_user_launches,
+                 weights=None):
+        self.max_launches = max_launches
+        self.max_user_launches = max_user_launches
+        self.weights = parse_weights(launch_weights) if weights is None else weights
+        self.virtual_time = 0.0
+        self.last_finish = {}
+        self.queue = []
+        self.active = {}
+        self.user_metrics = {}
+
+    @property
+    def enabled(self):
+        return self.max_launches > 0 or self.max_user_launches > 0
+
+    def _is_admissible(self, user):
+        if self.max_launches > 0 and sum(self.active.values()) >= self.max_launches:
+            return False
+        return self.max_user_launches <= 0 or self.active.get(user, 0) < self.max_user_launches
+
+    def _get_metrics(self, user):
+        if user not in self.user_metrics:
+            self.user_metrics[user] = {'admitted': 0, 'total_wait_time': 0.0, 'max_wait_time': 0.0}
+        return self.user_metrics[user]
+
+    async def admit(self, user):
+        """Waits until a launch by `user` is admitted.  Callers must call `release()` once it completes."""
+        if not self.enabled:
+            return
+
+        start_tag = max(self.virtual_time, self.last_finish.get(user, 0.0))
+        finish_tag = start_tag + 1.0 / self.weights.get(user, 1.0)
+        self.last_finish[user] = finish_tag
+        request = LaunchRequest(user, start_tag, finish_tag, asyncio.get_event_loop().create_future())
+        self.queue.append(request)
+        self._dispatch()
+        try:
+            await request.waiter
+        except asyncio.CancelledError:
+            if request in self.queue:
+                self.queue.remove(request)
+            elif not request.waiter.cancelled():  # admitted as the caller was cancelled
+                self.release(user)
+            raise
+
+    def release(self, user):
+        """Completes an admitted launch by `user`, admitting those queued behind it."""
+        if not self.enabled:
+            return
+        self.active[user] -= 1
+        if not self.active[user]:
+            del self.active[user]
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.queue:
+            eligible = [request for request in self.queue if self._is_admissible(request.user)]
+            if not eligible:
+                break
+            request = min(eligible, key=lambda r: r.finish_tag)
+            self.queue.remove(request)
+            self.virtual_time = max(self.virtual_time, request.start_tag)
+            self.active[request.user] = self.active.get(request.user, 0) + 1
+
+            wait_time = time.monotonic() - request.queued_time
+            metrics = self._get_metrics(request.user)
+            metrics['admitted'] += 1
+            metrics['total_wait_time'] += wait_time
+            metrics['max_wait_time'] = max(metrics['max_wait_time'], wait_time)
+            request.waiter.set_result(None)
+
+    def get_metrics(self):
+        """Returns the scheduler's configuration, the launches in progress and queued, and per-user counters."""
+        metrics = {'max_launches': self.max_launches, 'max_user_launches': self.max_user_launches,
+                   'active': sum(self.active.values()), 'queued': len(self.queue), 'users': {}}
+        for user, user_metrics in self.user_metrics.items():
+            admitted = user_metrics['admitted']
+            metrics['users'][user] = {
+                'active': self.active.get(user, 0),
+                'queued': sum(1 for request in self.queue if request.user == user),
+                'admitted': admitted,
+                'avg_wait_time': user_metrics['total_wait_time'] / admitted if admitted else 0.0,
+                'max_wait_time': user_metrics['max_wait_time'],
+            }
+        return metrics
+
+
+launch_scheduler = LaunchScheduler()
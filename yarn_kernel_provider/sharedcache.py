@@ -0,0 +1,177 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""A cache of the active applications of each RM, shared by the server processes of a host."""
+
+import asyncio
+import fcntl
+import json
+import os
+import time
+
+from traitlets.log import get_logger
+
+from .applist import stream_applications
+from .circuitbreaker import get_circuit_breaker, record_rm_failure
+from .clusters import create_resource_manager
+from .ratelimit import RequestPriority, rm_rate_limiter
+
+# Path of the Unix socket on which the cache is shared.  If not set, the cache is disabled.
+shared_cache_socket = os.getenv('EG_YARN_SHARED_CACHE_SOCKET', '')
+# Seconds between refreshes of the cache.  Snapshots older than twice this interval are not used.
+shared_cache_interval = float(os.getenv('EG_YARN_SHARED_CACHE_INTERVAL', '2.0'))
+
+active_states = 'NEW,NEW_SAVING,SUBMITTED,ACCEPTED,RUNNING'
+
+
+class SharedApplicationCache(object):
+    """Snapshots of the states of each RM's active applications, shared by the processes of a host so that RM
+       traffic does not grow with the number of processes.
+
+    One process - the leader, holding an exclusive lock on the cache's lock file - queries each RM for its active
+    applications every refresh interval and serves the snapshots on a Unix socket.  The other processes refresh
+    their snapshots from the leader's, naming the RM of each - which the leader then also refreshes, should it
+    have no kernels of its own on that RM.  Since the lock is released once the leader exits, the first of the
+    others to then attempt to lock it takes over.  Applications absent from a snapshot, and those of RMs yet to
+    be refreshed by the leader, are queried from the RM as before.  The RMs' lists, which can be large, are
+    streamed in an executor rather than on the event loop.
+    """
+
+    def __init__(self, socket_path=shared_cache_socket, interval=shared_cache_interval, log=None):
+        self.socket_path = socket_path
+        self.lock_path = socket_path + '.lock'
+        self.interval = interval
+        self.log = log or get_logger()
+        self.resource_managers = {}
+        self.security_enabled = {}
+        self.snapshots = {}
+        self.is_leader = False
+        self._lock_file = None
+        self._server = None
+        self._task = None
+
+    @property
+    def enabled(self):
+        return bool(self.socket_path)
+
+    def watch(self, rm_addr, resource_mgr, rm_breaker, security_enabled=False):
+        """Includes the applications of the given RM in the cache, starting the cache's refreshes on first use."""
+        if not self.enabled or not rm_addr:
+            return
+        if self.resource_managers.get(rm_addr, (None, None))[0] is None:
+            self.resource_managers[rm_addr] = (resource_mgr, rm_breaker)
+        self.security_enabled[rm_addr] = security_enabled
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def get_state(self, rm_addr, app_id):
+        """Returns the application's state per a current snapshot, or None if it's not known to be active."""
+        snapshot = self.snapshots.get(rm_addr)
+        if snapshot is None or time.time() - snapshot['time'] > 2 * self.interval:
+            return None
+        return snapshot['apps'].get(app_id)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._run_once()
+            except Exception as e:
+                self.log.warning("Refresh of the shared YARN application cache failed: {}".format(e))
+            await asyncio.sleep(self.interval)
+
+    async def _run_once(self):
+        if not self.is_leader:
+            await self._try_lead()
+        for rm_addr in list(self.resource_managers):
+            if self.is_leader:
+                await self._refresh_from_rm(rm_addr)
+            else:
+                await self._refresh_from_leader(rm_addr)
+
+    async def _try_lead(self):
+        """Becomes the leader should the lock file not be locked, i.e., there's no leader or it has exited."""
+        if self._lock_file is None:
+            self._lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        if os.path.exists(self.socket_path):  # left by a prior leader
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.socket_path)
+        self.is_leader = True
+        self.log.info("Process {} is now serving the shared YARN application cache on '{}'.".
+                      format(os.getpid(), self.socket_path))
+
+    async def _refresh_from_rm(self, rm_addr):
+        resource_mgr, rm_breaker = self.resource_managers[rm_addr]
+        await rm_rate_limiter.acquire(RequestPriority.POLL)
+        if not rm_breaker.allow_request():
+            return
+        loop = asyncio.get_event_loop()
+        try:
+            if resource_mgr is None:  # an RM requested by a follower, which this process has yet to use
+                resource_mgr = await loop.run_in_executor(None, create_resource_manager, rm_addr, None,
+                                                          self.security_enabled.get(rm_addr, False))
+                self.resource_managers[rm_addr] = (resource_mgr, rm_breaker)
+            query_time = time.time()
+            apps = await loop.run_in_executor(None, self._list_active_applications, resource_mgr)
+            rm_breaker.record_success()
+        except Exception as e:
+            record_rm_failure(rm_breaker, e)
+            self.log.warning("Query for the active applications of '{}' failed with exception: {} - '{}'.  "
+                             "Continuing...".format(rm_addr, type(e), e))
+            return
+        self.snapshots[rm_addr] = {'time': query_time, 'apps': apps}
+
+    @staticmethod
+    def _list_active_applications(resource_mgr):
+        return {app['id']: app['state']
+                for app in stream_applications(resource_mgr, fields=('id', 'state'), states=active_states)}
+
+    async def _refresh_from_leader(self, rm_addr):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_unix_connection(self.socket_path), self.interval)
+            try:
+                request = {'rm': rm_addr, 'security_enabled': self.security_enabled.get(rm_addr, False)}
+                writer.write((json.dumps(request) + '\n').encode('utf-8'))
+                await writer.drain()
+                snapshot = json.loads((await asyncio.wait_for(reader.read(), self.interval)).decode('utf-8'))
+            finally:
+                writer.close()
+        except Exception as e:
+            self.log.debug("The shared YARN application cache on '{}' is unavailable: {}".format(self.socket_path, e))
+            return
+        if snapshot.get('apps') is not None:
+            self.snapshots[rm_addr] = snapshot
+
+    async def _serve(self, reader, writer):
+        try:
+            request = json.loads((await reader.readline()).decode('utf-8'))
+            rm_addr = request.get('rm')
+            if rm_addr and rm_addr not in self.resource_managers:  # refreshed from the next interval on
+                self.resource_managers[rm_addr] = (None, get_circuit_breaker(rm_addr, log=self.log))
+                self.security_enabled[rm_addr] = bool(request.get('security_enabled'))
+            snapshot = self.snapshots.get(rm_addr, {})
+            writer.write(json.dumps(snapshot, separators=(',', ':')).encode('utf-8'))
+            await writer.drain()
+        except Exception as e:
+            self.log.debug("Request of the shared YARN application cache failed: {}".format(e))
+        finally:
+            writer.close()
+
+    async def close(self):
+        """Stops refreshing the cache and, if the leader, serving it - releasing leadership."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the lock
+            self._lock_file = None
+        self.is_leader = False
+
+
+shared_app_cache = SharedApplicationCache()
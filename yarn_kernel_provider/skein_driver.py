@@ -0,0 +1,86 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Management of the long-lived skein driver through which Dask kernels are submitted."""
+
+import asyncio
+import os
+import time
+
+from traitlets.log import get_logger
+
+# Seconds between health checks of the shared driver.  Failed starts are not retried within this interval.
+skein_driver_check_interval = float(os.getenv('EG_YARN_SKEIN_DRIVER_CHECK_INTERVAL', '30.0'))
+# Keytab and principal with which the driver logs in.  If not set, the ticket cache of the server's user is used.
+skein_driver_keytab = os.getenv('EG_YARN_SKEIN_DRIVER_KEYTAB')
+skein_driver_principal = os.getenv('EG_YARN_SKEIN_DRIVER_PRINCIPAL')
+# Path of the driver's log file.  If not set, the driver logs to the server's stdout/stderr.
+skein_driver_log = os.getenv('EG_YARN_SKEIN_DRIVER_LOG')
+
+
+class SkeinDriverManager(object):
+    """Starts the skein global driver on first use, then health-checks it and restarts it as necessary.
+
+    Starting a driver entails a JVM startup and (on secured clusters) a Kerberos login, which otherwise
+    dominates each Dask kernel's launch.  The driver's address is given to the Dask kernelspec's submitter,
+    which connects to it instead of starting a driver of its own.  skein is an optional dependency - should it
+    not be installed, or the driver fail to start, kernels are submitted using their own driver.
+    """
+
+    def __init__(self, log=None):
+        self.log = log or get_logger()
+        self.address = None
+        self.checked_time = None
+        self.starts = 0
+        self._lock = None
+
+    def _is_checked(self):
+        return self.checked_time is not None and time.monotonic() - self.checked_time < skein_driver_check_interval
+
+    async def get_address(self):
+        """Returns the address of the shared driver or None if it's unavailable."""
+        if self._is_checked():
+            return self.address
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._is_checked():  # another launch may have checked the driver while we waited
+                loop = asyncio.get_event_loop()
+                try:
+                    self.address = await loop.run_in_executor(None, self._ensure_driver)
+                except Exception as e:
+                    self.address = None
+                    self.log.warning("The shared skein driver is unavailable, Dask kernels will be submitted "
+                                     "using their own driver: {} - '{}'".format(type(e), e))
+                self.checked_time = time.monotonic()
+        return self.address
+
+    def _ensure_driver(self):
+        """Pings the driver, (re)starting it should it not respond.  Runs within an executor since both block."""
+        import skein
+
+        if self.address:
+            try:
+                skein.Client(address=self.address)
+                return self.address
+            except Exception as e:
+                self.log.warning("The shared skein driver at '{}' is not responding ({}), restarting...".
+                                 format(self.address, e))
+
+        start_time = time.monotonic()
+        kwargs = {'keytab': skein_driver_keytab, 'principal': skein_driver_principal, 'log': skein_driver_log}
+        try:
+            address = skein.Client.start_global_driver(**kwargs)
+        except Exception as e:
+            # The recorded driver process exists but can't be reached - replace it.
+            self.log.warning("Stopping the unresponsive skein global driver: {}".format(e))
+            skein.Client.stop_global_driver(force=True)
+            address = skein.Client.start_global_driver(**kwargs)
+
+        self.starts += 1
+        self.log.info("Shared skein driver available at '{}' after {:.3f} seconds (starts: {}).".
+                      format(address, time.monotonic() - start_time, self.starts))
+        return address
+
+
+skein_driver = SkeinDriverManager()
@@ -0,0 +1,151 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Aggregated snapshots of the YARN applications of all kernels managed by this server."""
+
+import asyncio
+import os
+import re
+import time
+import weakref
+
+from traitlets.log import get_logger
+
+from .applist import stream_applications
+from .ratelimit import RequestPriority, rm_rate_limiter
+
+# Seconds for which a snapshot is served from cache.
+snapshot_ttl = float(os.getenv('EG_YARN_SNAPSHOT_TTL', '5.0'))
+
+snapshot_fields = ('id', 'name', 'state', 'queue', 'amHostHttpAddress', 'allocatedMB', 'allocatedVCores',
+                   'elapsedTime')
+_kernel_id_pattern = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+# The lifecycle managers of this server's kernels, indexed by kernel ID.  Managers leave once their kernel has been
+# cleaned up, or once discarded.
+_lifecycle_managers = weakref.WeakValueDictionary()
+
+
+def register_lifecycle_manager(lifecycle_manager):
+    _lifecycle_managers[lifecycle_manager.kernel_id] = lifecycle_manager
+
+
+def unregister_lifecycle_manager(lifecycle_manager):
+    if _lifecycle_managers.get(lifecycle_manager.kernel_id) is lifecycle_manager:
+        del _lifecycle_managers[lifecycle_manager.kernel_id]
+
+
+class ClusterSnapshot(object):
+    """Builds the snapshot of every registered kernel's application from a single application list query per
+       resource manager, rather than a query per kernel.  Concurrent requests share the same refresh.
+    """
+
+    def __init__(self, log=None):
+        self.log = log or get_logger()
+        self.snapshot = None
+        self.snapshot_time = None
+        self._refreshing = None
+
+    async def get_snapshot(self):
+        """Returns the snapshot - its time and an entry per kernel - refreshing it if the cached one has expired."""
+        if self.snapshot is not None and time.monotonic() - self.snapshot_time < snapshot_ttl:
+            return self.snapshot
+        if self._refreshing is None:
+            self._refreshing = asyncio.ensure_future(self._refresh())
+        refreshing = self._refreshing
+        try:
+            return await asyncio.shield(refreshing)
+        finally:
+            if refreshing.done() and self._refreshing is refreshing:
+                self._refreshing = None
+
+    async def _refresh(self):
+        managers_by_rm = {}
+        for lifecycle_manager in list(_lifecycle_managers.values()):
+            if lifecycle_manager.rm_addr:  # kernels of a cluster pool have yet to be routed
+                managers_by_rm.setdefault(lifecycle_manager.rm_addr, []).append(lifecycle_manager)
+
+        kernels = []
+        for managers in managers_by_rm.values():
+            kernels.extend(await self._get_rm_entries(managers))
+
+        self.snapshot = {'time': int(time.time() * 1000), 'kernels': kernels}
+        self.snapshot_time = time.monotonic()
+        return self.snapshot
+
+    async def _get_rm_entries(self, managers):
+        """Matches the applications listed by the managers' (common) RM with the managers' kernels.  Since the
+           list can be large, it's streamed and matched in an executor, off the event loop.
+        """
+        apps = {}
+        breaker = managers[0].rm_breaker
+        await rm_rate_limiter.acquire(RequestPriority.POLL)
+        if breaker.allow_request():
+            try:
+                apps = await asyncio.get_event_loop().run_in_executor(None, self._match_applications, managers)
+                breaker.record_success()
+            except Exception as e:
+                managers[0]._record_rm_failure(e)
+                self.log.warning("Query for the applications of '{}' failed with exception: {} - '{}'.  Continuing "
+                                 "with last known states...".format(managers[0].rm_addr, type(e), e))
+
+        return [self._get_entry(m, apps.get(m.kernel_id)) for m in managers]
+
+    @staticmethod
+    def _match_applications(managers):
+        """Returns the application of each of the managers' kernels found in their RM's list, by kernel ID."""
+        by_app_id = {m.application_id: m for m in managers if m.application_id}
+        by_kernel_id = {m.kernel_id: m for m in managers if not m.application_id}
+        apps = {}
+
+        # Only those applications started since the earliest kernel's launch are of interest.
+        start_times = [m.start_time for m in managers]
+        params = {'deSelects': 'resourceRequests'}
+        if None not in start_times:
+            params['startedTimeBegin'] = str(min(start_times))
+
+        for app in stream_applications(managers[0].resource_mgr, fields=snapshot_fields, **params):
+            lifecycle_manager = by_app_id.get(app['id'])
+            if lifecycle_manager is None:
+                match = _kernel_id_pattern.search(app.get('name') or '')
+                lifecycle_manager = by_kernel_id.get(match.group(0)) if match else None
+                # The top-most application is that of the kernel's most recent launch.
+                prior = apps.get(lifecycle_manager.kernel_id) if lifecycle_manager else None
+                if prior is not None and prior['id'] > app['id']:
+                    continue
+            if lifecycle_manager is not None:
+                apps[lifecycle_manager.kernel_id] = app
+        return apps
+
+    @staticmethod
+    def _get_entry(lifecycle_manager, app):
+        entry = {
+            'kernel_id': lifecycle_manager.kernel_id,
+            'application_id': lifecycle_manager.application_id,
+            'cluster': lifecycle_manager.yarn_cluster.name if lifecycle_manager.yarn_cluster
+            else lifecycle_manager.rm_addr,
+            'suspended': lifecycle_manager.suspension is not None,
+            'state': lifecycle_manager.last_known_state,
+            'queue': None,
+            'am_host': lifecycle_manager.assigned_host or None,
+            'allocated_mb': None,
+            'allocated_vcores': None,
+            'elapsed_time': None,
+            'stale': app is None,
+        }
+        if app is not None:
+            if app['id'] == lifecycle_manager.application_id or not lifecycle_manager.application_id:
+                lifecycle_manager.last_known_state = app.get('state')
+            am_address = app.get('amHostHttpAddress')
+            entry.update({
+                'application_id': app['id'],
+                'state': app.get('state'),
+                'queue': app.get('queue'),
+                'am_host': am_address.split(':')[0] if am_address else entry['am_host'],
+                'allocated_mb': app.get('allocatedMB'),
+                'allocated_vcores': app.get('allocatedVCores'),
+                'elapsed_time': app['elapsedTime'] / 1000.0 if app.get('elapsedTime') is not None else None,
+            })
+        return entry
+
+
+cluster_snapshot = ClusterSnapshot()
@@ -0,0 +1,174 @@
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+"""Statistics of the durations of kernel lifecycle operations, maintained per cluster (and kernelspec and queue)."""
+
+import atexit
+import fcntl
+import json
+import math
+import os
+import time
+
+from collections import OrderedDict, deque
+from traitlets.log import get_logger
+
+# Number of the most recent durations retained per cluster and operation.
+duration_samples = int(os.getenv('EG_YARN_DURATION_SAMPLES', '100'))
+# File to which statistics are persisted, so they survive restarts of the server.  If not set, they're not persisted.
+stats_file = os.getenv('EG_YARN_STATS_FILE', '')
+# Number of keys (clusters and kernelspec/queue combinations) retained, the least recently updated being evicted.
+stats_max_keys = int(os.getenv('EG_YARN_STATS_MAX_KEYS', '128'))
+# Minimum seconds between writes of the statistics file.
+stats_save_interval = float(os.getenv('EG_YARN_STATS_SAVE_INTERVAL', '60.0'))
+
+
+class DurationStats(object):
+    """The most recently observed durations, in seconds, of an operation against a given cluster."""
+
+    def __init__(self, max_samples=duration_samples, samples=None, on_record=None):
+        self.samples = deque(samples or [], maxlen=max(max_samples, 1))
+        self.unsaved = deque(maxlen=self.samples.maxlen)  # the samples recorded since the store was last saved
+        self.on_record = on_record
+
+    def __len__(self):
+        return len(self.samples)
+
+    def record(self, duration):
+        self.samples.append(duration)
+        self.unsaved.append(duration)
+        if self.on_record is not None:
+            self.on_record()
+
+    def percentile(self, percent):
+        """Returns the nearest-rank `percent` percentile of the samples or None if there are none."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = int(math.ceil(percent / 100.0 * len(ordered)))
+        return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class DurationStatsStore(object):
+    """The statistics of each key's operations, bounded by evicting the least recently updated keys.
+
+    When a file is configured, the statistics are loaded from it on first use and written back (atomically) at
+    most every `save_interval` seconds and on exit.  Only the samples are persisted - a few kilobytes per key.
+    Since the file may be shared by the server processes of a host, each save merges the samples recorded since
+    the process last saved into those of the file, under an exclusive lock on the file's lock file.
+    """
+
+    def __init__(self, path=stats_file, max_keys=stats_max_keys, save_interval=stats_save_interval, log=None):
+        self.path = path
+        self.max_keys = max(max_keys, 1)
+        self.save_interval = save_interval
+        self.log = log or get_logger()
+        self.entries = OrderedDict()
+        self.dirty = False
+        self.saved_time = time.monotonic()
+        self._loaded = False
+
+    def get(self, key, operation):
+        """Returns the statistics of `operation` (e.g., 'shutdown') against `key` (e.g., an RM)."""
+        self._load()
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = {}
+            self._evict()
+        if operation not in entry:
+            entry[operation] = self._new_stats(key)
+        return entry[operation]
+
+    def _new_stats(self, key, samples=None):
+        return DurationStats(samples=samples, on_record=lambda: self._touch(key))
+
+    def _touch(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+        self.dirty = True
+        if self.path and time.monotonic() - self.saved_time >= self.save_interval:
+            self.save()
+
+    def _evict(self):
+        while len(self.entries) > self.max_keys:
+            self.entries.popitem(last=False)
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path:
+            return
+        atexit.register(self.save)
+        self._merge(self._read())
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f).get('stats', {})
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.log.warning("Unable to load the YARN kernel statistics in '{}', they will be rebuilt: {}".
+                             format(self.path, e))
+            return {}
+
+    def _merge(self, persisted):
+        """Merges the persisted statistics, which include those saved by other processes, with the samples recorded
+           by this process since it last saved.  The keys updated by this process are the most recently updated.
+        """
+        entries = OrderedDict()
+        for key, operations in persisted.items():
+            entry = self.entries.get(key, {})
+            for operation, samples in operations.items():
+                stats = entry.get(operation)
+                if stats is None:
+                    entry[operation] = self._new_stats(key, samples)
+                else:
+                    stats.samples.clear()
+                    stats.samples.extend(samples)
+                    stats.samples.extend(stats.unsaved)
+            entries[key] = entry
+        for key, operations in self.entries.items():
+            if key not in entries or any(stats.unsaved for stats in operations.values()):
+                entries[key] = operations
+                entries.move_to_end(key)
+        for operations in entries.values():
+            for stats in operations.values():
+                stats.unsaved.clear()
+        self.entries = entries
+        self._evict()
+
+    def save(self):
+        """Writes the statistics to the store's file, should they have changed, merging them with those the file's
+           other writers have saved meanwhile.
+        """
+        if not self.path or not self.dirty:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)  # released once closed
+                self._merge(self._read())
+                persisted = {key: {operation: [round(duration, 3) for duration in stats.samples]
+                                   for operation, stats in operations.items() if len(stats)}
+                             for key, operations in self.entries.items()}
+                temp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+                with open(temp_path, 'w') as f:
+                    json.dump({'version': 1, 'stats': persisted}, f, separators=(',', ':'))
+                os.replace(temp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            self.log.warning("Unable to save the YARN kernel statistics to '{}': {}".format(self.path, e))
+        self.saved_time = time.monotonic()
+
+
+duration_stats_store = DurationStatsStore()
+
+
+def get_duration_stats(cluster, operation):
+    """Returns the process-wide statistics of `operation` (e.g., 'shutdown') against `cluster` (e.g., an RM).  The
+       `cluster` may also be a finer-grained key, such as that of a kernelspec and queue on a given cluster.
+    """
+    return duration_stats_store.get(cluster, operation)
@@ -0,0 +1,171 @@
+"""Stand-ins for the resource manager, kernel manager, launcher and kernel shared by the tests and benchmarks"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import mock
+import uuid
+import zmq
+import zmq.asyncio
+
+from requests.exceptions import ConnectionError
+from yarn_api_client.base import Uri
+from yarn_api_client.errors import APIError
+
+
+class MockResponse(object):
+    def __init__(self, data):
+        self.data = data
+
+
+class MockStreamedResponse(object):
+    def __init__(self, data, chunk_size=100):
+        self.status_code = 200
+        self.body = json.dumps(data).encode('utf-8')
+        self.chunk_size = chunk_size
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), self.chunk_size):
+            yield self.body[i:i + self.chunk_size]
+
+    def close(self):
+        pass
+
+
+class MockResourceManager(object):
+    """Stands in for yarn_api_client's ResourceManager, serving applications from a dictionary."""
+
+    def __init__(self, service_endpoints=None, auth=None):
+        self.apps = {}
+        self.nodes = []
+        self.calls = []
+        self.available = True
+        self.service_uri = Uri('http://localhost:8088')
+        self.session = self  # streamed application lists are requested directly from the session
+        self.timeout = 30
+
+    def get_active_endpoint(self):
+        return 'http://localhost:8088'
+
+    def add_app(self, app_id, name, state='ACCEPTED', host=None, **kwargs):
+        app = {'id': app_id, 'name': name, 'state': state}
+        if host:
+            app['amHostHttpAddress'] = host + ':8042'
+        app.update(kwargs)
+        self.apps[app_id] = app
+        return app
+
+    def _request(self, name, application_id=None):
+        self.calls.append(name)
+        if not self.available:
+            raise ConnectionError("Connection refused")
+        if application_id is not None and application_id not in self.apps:
+            raise APIError("Response finished with status: 404. Details: {{\"RemoteException\":{{\"exception\":"
+                           "\"NotFoundException\",\"message\":\"app with id: {} not found\"}}}}".
+                           format(application_id))
+
+    def cluster_applications(self, **kwargs):
+        self._request('cluster_applications')
+        return MockResponse({'apps': {'app': list(self.apps.values())}})
+
+    def get(self, url, params=None, **kwargs):
+        self._request('cluster_applications')
+        return MockStreamedResponse({'apps': {'app': list(self.apps.values())} if self.apps else None})
+
+    def cluster_application(self, application_id):
+        self._request('cluster_application', application_id)
+        return MockResponse({'app': self.apps[application_id]})
+
+    def cluster_application_state(self, application_id):
+        self._request('cluster_application_state', application_id)
+        return MockResponse({'state': self.apps[application_id]['state']})
+
+    def cluster_nodes(self, states=None):
+        self._request('cluster_nodes')
+        return MockResponse({'nodes': {'node': self.nodes} if self.nodes else None})
+
+    def cluster_application_kill(self, application_id):
+        self._request('cluster_application_kill', application_id)
+        self.apps[application_id]['state'] = 'KILLED'
+        return MockResponse({'state': 'KILLED'})
+
+
+class MockKernelManager(object):
+    def __init__(self, provider_config=None):
+        self.kernel_id = str(uuid.uuid4())
+        self.log = logging.getLogger('test_yarn')
+        self.app_config = {}
+        self.provider_config = provider_config or {}
+        self.shutdown_wait_time = 5.0
+        self.kernel_spec = mock.Mock(language='python', display_name='Test Kernel', env={})
+        self.kernel_username = 'alice'
+        self.response_address = None
+        self.ip = None
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+async def send_connection_info(response_address, delay=0.0, connection_info=None):
+    """Plays the role of the remote launcher by sending connection info to the response address."""
+    await asyncio.sleep(delay)
+    host, port = response_address.split(':')
+    reader, writer = await asyncio.open_connection(host, int(port))
+    writer.write(json.dumps(connection_info or {'shell_port': 1, 'iopub_port': 2, 'stdin_port': 3, 'hb_port': 4,
+                                                'control_port': 5, 'key': 'abc'}).encode('utf-8'))
+    await writer.drain()
+    writer.close()
+
+
+def sign_message(key, parts):
+    mac = hmac.new(key.encode('utf-8'), digestmod=hashlib.sha256)
+    for part in parts:
+        mac.update(part)
+    return mac.hexdigest().encode('ascii')
+
+
+def build_message(key, msg_type, idents=(), parent=None, content=None):
+    header = {'msg_id': uuid.uuid4().hex, 'msg_type': msg_type, 'session': 'test', 'username': 'alice',
+              'version': '5.3'}
+    parts = [json.dumps(part).encode('utf-8') for part in (header, parent or {}, {}, content or {})]
+    return list(idents) + [b'<IDS|MSG>', sign_message(key, parts)] + parts
+
+
+class MockKernel(object):
+    """Plays the role of a kernel, replying to the requests on its shell channel and publishing its status."""
+
+    def __init__(self):
+        self.key = str(uuid.uuid4())
+        self.requests = []
+        context = zmq.asyncio.Context.instance()
+        self.sockets = {channel: context.socket(zmq.PUB if channel == 'iopub' else zmq.ROUTER)
+                        for channel in ('shell', 'iopub', 'stdin', 'control', 'hb')}
+        self.connection_info = {'{}_port'.format(channel): socket.bind_to_random_port('tcp://127.0.0.1')
+                                for channel, socket in self.sockets.items()}
+        self.connection_info.update({'key': self.key, 'signature_scheme': 'hmac-sha256', 'transport': 'tcp'})
+        self.server = asyncio.ensure_future(self._serve())
+
+    async def _serve(self):
+        shell, iopub = self.sockets['shell'], self.sockets['iopub']
+        while True:
+            frames = await shell.recv_multipart()
+            i = frames.index(b'<IDS|MSG>')
+            header = json.loads(frames[i + 2].decode('utf-8'))
+            self.requests.append((header['msg_type'], frames[i + 1] == sign_message(self.key, frames[i + 2:i + 6])))
+            await iopub.send_multipart(build_message(self.key, 'status', parent=header,
+                                                     content={'execution_state': 'busy'}))
+            await shell.send_multipart(build_message(self.key, header['msg_type'].replace('_request', '_reply'),
+                                                     frames[:i], header, {'status': 'ok'}))
+            await iopub.send_multipart(build_message(self.key, 'status', parent=header,
+                                                     content={'execution_state': 'idle'}))
+
+    def close(self):
+        self.server.cancel()
+        for socket in self.sockets.values():
+            socket.close(linger=0)
@@ -0,0 +1,45 @@
+"""Tests the streaming parse of RM application lists"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import json
+import pytest
+
+from yarn_kernel_provider.applist import iter_applications
+
+
+def make_apps(count):
+    return [{'id': 'application_1_{:04d}'.format(i), 'name': 'kernel-{}'.format(i), 'state': 'RUNNING',
+             'user': 'alice', 'diagnostics': 'Line one\nLine "two" with ] and } characters ü',
+             'resourceRequests': [{'capability': {'memory': 1024, 'vCores': 1}}]} for i in range(count)]
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 100000])
+def test_projects_fields_across_chunks(chunk_size):
+    apps = make_apps(25)
+    body = json.dumps({'apps': {'app': apps}}, ensure_ascii=False).encode('utf-8')
+
+    parsed = list(iter_applications(chunked(body, chunk_size)))
+    assert parsed == [{'id': app['id'], 'name': app['name'], 'state': app['state']} for app in apps]
+
+
+def test_requested_fields():
+    body = json.dumps({'apps': {'app': make_apps(2)}}).encode('utf-8')
+    parsed = list(iter_applications(chunked(body, 10), fields=('id', 'user', 'queue')))
+    assert parsed[1] == {'id': 'application_1_0001', 'user': 'alice', 'queue': None}
+
+
+@pytest.mark.parametrize('body', [b'{"apps":null}', b'{"apps":{"app":[]}}', b'{"apps": {"app": [ ] } }'])
+def test_empty_lists(body):
+    assert list(iter_applications(chunked(body, 3))) == []
+
+
+def test_truncated_response_raises():
+    body = json.dumps({'apps': {'app': make_apps(3)}}).encode('utf-8')
+    with pytest.raises(ValueError):
+        list(iter_applications(chunked(body[:-40], 16)))
@@ -0,0 +1,53 @@
+"""Tests the relay of a kernel's channels while the kernel is disconnected"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+import json
+import zmq
+import zmq.asyncio
+
+from yarn_kernel_provider.channelproxy import KernelChannelProxy
+from yarn_kernel_provider.tests.stubs import MockKernel, build_message, run, sign_message
+
+
+def test_disconnected_relay_holds_requests_and_answers_shutdown():
+    requests = []
+
+    async def scenario():
+        kernel = MockKernel()
+        proxy = KernelChannelProxy('127.0.0.1', lambda: requests.append(len(proxy.pending)))
+        connection_info = await proxy.connect(dict(kernel.connection_info, ip='127.0.0.1'))
+        client = zmq.asyncio.Context.instance().socket(zmq.DEALER)
+        client.connect('tcp://127.0.0.1:{}'.format(connection_info['shell_port']))
+        try:
+            await proxy.disconnect()
+
+            # Shutdown requests are answered by the relay, without requesting the kernel
+            await client.send_multipart(build_message(kernel.key, 'shutdown_request', content={'restart': False}))
+            reply = await asyncio.wait_for(client.recv_multipart(), 5)
+            assert reply[1] == sign_message(kernel.key, reply[2:6])
+            assert json.loads(reply[2].decode('utf-8'))['msg_type'] == 'shutdown_reply'
+            assert json.loads(reply[5].decode('utf-8')) == {'status': 'ok', 'restart': False}
+            assert not requests
+
+            # Other requests are held until a kernel is connected
+            await client.send_multipart(build_message(kernel.key, 'execute_request', content={'code': '1'}))
+            await asyncio.wait_for(_until(lambda: requests), 5)
+            assert requests == [1] and not kernel.requests
+            await proxy.connect(dict(kernel.connection_info, ip='127.0.0.1'))
+            reply = await asyncio.wait_for(client.recv_multipart(), 5)
+            assert json.loads(reply[2].decode('utf-8'))['msg_type'] == 'execute_reply'
+            assert kernel.requests == [('execute_request', True)]
+        finally:
+            client.close(linger=0)
+            await proxy.close()
+            kernel.close()
+
+    run(scenario())
+
+
+async def _until(condition):
+    while not condition():
+        await asyncio.sleep(0.05)
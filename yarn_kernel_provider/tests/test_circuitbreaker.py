@@ -0,0 +1,49 @@
+"""Tests the circuit breaker guarding RM requests"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import mock
+
+from yarn_kernel_provider.circuitbreaker import CircuitBreaker, get_circuit_breaker
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker('rm', failure_threshold=3, reset_timeout=60.0)
+    for _ in range(2):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    breaker.record_success()  # a success resets the count
+
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open
+    assert breaker.allow_request() is False
+    assert breaker.rejected == 1
+
+
+def test_half_open_probe():
+    breaker = CircuitBreaker('rm', failure_threshold=1, reset_timeout=10.0)
+    with mock.patch('time.monotonic', return_value=100.0):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with mock.patch('time.monotonic', return_value=111.0):
+        assert breaker.allow_request()  # the probe
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request() is False  # only a single probe is permitted
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+    with mock.patch('time.monotonic', return_value=122.0):
+        assert breaker.allow_request()
+        breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_breakers_are_shared_by_name():
+    assert get_circuit_breaker('http://rm1:8088') is get_circuit_breaker('http://rm1:8088')
+    assert get_circuit_breaker('http://rm1:8088') is not get_circuit_breaker('http://rm2:8088')
@@ -0,0 +1,138 @@
+"""Tests the routing of kernel launches across a pool of YARN clusters"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import mock
+import pytest
+
+from tornado import web
+from yarn_api_client.errors import APIError
+
+from yarn_kernel_provider import clusters, yarn
+from yarn_kernel_provider.tests.stubs import MockKernelManager, MockResourceManager, MockResponse, run
+
+
+class MockClusterResourceManager(MockResourceManager):
+    def __init__(self, service_endpoints=None, auth=None):
+        super(MockClusterResourceManager, self).__init__(service_endpoints, auth)
+        self.endpoint = service_endpoints[0]
+        self.metrics = {'availableMB': 0, 'totalMB': 1024, 'availableVirtualCores': 0, 'totalVirtualCores': 8}
+
+    def get_active_endpoint(self):
+        return self.endpoint
+
+    def cluster_metrics(self):
+        self._request('cluster_metrics')
+        return MockResponse({'clusterMetrics': self.metrics})
+
+
+clusters_config = {
+    'east': {'yarn_endpoint': 'http://east:8088', 'env': {'HADOOP_CONF_DIR': '/etc/hadoop/east'}},
+    'west': {'yarn_endpoint': 'http://west:8088', 'env': {'HADOOP_CONF_DIR': '/etc/hadoop/west'}},
+}
+
+
+@pytest.fixture()
+def registry():
+    registry = clusters.YarnClusterRegistry()
+    with mock.patch.object(clusters, 'ResourceManager', MockClusterResourceManager), \
+            mock.patch.object(clusters, 'yarn_cluster_registry', registry), \
+            mock.patch.object(yarn, 'yarn_cluster_registry', registry):
+        registry.configure(clusters_config)
+        yield registry
+
+
+def set_metrics(cluster, available_mb, available_vcores):
+    cluster.resource_mgr.metrics.update({'availableMB': available_mb, 'availableVirtualCores': available_vcores})
+    cluster.metrics_time = None
+
+
+def test_select_cluster_by_headroom(registry):
+    east, west = registry.get_cluster('east'), registry.get_cluster('west')
+    set_metrics(east, 256, 6)
+    set_metrics(west, 768, 6)
+    assert run(registry.select_cluster(['east', 'west'])) is west
+
+    # Headroom is the lower of the memory and vcore fractions
+    set_metrics(west, 768, 1)
+    assert run(registry.select_cluster(['east', 'west'])) is east
+
+
+def test_select_cluster_weighs_launch_latency(registry):
+    east, west = registry.get_cluster('east'), registry.get_cluster('west')
+    set_metrics(east, 512, 4)
+    set_metrics(west, 640, 5)
+    west.record_launch(120.0)
+    assert run(registry.select_cluster(['east', 'west'])) is east
+
+
+def test_select_cluster_uses_cached_metrics(registry):
+    east = registry.get_cluster('east')
+    set_metrics(east, 512, 4)
+    run(registry.select_cluster(['east']))
+    run(registry.select_cluster(['east']))
+    assert east.resource_mgr.calls == ['cluster_metrics']
+
+
+def test_select_cluster_skips_unavailable(registry):
+    east, west = registry.get_cluster('east'), registry.get_cluster('west')
+    set_metrics(west, 512, 4)
+    east.resource_mgr.available = False
+    assert run(registry.select_cluster(['unknown', 'east', 'west'])) is west
+    assert run(registry.select_cluster(['unknown'])) is None
+
+
+def test_client_errors_of_metrics_queries_leave_breaker_closed(registry):
+    east = registry.get_cluster('east')
+
+    def cluster_metrics():
+        raise APIError("Response finished with status: 403. Details: Forbidden")
+
+    east.resource_mgr.cluster_metrics = cluster_metrics
+    for i in range(east.breaker.failure_threshold):
+        east.metrics_time = None
+        run(east.refresh_metrics())
+    assert east.metrics is None
+    assert not east.breaker.is_open
+
+
+def test_lifecycle_info_records_cluster(registry):
+    set_metrics(registry.get_cluster('east'), 128, 1)
+    set_metrics(registry.get_cluster('west'), 512, 4)
+    kernel_manager = MockKernelManager(provider_config={'yarn_clusters': clusters_config})
+    manager = yarn.YarnKernelLifecycleManager(kernel_manager, {'yarn_cluster_pool': 'east, west'})
+    assert manager.yarn_cluster_pool == ['east', 'west']
+    assert manager.resource_mgr is None
+
+    run(manager._select_cluster())
+    assert manager.rm_addr == 'http://west:8088'
+    manager.application_id = 'application_1_0001'
+    lifecycle_info = manager.get_lifecycle_info()
+    assert lifecycle_info['yarn_cluster'] == 'west'
+
+    # Reconnecting managers are bound to the recorded cluster rather than re-routed
+    restored = yarn.YarnKernelLifecycleManager(kernel_manager, {'yarn_cluster_pool': ['east', 'west']})
+    restored.load_lifecycle_info(lifecycle_info)
+    assert restored.resource_mgr is registry.get_cluster('west').resource_mgr
+
+    lifecycle_info['yarn_cluster'] = 'north'
+    with pytest.raises(web.HTTPError) as ex:
+        restored.load_lifecycle_info(lifecycle_info)
+    assert ex.value.status_code == 500
+
+
+def test_unbound_pool_manager_has_no_application(registry):
+    kernel_manager = MockKernelManager(provider_config={'yarn_clusters': clusters_config})
+    manager = yarn.YarnKernelLifecycleManager(kernel_manager, {'yarn_cluster_pool': ['east', 'west']})
+
+    # Failure and cleanup paths may poll, kill or wait before the kernel has been routed, or once routing has
+    # failed, which find no application rather than raising.
+    assert manager.poll() is False
+    manager.application_id = 'application_1_0001'
+    assert manager.poll() is False
+    assert run(manager.wait()) is None
+    run(manager.kill())
+    assert manager._query_app_by_name(manager.kernel_id) is None
+    for cluster in registry.clusters.values():
+        assert cluster.resource_mgr.calls == []
@@ -67,6 +67,9 @@ def test_create_kernelspec(script_runner, mock_kernels_dir):
         kernel_json = json.load(fd)
         assert kernel_json["env"]["SPARK_HOME"] == '/foo/bar'
         assert kernel_json["metadata"]["lifecycle_manager"]["config"]["yarn_endpoint"] == 'http://acme.com:9999'
+        launch_argv = kernel_json["metadata"]["lifecycle_manager"]["config"]["launch"]["argv"]
+        assert launch_argv[0] == '/foo/bar/bin/spark-submit'
+        assert os.path.isfile(launch_argv[3])
 
 
 def test_create_python_kernelspec(script_runner, mock_kernels_dir):
@@ -128,6 +131,9 @@ def test_create_scala_kernelspec(script_runner, mock_kernels_dir):
         kernel_json = json.load(fd)
         assert kernel_json["display_name"] == 'My Scala Kernel'
         assert '--MyExtraSparkOpts' in kernel_json["env"]["__TOREE_SPARK_OPTS__"]
+        launch_argv = kernel_json["metadata"]["lifecycle_manager"]["config"]["launch"]["argv"]
+        assert os.path.basename(launch_argv[4]).startswith('toree-assembly-')
+        assert os.path.isfile(launch_argv[4]) and os.path.isfile(launch_argv[7])
 
 
 def test_create_dask_kernelspec(script_runner, mock_kernels_dir):
@@ -151,5 +157,24 @@ def test_create_dask_kernelspec(script_runner, mock_kernels_dir):
         assert kernel_json["display_name"] == 'My Dask Kernel'
         assert kernel_json["env"]["SPARK_HOME"] == '/bar/dask'
         assert kernel_json["env"]["DASK_YARN_EXE"] == '/usr/bogus/bin/dask-yarn'
+        assert kernel_json["metadata"]["lifecycle_manager"]["config"]["shared_skein_driver"] is False
         argv = kernel_json["argv"]
         assert argv[len(argv) - 1] == 'none'
+
+
+def test_create_dask_kernelspec_shared_driver(script_runner, mock_kernels_dir):
+    my_env = os.environ.copy()
+    my_env.update({"JUPYTER_DATA_DIR": mock_kernels_dir})
+    ret = script_runner.run('jupyter', 'yarn-kernelspec', 'install', '--dask', '--shared-skein-driver',
+                            '--python_root=/usr/bogus', '--user', env=my_env)
+    assert ret.success
+
+    with open(os.path.join(mock_kernels_dir, 'kernels', 'yarnkp_dask_python', 'yarnkp_kernel.json'), "r") as fd:
+        kernel_json = json.load(fd)
+        assert kernel_json["metadata"]["lifecycle_manager"]["config"]["shared_skein_driver"] is True
+        assert kernel_json["env"]["DASK_YARN_PYTHON"] == '/usr/bogus/bin/python'
+        launch_argv = kernel_json["metadata"]["lifecycle_manager"]["config"]["launch"]["argv"]
+        assert launch_argv[0]["then"] == ['/usr/bogus/bin/python', os.path.join(mock_kernels_dir, 'kernels',
+                                                                                'yarnkp_dask_python', 'bin',
+                                                                                'dask_submit.py')]
+    assert os.path.isfile(os.path.join(mock_kernels_dir, 'kernels', 'yarnkp_dask_python', 'bin', 'dask_submit.py'))
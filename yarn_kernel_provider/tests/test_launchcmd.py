@@ -0,0 +1,67 @@
+"""Tests the submitter commands built from kernelspecs' launch descriptions"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import pytest
+
+from yarn_kernel_provider.launchcmd import build_launch_argv, expand_variables, split_options
+
+
+def test_expand_variables():
+    env = {'KERNEL_ID': 'abc', 'EMPTY': ''}
+    assert expand_variables('--name ${KERNEL_ID}', env) == '--name abc'
+    assert expand_variables('$KERNEL_ID/${MISSING}', env) == 'abc/'
+    assert expand_variables('${EMPTY:-$KERNEL_ID}', env) == 'abc'
+    assert expand_variables('${MISSING:-ERROR__NO__KERNEL_ID}', env) == 'ERROR__NO__KERNEL_ID'
+
+
+def test_split_options_as_shell_would():
+    env = {'KERNEL_ID': 'abc', 'EXTRA': ' --queue etl  --conf a=b ', 'PATH': '/bin:/usr/bin'}
+    options = '--name ${KERNEL_ID:-none} --conf "x=y z" ${EXTRA} ${MISSING} --conf p=/opt/bin:$PATH \'$literal\' ""'
+    assert split_options(options, env) == ['--name', 'abc', '--conf', 'x=y z', '--queue', 'etl', '--conf', 'a=b',
+                                           '--conf', 'p=/opt/bin:/bin:/usr/bin', '$literal', '']
+    assert split_options('', env) == []
+    with pytest.raises(ValueError):
+        split_options('--conf "unbalanced', env)
+
+
+def test_split_options_expands_braced_references_as_a_unit():
+    # As with the shell, an unquoted reference's default may hold whitespace, its expansion then being split
+    env = {'B': 'set'}
+    assert split_options('${C:-def ault}', env) == ['def', 'ault']
+    assert split_options('x=${C:-a b}y ${B:-c d}', env) == ['x=a', 'by', 'set']
+    assert split_options('"${C:-def ault}"', env) == ['def ault']
+    with pytest.raises(ValueError):
+        split_options('${C:-unclosed', env)
+
+
+def test_split_options_keeps_escaped_and_single_quoted_references():
+    # As with the shell, escaped and single-quoted references are literal, while \\ is a literal backslash
+    env = {'X': 'expanded', 'HOME': '/home/alice'}
+    assert split_options('"\\$X"', env) == ['$X']
+    assert split_options("'$X'", env) == ['$X']
+    assert split_options('\\$X', env) == ['$X']
+    assert split_options('"a=\\${X}/$X"', env) == ['a=${X}/expanded']
+    assert split_options('"\\\\$HOME"', env) == ['\\/home/alice']
+
+
+def test_build_launch_argv():
+    launch = {'argv': [
+        {'if_env': 'SKEIN_DRIVER_ADDRESS', 'then': ['python', 'dask_submit.py'], 'else': ['dask-yarn']},
+        'submit', {'env': ['DASK_OPTS', 'DEFAULT_DASK_OPTS']}, {'impersonation': '--user'}, 'launch_ipykernel.py',
+        {'env': 'LAUNCH_OPTS'}]}
+    kernel_args = ['--RemoteProcessProxy.kernel-id', 'abc']
+    env = {'DEFAULT_DASK_OPTS': '--name ${KERNEL_ID}', 'KERNEL_ID': 'abc', 'LAUNCH_OPTS': ''}
+
+    assert build_launch_argv(launch, kernel_args, env) == \
+        ['dask-yarn', 'submit', '--name', 'abc', 'launch_ipykernel.py'] + kernel_args
+
+    env.update({'SKEIN_DRIVER_ADDRESS': 'localhost:1234', 'DASK_OPTS': '--deploy-mode remote',
+                'EG_IMPERSONATION_ENABLED': 'True'})
+    assert build_launch_argv(launch, kernel_args, env) == \
+        ['python', 'dask_submit.py', 'submit', '--deploy-mode', 'remote', '--user', 'UNSPECIFIED',
+         'launch_ipykernel.py'] + kernel_args
+
+    with pytest.raises(ValueError):
+        build_launch_argv({'argv': [{'bogus': 1}]}, kernel_args, env)
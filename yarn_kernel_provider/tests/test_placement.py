@@ -0,0 +1,38 @@
+"""Tests the selection of the node label on which a kernel's application master is placed"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from yarn_kernel_provider.placement import NodeSnapshot, select_node_label
+
+
+def node(label, used_mb, avail_mb, used_vcores, avail_vcores, state='RUNNING'):
+    return {'state': state, 'nodeLabels': [label] if label else [], 'usedMemoryMB': used_mb,
+            'availMemoryMB': avail_mb, 'usedVirtualCores': used_vcores, 'availableVirtualCores': avail_vcores}
+
+
+def test_select_least_loaded_label():
+    snapshot = NodeSnapshot([
+        node('gpu', 6144, 2048, 6, 2),
+        node('gpu', 7168, 1024, 7, 1),
+        node('', 2048, 6144, 2, 6),
+        node('', 4096, 4096, 2, 6),
+    ])
+    label, score = select_node_label(snapshot, memory_mb=1024, vcores=1)
+    assert label == ''
+    assert abs(score - 0.625) < 1e-6
+
+    # Candidate labels restrict the selection
+    assert select_node_label(snapshot, memory_mb=1024, vcores=1, labels=['gpu'])[0] == 'gpu'
+
+
+def test_nodes_unable_to_host_am_are_ignored():
+    snapshot = NodeSnapshot([
+        node('big', 4096, 12288, 8, 8),
+        node('small', 0, 2048, 0, 4),
+        node('small', 0, 2048, 0, 4, state='UNHEALTHY'),
+    ])
+    assert select_node_label(snapshot, memory_mb=1024, vcores=1)[0] == 'small'
+    assert select_node_label(snapshot, memory_mb=4096, vcores=1)[0] == 'big'
+    assert select_node_label(snapshot, memory_mb=16384, vcores=1) == (None, None)
+    assert len(snapshot.partitions['small']) == 1
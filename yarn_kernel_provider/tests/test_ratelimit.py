@@ -0,0 +1,64 @@
+"""Tests the prioritized rate limiting of RM requests"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+
+from yarn_kernel_provider.ratelimit import RequestPriority, RequestRateLimiter
+
+
+def run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_disabled_limiter_admits_everything():
+    limiter = RequestRateLimiter(rate=0, burst=1)
+    assert all(limiter.try_acquire(RequestPriority.POLL) for _ in range(100))
+    run(limiter.acquire(RequestPriority.KILL))
+
+
+def test_burst_then_refusal():
+    limiter = RequestRateLimiter(rate=1, burst=3)
+    assert [limiter.try_acquire(RequestPriority.POLL) for _ in range(4)] == [True, True, True, False]
+
+    metrics = limiter.get_metrics()
+    assert metrics['priorities']['poll']['granted'] == 3
+    assert metrics['priorities']['poll']['refused'] == 1
+
+
+def test_queued_requests_served_by_priority():
+    limiter = RequestRateLimiter(rate=50, burst=1)
+    assert limiter.try_acquire(RequestPriority.POLL)
+    order = []
+
+    async def request(priority):
+        await limiter.acquire(priority)
+        order.append(priority)
+
+    async def storm():
+        tasks = [asyncio.ensure_future(request(priority)) for priority in
+                 (RequestPriority.POLL, RequestPriority.DISCOVERY, RequestPriority.KILL)]
+        await asyncio.sleep(0)
+        # Liveness polls are refused while higher priority requests are waiting
+        assert limiter.try_acquire(RequestPriority.POLL) is False
+        assert limiter.get_metrics()['priorities']['kill']['queue_depth'] == 1
+        await asyncio.gather(*tasks)
+
+    run(storm())
+    assert order == [RequestPriority.KILL, RequestPriority.DISCOVERY, RequestPriority.POLL]
+    assert limiter.get_metrics()['priorities']['kill']['max_queue_depth'] == 1
+
+
+def test_cancelled_waiter_is_skipped():
+    limiter = RequestRateLimiter(rate=50, burst=1)
+    assert limiter.try_acquire(RequestPriority.POLL)
+
+    async def cancel_then_acquire():
+        waiter = asyncio.ensure_future(limiter.acquire(RequestPriority.KILL))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.wait_for(limiter.acquire(RequestPriority.POLL), 1)
+
+    run(cancel_then_acquire())
+    assert limiter.granted[RequestPriority.KILL] == 0
@@ -0,0 +1,87 @@
+"""Tests the fair queuing of kernel launches across users"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+import pytest
+
+from yarn_kernel_provider.scheduler import LaunchScheduler, parse_weights
+from yarn_kernel_provider.tests.stubs import run
+
+
+async def launch(scheduler, user, admitted, duration=0.01):
+    await scheduler.admit(user)
+    admitted.append(user)
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        scheduler.release(user)
+
+
+def test_light_user_admitted_during_burst():
+    scheduler = LaunchScheduler(max_launches=2, weights={})
+    admitted = []
+
+    async def launches():
+        burst = [asyncio.ensure_future(launch(scheduler, 'alice', admitted)) for _ in range(10)]
+        await asyncio.sleep(0)
+        light = asyncio.ensure_future(launch(scheduler, 'bob', admitted))
+        await asyncio.gather(light, *burst)
+
+    run(launches())
+    assert admitted.index('bob') <= 3
+    metrics = scheduler.get_metrics()
+    assert metrics['users']['alice']['admitted'] == 10
+    assert metrics['users']['bob']['max_wait_time'] < metrics['users']['alice']['max_wait_time']
+    assert metrics['active'] == metrics['queued'] == 0
+
+
+def test_weights_and_user_caps():
+    scheduler = LaunchScheduler(max_launches=1, max_user_launches=1, weights={'alice': 2.0})
+    admitted = []
+
+    async def launches():
+        tasks = [asyncio.ensure_future(launch(scheduler, user, admitted)) for user in ['alice'] * 4 + ['bob'] * 4]
+        await asyncio.gather(*tasks)
+
+    run(launches())
+    # With twice bob's weight, alice's launches are admitted at twice bob's rate while both are queued
+    assert admitted[:6].count('alice') == 4
+
+
+def test_user_cap_without_global_limit():
+    scheduler = LaunchScheduler(max_launches=0, max_user_launches=2, weights={})
+    admitted = []
+
+    async def launches():
+        tasks = [asyncio.ensure_future(launch(scheduler, 'alice', admitted, duration=0.1)) for _ in range(3)]
+        bob = asyncio.ensure_future(launch(scheduler, 'bob', admitted, duration=0.1))
+        await asyncio.sleep(0.05)
+        assert scheduler.get_metrics()['users']['alice']['queued'] == 1
+        assert admitted.count('bob') == 1
+        await asyncio.gather(bob, *tasks)
+
+    run(launches())
+
+
+def test_cancelled_launch_leaves_queue():
+    scheduler = LaunchScheduler(max_launches=1, weights={})
+
+    async def launches():
+        await scheduler.admit('alice')
+        queued = asyncio.ensure_future(scheduler.admit('bob'))
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert scheduler.get_metrics()['queued'] == 0
+        scheduler.release('alice')
+        assert scheduler.get_metrics()['active'] == 0
+
+    run(launches())
+
+
+def test_parse_weights():
+    assert parse_weights('') == {}
+    assert parse_weights('etl=0.5, alice=2') == {'etl': 0.5, 'alice': 2.0}
@@ -0,0 +1,102 @@
+"""Tests the cache of active applications shared by the server processes of a host"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import mock
+import pytest
+import time
+
+from yarn_kernel_provider import sharedcache
+from yarn_kernel_provider.circuitbreaker import CircuitBreaker
+from yarn_kernel_provider.sharedcache import SharedApplicationCache
+from yarn_kernel_provider.tests.stubs import MockResourceManager, MockStreamedResponse, run
+
+rm_addr = 'http://localhost:8088'
+
+
+@pytest.fixture()
+def caches(tmp_path):
+    rm = MockResourceManager()
+    rm.add_app('application_1_0001', 'kernel-1', state='RUNNING')
+    rm.add_app('application_1_0002', 'kernel-2', state='ACCEPTED')
+    socket_path = str(tmp_path / 'yarn.sock')
+    caches = [SharedApplicationCache(socket_path=socket_path, interval=1.0) for i in range(2)]
+    for cache in caches:
+        # Each process watches the RM of its kernels
+        cache.resource_managers[rm_addr] = (rm, CircuitBreaker(rm_addr))
+    yield caches
+    for cache in caches:
+        run(cache.close())
+
+
+def test_followers_share_leader_snapshot(caches):
+    leader, follower = caches
+    rm = leader.resource_managers[rm_addr][0]
+    run(leader._run_once())
+    run(follower._run_once())
+
+    assert leader.is_leader and not follower.is_leader
+    assert rm.calls == ['cluster_applications']
+    assert follower.get_state(rm_addr, 'application_1_0001') == 'RUNNING'
+    assert follower.get_state(rm_addr, 'application_1_0002') == 'ACCEPTED'
+    assert follower.get_state(rm_addr, 'application_1_0003') is None
+    assert follower.get_state('http://other:8088', 'application_1_0001') is None
+
+
+def test_leader_refreshes_rms_requested_by_followers(caches):
+    leader, follower = caches
+    other_addr = 'http://other:8088'
+    other_rm = MockResourceManager()
+    other_rm.add_app('application_2_0001', 'kernel-3', state='RUNNING')
+    follower.resource_managers[other_addr] = (MockResourceManager(), CircuitBreaker(other_addr))
+
+    create_resource_manager = mock.Mock(return_value=other_rm)
+    with mock.patch.object(sharedcache, 'create_resource_manager', create_resource_manager):
+        run(leader._run_once())
+        run(follower._run_once())  # names the other RM, on which the leader has no kernels
+        assert follower.get_state(other_addr, 'application_2_0001') is None
+        run(leader._run_once())
+        run(follower._run_once())
+
+    create_resource_manager.assert_called_once_with(other_addr, None, False)
+    assert other_rm.calls == ['cluster_applications']
+    assert follower.resource_managers[other_addr][0].calls == []
+    assert follower.get_state(other_addr, 'application_2_0001') == 'RUNNING'
+
+
+def test_follower_takes_over_from_exited_leader(caches):
+    leader, follower = caches
+    rm = leader.resource_managers[rm_addr][0]
+    run(leader._run_once())
+    run(leader.close())
+    run(follower._run_once())
+
+    assert follower.is_leader
+    assert rm.calls == ['cluster_applications'] * 2
+    assert follower.get_state(rm_addr, 'application_1_0001') == 'RUNNING'
+
+
+def test_stale_snapshots_are_not_used(caches):
+    leader = caches[0]
+    run(leader._run_once())
+    leader.snapshots[rm_addr]['time'] = time.time() - 2.5
+    assert leader.get_state(rm_addr, 'application_1_0001') is None
+
+
+def test_refresh_failures_classified_as_for_lifecycle_managers(caches):
+    leader = caches[0]
+    rm, breaker = leader.resource_managers[rm_addr]
+    breaker.failure_threshold = 1
+
+    # Errors reported by the RM itself, other than server errors, don't count against its availability
+    response = MockStreamedResponse({})
+    response.status_code, response.text = 403, 'Forbidden'
+    rm.get = lambda url, params=None, **kwargs: response
+    run(leader._run_once())
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert rm_addr not in leader.snapshots
+
+    response.status_code, response.text = 503, 'Service Unavailable'
+    run(leader._run_once())
+    assert breaker.state == CircuitBreaker.OPEN
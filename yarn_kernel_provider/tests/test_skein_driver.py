@@ -0,0 +1,76 @@
+"""Tests the management of the skein driver shared by Dask kernels"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import mock
+import pytest
+import sys
+
+from yarn_kernel_provider import skein_driver as driver_module
+from yarn_kernel_provider.skein_driver import SkeinDriverManager
+from yarn_kernel_provider.tests.stubs import run
+
+
+class MockSkein(object):
+    """Stands in for the skein module, whose Client pings the driver at `address` upon construction."""
+
+    def __init__(self):
+        skein = self
+        self.running = set()
+        self.started = 0
+        self.fail_start = False
+
+        class Client(object):
+            def __init__(self, address=None):
+                if address not in skein.running:
+                    raise ConnectionError("Unable to connect to driver at {}".format(address))
+
+            @staticmethod
+            def start_global_driver(**kwargs):
+                if skein.fail_start:
+                    raise ConnectionError("Unable to connect to the global driver")
+                skein.started += 1
+                address = 'localhost:{}'.format(40000 + skein.started)
+                skein.running.add(address)
+                return address
+
+            @staticmethod
+            def stop_global_driver(force=False):
+                skein.running.clear()
+
+        self.Client = Client
+
+
+@pytest.fixture()
+def skein():
+    skein = MockSkein()
+    with mock.patch.dict(sys.modules, {'skein': skein}):
+        yield skein
+
+
+def test_driver_started_once_and_restarted(skein):
+    manager = SkeinDriverManager()
+    assert run(manager.get_address()) == 'localhost:40001'
+    assert run(manager.get_address()) == 'localhost:40001'
+    assert skein.started == 1
+
+    # Once the check interval has elapsed the driver is pinged, and restarted should it not respond
+    manager.checked_time = None
+    assert run(manager.get_address()) == 'localhost:40001'
+    skein.running.clear()
+    manager.checked_time = None
+    assert run(manager.get_address()) == 'localhost:40002'
+    assert manager.starts == 2
+
+
+def test_driver_unavailable(skein):
+    skein.fail_start = True
+    manager = SkeinDriverManager()
+    assert run(manager.get_address()) is None
+
+    # Failed starts are not retried until the check interval has elapsed
+    skein.fail_start = False
+    assert run(manager.get_address()) is None
+    with mock.patch.object(driver_module, 'skein_driver_check_interval', 0):
+        assert run(manager.get_address()) == 'localhost:40001'
@@ -0,0 +1,92 @@
+"""Tests the aggregated snapshot of the server's YARN kernels"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import mock
+import pytest
+
+from yarn_kernel_provider import clusters, snapshot, yarn
+from yarn_kernel_provider.circuitbreaker import CircuitBreaker
+from yarn_kernel_provider.tests.stubs import MockKernelManager, MockResourceManager, run
+
+
+def create_lifecycle_manager():
+    manager = yarn.YarnKernelLifecycleManager(MockKernelManager(), {})
+    manager.rm_breaker = CircuitBreaker(manager.rm_addr, failure_threshold=1, reset_timeout=60.0)
+    return manager
+
+
+@pytest.fixture()
+def lifecycle_managers():
+    rm = MockResourceManager()
+    with mock.patch.object(snapshot, '_lifecycle_managers', snapshot.weakref.WeakValueDictionary()), \
+            mock.patch.object(clusters, 'ResourceManager', lambda **kwargs: rm):
+        yield [create_lifecycle_manager() for i in range(3)]
+
+
+def test_snapshot_uses_single_query(lifecycle_managers):
+    rm = lifecycle_managers[0].resource_mgr
+    first, second, third = lifecycle_managers
+    first.application_id = 'application_1_0001'
+    rm.add_app('application_1_0001', first.kernel_id, state='RUNNING', host='node1', queue='default',
+               allocatedMB=2048, allocatedVCores=2, elapsedTime=65000)
+    # The second kernel's application is found by name, its most recent launch being reported
+    rm.add_app('application_1_0002', second.kernel_id, state='KILLED', queue='default')
+    rm.add_app('application_1_0003', 'spark-' + second.kernel_id, state='ACCEPTED', queue='etl')
+    rm.add_app('application_1_0004', 'unrelated', state='RUNNING')
+
+    result = run(snapshot.ClusterSnapshot().get_snapshot())
+    assert rm.calls == ['cluster_applications']
+
+    kernels = {entry['kernel_id']: entry for entry in result['kernels']}
+    assert kernels[first.kernel_id]['state'] == 'RUNNING'
+    assert kernels[first.kernel_id]['am_host'] == 'node1'
+    assert kernels[first.kernel_id]['allocated_mb'] == 2048
+    assert kernels[first.kernel_id]['allocated_vcores'] == 2
+    assert kernels[first.kernel_id]['elapsed_time'] == 65.0
+    assert kernels[second.kernel_id]['application_id'] == 'application_1_0003'
+    assert kernels[second.kernel_id]['queue'] == 'etl'
+    assert kernels[third.kernel_id]['application_id'] is None
+    assert kernels[third.kernel_id]['stale']
+    assert first.last_known_state == 'RUNNING'
+
+
+def test_snapshot_is_cached(lifecycle_managers):
+    rm = lifecycle_managers[0].resource_mgr
+    cluster_snapshot = snapshot.ClusterSnapshot()
+    run(cluster_snapshot.get_snapshot())
+    run(cluster_snapshot.get_snapshot())
+    assert rm.calls == ['cluster_applications']
+
+    with mock.patch.object(snapshot, 'snapshot_ttl', 0.0):
+        run(cluster_snapshot.get_snapshot())
+    assert rm.calls == ['cluster_applications'] * 2
+
+
+def test_snapshot_uses_last_known_states_when_rm_unavailable(lifecycle_managers):
+    rm = lifecycle_managers[0].resource_mgr
+    first = lifecycle_managers[0]
+    first.application_id = 'application_1_0001'
+    first.last_known_state = 'RUNNING'
+    rm.available = False
+
+    result = run(snapshot.ClusterSnapshot().get_snapshot())
+    entry = [entry for entry in result['kernels'] if entry['kernel_id'] == first.kernel_id][0]
+    assert entry['state'] == 'RUNNING'
+    assert entry['stale']
+    assert first.rm_breaker.is_open
+
+
+def test_discarded_kernels_leave_snapshot(lifecycle_managers):
+    del lifecycle_managers[1:]
+    result = run(snapshot.ClusterSnapshot().get_snapshot())
+    assert [entry['kernel_id'] for entry in result['kernels']] == [lifecycle_managers[0].kernel_id]
+
+
+def test_cleaned_up_kernels_leave_snapshot(lifecycle_managers):
+    first, second = lifecycle_managers[:2]
+    run(second.cleanup())
+    result = run(snapshot.ClusterSnapshot().get_snapshot())
+    assert second.kernel_id not in [entry['kernel_id'] for entry in result['kernels']]
+    assert first.kernel_id in [entry['kernel_id'] for entry in result['kernels']]
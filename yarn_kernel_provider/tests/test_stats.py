@@ -0,0 +1,78 @@
+"""Tests the statistics of lifecycle operation durations"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from yarn_kernel_provider.stats import DurationStats, DurationStatsStore, get_duration_stats
+
+
+def test_percentiles():
+    stats = DurationStats()
+    assert stats.percentile(95) is None
+    for duration in range(1, 21):
+        stats.record(float(duration))
+    assert stats.percentile(50) == 10.0
+    assert stats.percentile(95) == 19.0
+    assert stats.percentile(100) == 20.0
+    assert stats.percentile(0) == 1.0
+
+
+def test_samples_are_bounded():
+    stats = DurationStats(max_samples=3)
+    for duration in (9.0, 1.0, 2.0, 3.0):
+        stats.record(duration)
+    assert len(stats) == 3
+    assert stats.percentile(100) == 3.0
+
+
+def test_stats_per_cluster_and_operation():
+    stats = get_duration_stats('http://stats:8088', 'shutdown')
+    assert get_duration_stats('http://stats:8088', 'shutdown') is stats
+    assert get_duration_stats('http://stats:8088', 'kill') is not stats
+    assert get_duration_stats('http://other:8088', 'shutdown') is not stats
+
+
+def test_store_persists_samples(tmp_path):
+    path = str(tmp_path / 'stats' / 'launch_stats.json')
+    store = DurationStatsStore(path=path, save_interval=0.0)
+    store.get('http://stats:8088|spark_python|etl', 'launch').record(42.0)
+    store.get('http://stats:8088|spark_python|etl', 'launch').record(30.1234)
+
+    reloaded = DurationStatsStore(path=path)
+    stats = reloaded.get('http://stats:8088|spark_python|etl', 'launch')
+    assert list(stats.samples) == [42.0, 30.123]
+    stats.record(12.0)
+    assert reloaded.dirty
+
+
+def test_store_evicts_least_recently_updated(tmp_path):
+    store = DurationStatsStore(path=str(tmp_path / 'launch_stats.json'), max_keys=2, save_interval=60.0)
+    store.get('a', 'launch').record(1.0)
+    store.get('b', 'launch').record(2.0)
+    store.get('a', 'launch').record(3.0)
+    store.get('c', 'launch').record(4.0)
+    assert list(store.entries) == ['a', 'c']
+    store.save()
+
+    reloaded = DurationStatsStore(path=store.path)
+    assert list(reloaded.get('a', 'launch').samples) == [1.0, 3.0]
+    assert len(reloaded.get('b', 'launch')) == 0
+
+
+def test_store_merges_samples_saved_by_other_processes(tmp_path):
+    path = str(tmp_path / 'launch_stats.json')
+    first = DurationStatsStore(path=path, save_interval=60.0)
+    second = DurationStatsStore(path=path, save_interval=60.0)
+    first.get('a', 'launch').record(1.0)
+    second.get('a', 'launch').record(2.0)
+    second.get('b', 'launch').record(3.0)
+    first.save()
+    second.save()
+    first.get('a', 'launch').record(4.0)
+    first.save()
+
+    assert list(first.get('a', 'launch').samples) == [1.0, 2.0, 4.0]
+    assert list(second.get('a', 'launch').samples) == [1.0, 2.0]
+    reloaded = DurationStatsStore(path=path)
+    assert list(reloaded.get('a', 'launch').samples) == [1.0, 2.0, 4.0]
+    assert list(reloaded.get('b', 'launch').samples) == [3.0]
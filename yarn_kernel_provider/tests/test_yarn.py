@@ -0,0 +1,654 @@
+"""Tests the YARN kernel lifecycle manager using a stubbed resource manager"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+import asyncio
+import json
+import mock
+import os
+import pytest
+import time
+import zmq
+import zmq.asyncio
+
+from tornado import web
+from yarn_api_client.errors import APIError
+
+from yarn_kernel_provider import clusters, yarn
+from yarn_kernel_provider.circuitbreaker import CircuitBreaker
+from yarn_kernel_provider.ratelimit import RequestRateLimiter
+from yarn_kernel_provider.stats import get_duration_stats
+from yarn_kernel_provider.tests.stubs import MockKernel, MockKernelManager, MockResourceManager, build_message, run, \
+    send_connection_info, sign_message
+
+
+@pytest.fixture()
+def lifecycle_manager():
+    with mock.patch.object(clusters, 'ResourceManager', MockResourceManager):
+        manager = yarn.YarnKernelLifecycleManager(MockKernelManager(), {})
+    manager.kernel_launch_timeout = 5.0
+    manager.rm_breaker = CircuitBreaker(manager.rm_addr, failure_threshold=2, reset_timeout=60.0)
+    # Connection info is sent in the clear by the tests' launcher
+    manager._decrypt = lambda data: data
+    yield manager
+    if manager.response_socket:
+        manager.response_socket.close()
+
+
+def test_startup_ready_on_connection_info(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0001', lifecycle_manager.kernel_id, state='RUNNING', host='localhost')
+
+    async def startup():
+        asyncio.ensure_future(send_connection_info(lifecycle_manager.kernel_manager.response_address))
+        await lifecycle_manager.confirm_remote_startup()
+
+    run(startup())
+    assert lifecycle_manager.application_id == 'application_1_0001'
+    assert lifecycle_manager.connection_info['ip'] == '127.0.0.1'
+    assert lifecycle_manager.assigned_host == 'localhost'
+
+
+def test_startup_resolves_host_after_connection_info(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+
+    async def startup():
+        # Connection info arrives before the application is listed, the host is then checked afterwards
+        asyncio.ensure_future(send_connection_info(lifecycle_manager.kernel_manager.response_address))
+        await asyncio.sleep(0.1)
+        rm.add_app('application_1_0002', lifecycle_manager.kernel_id, state='RUNNING', host='localhost')
+        await lifecycle_manager.confirm_remote_startup()
+
+    run(startup())
+    assert lifecycle_manager.connection_info['ip'] == '127.0.0.1'
+    assert lifecycle_manager.assigned_host == 'localhost'
+
+
+def test_startup_final_state_raises(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0003', lifecycle_manager.kernel_id, state='ACCEPTED')
+
+    async def startup():
+        # Transition to a final state once the application has been discovered
+        startup_task = asyncio.ensure_future(lifecycle_manager.confirm_remote_startup())
+        await asyncio.sleep(0.1)
+        rm.apps['application_1_0003']['state'] = 'KILLED'
+        await startup_task
+
+    with pytest.raises(web.HTTPError) as ex:
+        run(startup())
+    assert ex.value.status_code == 500
+    assert "unexpectedly found in state 'KILLED'" in ex.value.reason
+
+
+def launch_submitter(lifecycle_manager, script):
+    """Launches a shell script standing in for the submitter, capturing its output."""
+    lifecycle_manager.start_time = yarn.RemoteKernelLifecycleManager.get_current_time()
+    lifecycle_manager.local_proc = yarn.launch_kernel(['sh', '-c', script], stdout=yarn.PIPE, stderr=yarn.STDOUT)
+    lifecycle_manager.submitter_output = yarn.SubmitterOutputReader(lifecycle_manager.local_proc.stdout,
+                                                                    lifecycle_manager.log,
+                                                                    lifecycle_manager.kernel_id)
+
+
+def test_application_id_from_submitter_output(lifecycle_manager):
+    launch_submitter(lifecycle_manager, 'echo "Starting kernel"; '
+                                        'echo "INFO YarnClientImpl: Submitted application application_9_0001" >&2; '
+                                        'sleep 1')
+    run(asyncio.wait_for(lifecycle_manager.submitter_output.reported, 5))
+
+    assert lifecycle_manager._get_application_id(True) == 'application_9_0001'
+    assert 'cluster_applications' not in lifecycle_manager.resource_mgr.calls
+    run(lifecycle_manager.cleanup())
+
+
+def test_name_discovery_fallback(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_9_0002', lifecycle_manager.kernel_id)
+    launch_submitter(lifecycle_manager, 'echo "No application reported"')
+
+    assert lifecycle_manager._get_application_id(True) is None  # still awaiting the submitter
+    run(asyncio.wait_for(lifecycle_manager.submitter_output.reported, 5))
+    assert lifecycle_manager._get_application_id(True) == 'application_9_0002'
+    assert 'cluster_applications' in rm.calls
+    run(lifecycle_manager.cleanup())
+
+
+def test_launch_failure_includes_submitter_output(lifecycle_manager):
+    launch_submitter(lifecycle_manager, 'echo "Error: Cannot load main class from JAR" >&2; exit 3')
+    lifecycle_manager.local_proc.wait()
+
+    with pytest.raises(web.HTTPError) as ex:
+        lifecycle_manager.detect_launch_failure()
+    assert ex.value.status_code == 500
+    assert 'exit code: 3' in ex.value.reason
+    assert 'Cannot load main class from JAR' in ex.value.reason
+
+
+def test_failed_launch_logs_submitter_output(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0066', lifecycle_manager.kernel_id, state='FAILED')
+    kernel_cmd = ['sh', '-c', 'echo "WARN Client: Queue etl is at capacity"; '
+                              'echo "INFO Client: Submitted application application_1_0066"; sleep 1']
+
+    with mock.patch.object(lifecycle_manager.log, 'warning') as warning, pytest.raises(web.HTTPError):
+        run(lifecycle_manager.launch_process(kernel_cmd, env={'PATH': os.environ['PATH']}))
+    assert any('Queue etl is at capacity' in call[0][0] for call in warning.call_args_list)
+    run(lifecycle_manager.cleanup())
+
+
+def test_poll_uses_last_known_state_when_rate_limited(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_9_0003', lifecycle_manager.kernel_id, state='RUNNING')
+    lifecycle_manager.application_id = 'application_9_0003'
+
+    limiter = RequestRateLimiter(rate=0.001, burst=1)
+    with mock.patch.object(yarn, 'rm_rate_limiter', limiter):
+        assert lifecycle_manager.poll() is None
+        assert rm.calls == ['cluster_application_state']
+
+        # Refused polls answer from the last known state without contacting the RM
+        rm.apps['application_9_0003']['state'] = 'FINISHED'
+        assert lifecycle_manager.poll() is None
+        assert rm.calls == ['cluster_application_state']
+
+        lifecycle_manager.last_known_state = 'FINISHED'
+        assert lifecycle_manager.poll() is False
+
+
+def test_poll_uses_last_known_state_when_rm_unavailable(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_9_0004', lifecycle_manager.kernel_id, state='RUNNING')
+    lifecycle_manager.application_id = 'application_9_0004'
+    assert lifecycle_manager.poll() is None
+
+    rm.available = False
+    assert lifecycle_manager.poll() is None
+    assert lifecycle_manager.poll() is None
+    assert lifecycle_manager.rm_breaker.state == CircuitBreaker.OPEN
+
+    # While the circuit is open the RM is not contacted at all
+    calls = len(rm.calls)
+    assert lifecycle_manager.poll() is None
+    assert lifecycle_manager._query_app_by_id('application_9_0004') is None
+    assert len(rm.calls) == calls
+
+
+def test_poll_regards_unknown_application_as_ended(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_9_0005', lifecycle_manager.kernel_id, state='RUNNING')
+    lifecycle_manager.application_id = 'application_9_0005'
+    assert lifecycle_manager.poll() is None
+
+    # A 404 lacking the RM's NotFoundException, e.g. from a proxy, leaves the application's state undetermined
+    def cluster_application_state(application_id):
+        raise APIError("Response finished with status: 404. Details: <html><body>Not Found</body></html>")
+
+    with mock.patch.object(rm, 'cluster_application_state', cluster_application_state):
+        assert lifecycle_manager.poll() is None
+    assert lifecycle_manager.last_known_state == 'RUNNING'
+
+    # Once purged by the RM, the application is regarded as ended rather than answered from its last known state
+    del rm.apps['application_9_0005']
+    assert lifecycle_manager.poll() is False
+    assert lifecycle_manager.poll() is False
+    assert lifecycle_manager.last_known_state == yarn.YarnKernelLifecycleManager.unknown_state
+    assert lifecycle_manager.rm_breaker.state == CircuitBreaker.CLOSED  # the RM itself is available
+    assert run(lifecycle_manager.kill()) is None
+
+
+def test_am_placement_injects_node_label(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.nodes = [
+        {'id': 'n1:8041', 'state': 'RUNNING', 'nodeLabels': ['batch'], 'usedMemoryMB': 7168, 'availMemoryMB': 1024,
+         'usedVirtualCores': 7, 'availableVirtualCores': 1},
+        {'id': 'n2:8041', 'state': 'RUNNING', 'nodeLabels': ['interactive'], 'usedMemoryMB': 2048,
+         'availMemoryMB': 6144, 'usedVirtualCores': 2, 'availableVirtualCores': 6},
+    ]
+    lifecycle_manager.rm_addr = 'http://placement:8088'  # isolates the shared snapshot from other tests
+    env = {'SPARK_OPTS': '--master yarn', 'KERNEL_EXTRA_SPARK_OPTS': '--conf spark.executor.cores=2'}
+    run(lifecycle_manager._place_application_master(env))
+    assert env['KERNEL_AM_NODE_LABEL'] == 'interactive'
+    assert env['KERNEL_EXTRA_SPARK_OPTS'] == \
+        '--conf spark.executor.cores=2 --conf spark.yarn.am.nodeLabelExpression=interactive'
+
+    # The snapshot is shared across launches until it expires, and AMs that fit nowhere are left to YARN
+    env = {'SPARK_OPTS': '--master yarn', 'KERNEL_AM_MEMORY_MB': '16384'}
+    run(lifecycle_manager._place_application_master(env))
+    assert 'KERNEL_AM_NODE_LABEL' not in env and 'KERNEL_EXTRA_SPARK_OPTS' not in env
+    assert rm.calls == ['cluster_nodes']
+
+    # Toree kernelspecs convey their options via __TOREE_SPARK_OPTS__ rather than SPARK_OPTS
+    lifecycle_manager.kernel_manager.kernel_spec.env = {'__TOREE_SPARK_OPTS__': '--master yarn'}
+    env = {}
+    run(lifecycle_manager._place_application_master(env))
+    assert env['KERNEL_EXTRA_SPARK_OPTS'] == '--conf spark.yarn.am.nodeLabelExpression=interactive'
+
+    # As do kernelspecs whose launch description names spark-submit, while Dask kernels only receive the label
+    lifecycle_manager.kernel_manager.kernel_spec.env = {}
+    lifecycle_manager.launch_description = {'argv': ['/opt/spark/bin/spark-submit', {'env': 'SPARK_OPTS'}]}
+    env = {}
+    run(lifecycle_manager._place_application_master(env))
+    assert env['KERNEL_EXTRA_SPARK_OPTS'] == '--conf spark.yarn.am.nodeLabelExpression=interactive'
+    lifecycle_manager.launch_description = {'argv': [
+        {'if_env': 'SKEIN_DRIVER_ADDRESS', 'then': ['python', 'dask_submit.py'], 'else': ['dask-yarn']}]}
+    env = {}
+    run(lifecycle_manager._place_application_master(env))
+    assert env == {'KERNEL_AM_NODE_LABEL': 'interactive'}
+
+
+def test_suspend_and_resume(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    kernel_manager = lifecycle_manager.kernel_manager
+    rm.add_app('application_1_0010', lifecycle_manager.kernel_id, state='RUNNING', host='localhost',
+               allocatedMB=2048, allocatedVCores=2)
+
+    async def launch():
+        # The stand-in submitter reports no application ID, which is then discovered by name
+        kernel_cmd = ['sh', '-c', ': {}'.format(kernel_manager.response_address)]
+        asyncio.ensure_future(send_connection_info(kernel_manager.response_address, delay=0.5))
+        await lifecycle_manager.launch_process(kernel_cmd, env={'PATH': os.environ['PATH']})
+
+    run(launch())
+    assert lifecycle_manager.application_id == 'application_1_0010'
+
+    suspension = run(lifecycle_manager.suspend())
+    assert rm.apps['application_1_0010']['state'] == 'KILLED'
+    assert suspension['lifecycle_info']['application_id'] == 'application_1_0010'
+    assert suspension['reclaimed_memory_mb'] == 2048 and suspension['reclaimed_vcores'] == 2
+    calls = len(rm.calls)
+    assert lifecycle_manager.poll() is None  # suspended kernels remain alive without contacting the RM
+    assert len(rm.calls) == calls
+
+    rm.add_app('application_1_0011', lifecycle_manager.kernel_id, state='RUNNING', host='localhost')
+    prior_response_address = kernel_manager.response_address
+
+    async def resume():
+        resumes = asyncio.gather(lifecycle_manager.resume(), lifecycle_manager.resume())
+        await asyncio.sleep(0.1)  # the resubmission listens on a new response address
+        await send_connection_info(kernel_manager.response_address, delay=0.4)
+        return await resumes
+
+    connection_info = run(resume())
+    assert connection_info[0] is connection_info[1] is lifecycle_manager.connection_info
+    assert lifecycle_manager.application_id == 'application_1_0011'
+    assert lifecycle_manager.suspension is None
+    assert 'resume_latency' in lifecycle_manager.last_suspension
+    assert kernel_manager.response_address != prior_response_address
+    assert kernel_manager.response_address in lifecycle_manager.launch_cmd[-1]
+    run(lifecycle_manager.cleanup())
+
+
+def test_idle_kernel_suspended_and_resumed_by_its_next_request(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    kernel_manager = lifecycle_manager.kernel_manager
+    rm.add_app('application_1_0012', lifecycle_manager.kernel_id, state='RUNNING', host='localhost')
+    lifecycle_manager.suspend_idle_timeout = 1.0
+
+    async def until(condition):
+        while not condition():
+            await asyncio.sleep(0.1)
+
+    async def scenario():
+        kernel, resumed_kernel = MockKernel(), MockKernel()
+        kernel_cmd = ['sh', '-c', ': {}'.format(kernel_manager.response_address)]
+        asyncio.ensure_future(send_connection_info(kernel_manager.response_address, delay=0.5,
+                                                   connection_info=kernel.connection_info))
+        await lifecycle_manager.launch_process(kernel_cmd, env={'PATH': os.environ['PATH']})
+        # Clients are given the relay's ports, along with the kernel's key
+        connection_info = dict(lifecycle_manager.connection_info)
+        assert connection_info['key'] == kernel.key
+        assert connection_info['shell_port'] != kernel.connection_info['shell_port']
+
+        context = zmq.asyncio.Context.instance()
+        client, heartbeat = context.socket(zmq.DEALER), context.socket(zmq.REQ)
+        client.connect('tcp://{}:{}'.format(connection_info['ip'], connection_info['shell_port']))
+        heartbeat.connect('tcp://{}:{}'.format(connection_info['ip'], connection_info['hb_port']))
+
+        async def execute():
+            await client.send_multipart(build_message(kernel.key, 'execute_request', content={'code': '1'}))
+            reply = await asyncio.wait_for(client.recv_multipart(), 10)
+            assert reply[1] == sign_message(kernel.key, reply[2:6])  # signed with the key given to clients
+            return json.loads(reply[2].decode('utf-8'))['msg_type']
+
+        try:
+            assert await execute() == 'execute_reply'
+            assert kernel.requests == [('execute_request', True)]
+
+            # Once idle, the kernel is suspended, the relay answering its heartbeats
+            await asyncio.wait_for(until(lambda: lifecycle_manager.suspension is not None), 5)
+            assert rm.apps['application_1_0012']['state'] == 'KILLED'
+            await heartbeat.send(b'ping')
+            assert await asyncio.wait_for(heartbeat.recv(), 5) == b'ping'
+
+            # Its next request resumes it, the relay forwarding the request to the resumed kernel
+            rm.add_app('application_1_0013', lifecycle_manager.kernel_id, state='RUNNING', host='localhost')
+            prior_response_address = kernel_manager.response_address
+            executing = asyncio.ensure_future(execute())
+            await asyncio.wait_for(until(lambda: kernel_manager.response_address != prior_response_address), 5)
+            await send_connection_info(kernel_manager.response_address, delay=0.4,
+                                       connection_info=resumed_kernel.connection_info)
+            assert await executing == 'execute_reply'
+            assert resumed_kernel.requests == [('execute_request', True)]  # re-signed with the kernel's key
+            assert lifecycle_manager.suspension is None
+            assert lifecycle_manager.application_id == 'application_1_0013'
+            assert lifecycle_manager.connection_info == connection_info
+
+            await lifecycle_manager.kill()
+            await lifecycle_manager.cleanup()
+            assert lifecycle_manager.channel_proxy is None
+        finally:
+            client.close(linger=0)
+            heartbeat.close(linger=0)
+            kernel.close()
+            resumed_kernel.close()
+
+    run(scenario())
+
+
+def test_wait_completes_on_final_state(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0020', lifecycle_manager.kernel_id, state='RUNNING')
+    lifecycle_manager.application_id = 'application_1_0020'
+    lifecycle_manager.rm_addr = 'http://shutdown:8088'  # isolates the observed shutdown times from other tests
+    assert lifecycle_manager._get_shutdown_budget('shutdown') == yarn.yarn_shutdown_wait_time
+
+    async def shutdown():
+        asyncio.get_event_loop().call_later(0.3, rm.apps['application_1_0020'].update, {'state': 'FINISHED'})
+        start_time = time.monotonic()
+        await lifecycle_manager.wait()
+        return time.monotonic() - start_time
+
+    assert run(shutdown()) < 1.0
+    stats = get_duration_stats('http://shutdown:8088', 'shutdown')
+    assert len(stats) == 1
+
+    # Once enough shutdowns have been observed, the budget is derived from them
+    for duration in (1.0, 2.0, 1.0, 4.0):
+        stats.record(duration)
+    assert lifecycle_manager._get_shutdown_budget('shutdown') == 4.0 * yarn.shutdown_budget_factor
+
+
+def test_shutdown_wait_time_set_from_observed_shutdowns(lifecycle_manager):
+    kernel_manager = lifecycle_manager.kernel_manager
+    lifecycle_manager.rm_addr = 'http://quickshutdown:8088'
+    lifecycle_manager._adjust_shutdown_wait_time()
+    assert kernel_manager.shutdown_wait_time == yarn.yarn_shutdown_wait_time
+
+    # Once enough shutdowns have been observed, the wait time is their budget - even below the manager's default
+    for duration in (1.0, 1.0, 2.0, 1.0, 2.0):
+        get_duration_stats('http://quickshutdown:8088', 'shutdown').record(duration)
+    lifecycle_manager._adjust_shutdown_wait_time()
+    assert kernel_manager.shutdown_wait_time == 2.0 * yarn.shutdown_budget_factor
+
+
+def test_wait_discovering_application_is_rate_limited(lifecycle_manager):
+    priorities = []
+
+    async def acquire(priority):
+        priorities.append(priority)
+
+    with mock.patch.object(yarn.rm_rate_limiter, 'acquire', acquire):
+        run(lifecycle_manager.wait())
+    assert priorities == [yarn.RequestPriority.KILL]
+    assert lifecycle_manager.resource_mgr.calls == ['cluster_applications']
+
+
+def test_kill_waits_within_budget(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0021', lifecycle_manager.kernel_id, state='RUNNING')  # never reaches a final state
+    lifecycle_manager.application_id = 'application_1_0021'
+    lifecycle_manager.rm_addr = 'http://slowkill:8088'
+    stats = get_duration_stats('http://slowkill:8088', 'kill')
+    for duration in (0.1, 0.2, 0.2, 0.2, 0.2):
+        stats.record(duration)
+
+    start_time = time.monotonic()
+    assert run(lifecycle_manager._await_final_state('kill')) == 'RUNNING'
+    assert 0.3 <= time.monotonic() - start_time < 1.0
+    assert len(stats) == 5  # unsuccessful kills are not recorded
+
+
+def prepare_hedge(lifecycle_manager, application_id):
+    """Configures the submission that hedges the launch, which reports its application ID and options."""
+    lifecycle_manager.hedge_queue = 'fast'
+    lifecycle_manager.launch_cmd = ['sh', '-c', 'echo "$KERNEL_EXTRA_SPARK_OPTS"; '
+                                                'echo "Submitted application {}"; sleep 1'.format(application_id),
+                                    lifecycle_manager.kernel_manager.response_address]
+    lifecycle_manager.submission_kwargs = {'env': dict(os.environ, SPARK_OPTS='--master yarn')}
+
+
+async def await_condition(task, condition):
+    while not condition() and not task.done():
+        await asyncio.sleep(0.1)
+
+
+def test_hedged_launch_adopts_first_running(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0031', lifecycle_manager.kernel_id, state='ACCEPTED')
+    rm.add_app('application_1_0032', lifecycle_manager.kernel_id, state='RUNNING', host='localhost')
+    prepare_hedge(lifecycle_manager, 'application_1_0032')
+    launch_submitter(lifecycle_manager, 'echo "Submitted application application_1_0031"; sleep 1')
+
+    async def startup():
+        startup_task = asyncio.ensure_future(lifecycle_manager.confirm_remote_startup())
+        await await_condition(startup_task, lambda: lifecycle_manager.application_id == 'application_1_0032')
+        await send_connection_info(lifecycle_manager.kernel_manager.response_address)
+        await startup_task
+
+    with mock.patch.object(yarn, 'hedge_delay', 0.5), mock.patch.object(yarn, 'hedge_min_samples', 1000):
+        run(startup())
+    assert lifecycle_manager.application_id == 'application_1_0032'
+    assert lifecycle_manager.connection_info['ip'] == '127.0.0.1'
+    assert rm.apps['application_1_0031']['state'] == 'KILLED'
+    assert '--queue fast' in lifecycle_manager.submitter_output.get_tail()
+    assert lifecycle_manager.competing_submission is None
+
+
+def test_hedged_launch_killed_when_original_runs_first(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0033', lifecycle_manager.kernel_id, state='ACCEPTED', host='localhost')
+    rm.add_app('application_1_0034', lifecycle_manager.kernel_id, state='ACCEPTED')
+    prepare_hedge(lifecycle_manager, 'application_1_0034')
+    launch_submitter(lifecycle_manager, 'echo "Submitted application application_1_0033"; sleep 1')
+
+    async def startup():
+        startup_task = asyncio.ensure_future(lifecycle_manager.confirm_remote_startup())
+        await await_condition(startup_task, lambda: lifecycle_manager.competing_submission is not None and
+                              lifecycle_manager.competing_submission.application_id)
+        rm.apps['application_1_0033']['state'] = 'RUNNING'
+        await send_connection_info(lifecycle_manager.kernel_manager.response_address, delay=0.5)
+        await startup_task
+
+    with mock.patch.object(yarn, 'hedge_delay', 0.5), mock.patch.object(yarn, 'hedge_min_samples', 1000):
+        run(startup())
+    assert lifecycle_manager.application_id == 'application_1_0033'
+    assert rm.apps['application_1_0034']['state'] == 'KILLED'
+    assert lifecycle_manager.competing_submission is None
+
+
+def test_hedged_launch_of_scala_kernel_targets_queue(lifecycle_manager):
+    # Toree kernelspecs convey their options via __TOREE_SPARK_OPTS__ rather than SPARK_OPTS
+    lifecycle_manager.kernel_manager.kernel_spec.env = {
+        '__TOREE_SPARK_OPTS__': '--master yarn ${KERNEL_EXTRA_SPARK_OPTS}'}
+    prepare_hedge(lifecycle_manager, 'application_1_0035')
+    lifecycle_manager.submission_kwargs = {'env': dict(os.environ)}
+    lifecycle_manager._prepare_response_socket()
+    hedge = lifecycle_manager._submit_hedge(0.5)
+    try:
+        hedge.local_proc.wait()
+        assert '--queue fast' in hedge.submitter_output.get_tail()
+    finally:
+        run(lifecycle_manager._discard_submission(hedge))
+
+    # Kernels whose submitter's queue cannot be set are not hedged
+    lifecycle_manager.kernel_manager.kernel_spec.env = {}
+    assert lifecycle_manager._submit_hedge(0.5) is None
+    assert lifecycle_manager.competing_submission is None
+
+
+def test_launch_timeout_and_polling_adapt_to_launch_stats(lifecycle_manager):
+    env = {'KERNEL_QUEUE': 'adaptive'}
+    lifecycle_manager._adapt_to_launch_stats(env)
+    assert lifecycle_manager.stats_key == 'http://localhost:8088|Test Kernel|adaptive'
+    assert lifecycle_manager.get_expected_launch_time() is None
+    assert lifecycle_manager.kernel_launch_timeout == 5.0
+
+    stats = get_duration_stats(lifecycle_manager.stats_key, 'launch')
+    for duration in range(20, 30):
+        stats.record(float(duration))
+    lifecycle_manager._adapt_to_launch_stats(env)
+    assert lifecycle_manager.kernel_launch_timeout == 58.0
+    assert lifecycle_manager.get_expected_launch_time() == {'median': 24.0, 'p90': 28.0, 'samples': 10}
+
+    # Queries are spaced out until launches typically complete
+    lifecycle_manager.startup_time = time.monotonic()
+    assert lifecycle_manager._get_startup_poll_interval() == yarn.max_startup_poll_interval
+    lifecycle_manager.startup_time -= 19.5
+    assert lifecycle_manager._get_startup_poll_interval() == yarn.poll_interval
+
+    # A launch timeout given by the user prevails
+    lifecycle_manager.kernel_launch_timeout = 5.0
+    lifecycle_manager._adapt_to_launch_stats(dict(env, KERNEL_LAUNCH_TIMEOUT='5'))
+    assert lifecycle_manager.kernel_launch_timeout == 5.0
+
+
+def test_poll_uses_shared_application_cache(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0051', lifecycle_manager.kernel_id, state='KILLED')
+    lifecycle_manager.application_id = 'application_1_0051'
+    snapshot = {'time': time.time(), 'apps': {'application_1_0051': 'RUNNING'}}
+
+    with mock.patch.dict(yarn.shared_app_cache.snapshots, {lifecycle_manager.rm_addr: snapshot}):
+        assert lifecycle_manager.poll() is None
+        assert rm.calls == []
+        # Applications absent from the snapshot are no longer active, which the RM confirms
+        del snapshot['apps']['application_1_0051']
+        assert lifecycle_manager.poll() is False
+        assert rm.calls == ['cluster_application_state']
+
+
+@pytest.mark.parametrize('diagnostics, status_code, cause', [
+    ("User alice cannot submit applications to queue root.etl", 403, "not permitted to submit"),
+    ("Application application_1_0061 submitted by user alice to unknown queue: missing", 400, "does not exist"),
+    ("Container [pid=1,containerID=c_1] is running 10MB beyond physical memory limits.", 500, "memory limit"),
+    ("java.io.FileNotFoundException: File does not exist: hdfs:///jars/kernel.jar", 500, "jar or resources"),
+    ("AM container exited with exitCode: 1", 500, "Diagnostics: AM container exited"),
+])
+def test_startup_failed_state_raises_cause(lifecycle_manager, diagnostics, status_code, cause):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0061', lifecycle_manager.kernel_id, state='ACCEPTED')
+
+    async def startup():
+        startup_task = asyncio.ensure_future(lifecycle_manager.confirm_remote_startup())
+        await asyncio.sleep(0.1)
+        rm.apps['application_1_0061'].update({'state': 'FAILED', 'diagnostics': diagnostics})
+        await startup_task
+
+    start_time = time.monotonic()
+    with pytest.raises(web.HTTPError) as ex:
+        run(startup())
+    assert time.monotonic() - start_time < 2 * yarn.poll_interval + 0.5
+    assert ex.value.status_code == status_code
+    assert "unexpectedly found in state 'FAILED'" in ex.value.reason
+    assert cause in ex.value.reason
+
+
+def test_startup_failure_noticed_within_max_startup_poll_interval(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0062', lifecycle_manager.kernel_id, state='ACCEPTED')
+    lifecycle_manager.stats_key = 'http://localhost:8088|Test Kernel|slow'
+    stats = get_duration_stats(lifecycle_manager.stats_key, 'launch')
+    for duration in range(20, 30):
+        stats.record(float(duration))
+
+    async def startup():
+        startup_task = asyncio.ensure_future(lifecycle_manager.confirm_remote_startup())
+        await asyncio.sleep(0.2)  # the state has been queried, the next query being spaced out
+        assert lifecycle_manager._get_startup_poll_interval() == yarn.max_startup_poll_interval
+        failed_time = time.monotonic()
+        rm.apps['application_1_0062']['state'] = 'FAILED'
+        with pytest.raises(web.HTTPError):
+            await startup_task
+        return time.monotonic() - failed_time
+
+    with mock.patch.object(yarn, 'max_startup_poll_interval', 1.0):
+        assert run(startup()) < 1.0 + 0.25
+
+
+def test_launch_runs_submitter_of_launch_description(lifecycle_manager, tmpdir):
+    rm = lifecycle_manager.resource_mgr
+    kernel_manager = lifecycle_manager.kernel_manager
+    rm.add_app('application_1_0071', lifecycle_manager.kernel_id, state='RUNNING', host='localhost')
+    submitted_argv = str(tmpdir.join('argv'))
+    lifecycle_manager.launch_description = {'argv': [
+        'sh', '-c', 'echo "$@" > {}'.format(submitted_argv), 'spark-submit', {'env': 'SPARK_OPTS'},
+        {'impersonation': '--proxy-user'}, 'launch_ipykernel.py']}
+    kernel_manager.app_config['impersonation_enabled'] = True
+
+    async def launch():
+        # The run.sh of the kernelspec's argv is replaced by the submitter, the kernel's arguments retained
+        kernel_cmd = ['/no/such/run.sh', '--response-address', kernel_manager.response_address]
+        asyncio.ensure_future(send_connection_info(kernel_manager.response_address, delay=0.5))
+        await lifecycle_manager.launch_process(kernel_cmd, env={
+            'PATH': os.environ['PATH'], 'SPARK_OPTS': '--name ${KERNEL_ID} ${KERNEL_EXTRA_SPARK_OPTS}',
+            'KERNEL_EXTRA_SPARK_OPTS': '--queue etl', 'KERNEL_USERNAME': 'alice'})
+
+    run(launch())
+    assert lifecycle_manager.application_id == 'application_1_0071'
+    with open(submitted_argv) as f:
+        assert f.read().split() == ['--name', lifecycle_manager.kernel_id, '--queue', 'etl', '--proxy-user', 'alice',
+                                    'launch_ipykernel.py', '--response-address', kernel_manager.response_address]
+
+
+def test_startup_awaits_host_when_app_never_listed(lifecycle_manager):
+    lifecycle_manager.kernel_launch_timeout = 1.0
+
+    async def startup():
+        # Connection info arrives, but the application is never listed - the launch times out rather than
+        # completing without an application or host.
+        asyncio.ensure_future(send_connection_info(lifecycle_manager.kernel_manager.response_address))
+        await lifecycle_manager.confirm_remote_startup()
+
+    with pytest.raises(web.HTTPError) as ex:
+        run(startup())
+    assert "launch timeout" in ex.value.reason
+    assert lifecycle_manager.connection_info is None
+
+
+def test_startup_timeout_kills_application_once(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    rm.add_app('application_1_0076', lifecycle_manager.kernel_id, state='ACCEPTED')
+    lifecycle_manager.kernel_launch_timeout = 1.0
+
+    async def startup():
+        # Connection info arrives while the application awaits resources, both the state monitor and the
+        # listener awaiting the AM host when the launch times out.
+        asyncio.ensure_future(send_connection_info(lifecycle_manager.kernel_manager.response_address))
+        await lifecycle_manager.confirm_remote_startup()
+
+    with pytest.raises(web.HTTPError) as ex:
+        run(startup())
+    assert ex.value.status_code == 503
+    assert rm.calls.count('cluster_application_kill') == 1
+    assert rm.apps['application_1_0076']['state'] == 'KILLED'
+
+
+def test_startup_awaits_host_while_rm_down(lifecycle_manager):
+    rm = lifecycle_manager.resource_mgr
+    lifecycle_manager.rm_breaker = CircuitBreaker(lifecycle_manager.rm_addr, failure_threshold=1, reset_timeout=0.2)
+    rm.add_app('application_1_0081', lifecycle_manager.kernel_id, state='RUNNING', host='localhost')
+    rm.available = False
+
+    async def startup():
+        # The RM is down when the connection info arrives, the host being resolved once it has recovered
+        startup_task = asyncio.ensure_future(lifecycle_manager.confirm_remote_startup())
+        await send_connection_info(lifecycle_manager.kernel_manager.response_address, delay=0.1)
+        await asyncio.sleep(0.5)
+        assert not startup_task.done()
+        rm.available = True
+        await startup_task
+
+    run(startup())
+    assert lifecycle_manager.application_id == 'application_1_0081'
+    assert lifecycle_manager.connection_info['ip'] == '127.0.0.1'
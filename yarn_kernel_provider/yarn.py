@@ -7,17 +7,84 @@ import os
 import signal
 import logging
 import errno
+import re
 import socket
+import time
 
+from collections import deque
+from subprocess import PIPE, STDOUT
 from jupyter_kernel_mgmt import localinterfaces
 from remote_kernel_provider.launcher import launch_kernel
 from remote_kernel_provider.lifecycle_manager import RemoteKernelLifecycleManager
-from yarn_api_client.resource_manager import ResourceManager
+from yarn_api_client.errors import APIError
+
+from .applist import stream_applications
+from .channelproxy import KernelChannelProxy
+from .circuitbreaker import get_circuit_breaker, record_rm_failure
+from .clusters import create_resource_manager, yarn_cluster_registry
+from .launchcmd import build_launch_argv
+from .placement import DEFAULT_PARTITION, am_memory_mb, am_vcores, cache_node_snapshot, get_node_snapshot, \
+    select_node_label
+from .ratelimit import RequestPriority, rm_rate_limiter
+from .scheduler import launch_scheduler
+from .sharedcache import shared_app_cache
+from .skein_driver import skein_driver
+from .snapshot import register_lifecycle_manager, unregister_lifecycle_manager
+from .stats import get_duration_stats
 
 local_ip = localinterfaces.public_ips()[0]
 poll_interval = float(os.getenv('EG_POLL_INTERVAL', '0.5'))
 max_poll_attempts = int(os.getenv('EG_MAX_POLL_ATTEMPTS', '10'))
 yarn_shutdown_wait_time = float(os.getenv('EG_YARN_SHUTDOWN_WAIT_TIME', '15.0'))
+# Once this many shutdowns have been observed on a cluster, the time awaited for an application to reach a final
+# state is the given percentile of the observed durations multiplied by the given factor.
+shutdown_min_samples = int(os.getenv('EG_YARN_SHUTDOWN_MIN_SAMPLES', '5'))
+shutdown_budget_percentile = float(os.getenv('EG_YARN_SHUTDOWN_BUDGET_PERCENTILE', '95'))
+shutdown_budget_factor = float(os.getenv('EG_YARN_SHUTDOWN_BUDGET_FACTOR', '1.5'))
+# Initial interval between state queries while awaiting a final state, which grows to the poll interval.
+shutdown_poll_min = float(os.getenv('EG_YARN_SHUTDOWN_POLL_MIN', '0.1'))
+# Once this many launches of a kernelspec (to a given queue and cluster) have been observed, its launch timeout is
+# the given percentile of their durations multiplied by the given factor - though no less than the given minimum.
+adaptive_min_samples = int(os.getenv('EG_YARN_ADAPTIVE_MIN_SAMPLES', '10'))
+launch_timeout_percentile = float(os.getenv('EG_YARN_LAUNCH_TIMEOUT_PERCENTILE', '99'))
+launch_timeout_factor = float(os.getenv('EG_YARN_LAUNCH_TIMEOUT_FACTOR', '2.0'))
+launch_timeout_min = float(os.getenv('EG_YARN_LAUNCH_TIMEOUT_MIN', '15.0'))
+# Longest interval between queries during startup.  Queries are spaced out, up to this interval, until the point
+# at which the kernelspec's launches typically complete.  It also bounds the time taken to notice that a starting
+# application has failed (or otherwise ended).
+max_startup_poll_interval = float(os.getenv('EG_YARN_MAX_STARTUP_POLL_INTERVAL', '2.0'))
+# Hedged launches are submitted again should they not reach RUNNING within the given percentile of the times
+# observed on their cluster, or within the given delay until enough times have been observed.
+hedge_min_samples = int(os.getenv('EG_YARN_HEDGE_MIN_SAMPLES', '5'))
+hedge_percentile = float(os.getenv('EG_YARN_HEDGE_PERCENTILE', '90'))
+hedge_delay = float(os.getenv('EG_YARN_HEDGE_DELAY', '60.0'))
+# Seconds without messages to or from a kernel after which it's suspended, releasing its application, its next
+# request resuming it.  If 0, kernels are not suspended.
+suspend_idle_timeout = float(os.getenv('EG_YARN_SUSPEND_IDLE_TIMEOUT', '0'))
+# Number of trailing lines of the submitter's output to retain for launch-failure messages
+launch_output_lines = int(os.getenv('EG_YARN_LAUNCH_OUTPUT_LINES', '50'))
+# Seconds to await the application ID from the submitter's output before also searching the RM by name
+submitter_id_timeout = float(os.getenv('EG_YARN_SUBMITTER_ID_TIMEOUT', '15.0'))
+
+# spark-submit reports "Submitted application <app-id>" while dask-yarn submit prints the bare app-id.
+application_id_pattern = re.compile(r'(?:Submitted application |^\s*)(application_\d+_\d+)\s*$')
+# Common causes of launch failures, recognized from the diagnostics of the failed application, with the HTTP
+# status with which they're reported.
+failure_causes = [
+    (re.compile(r'cannot submit applications to queue|AccessControlException', re.IGNORECASE), 403,
+     "The user is not permitted to submit applications to the queue"),
+    (re.compile(r'unknown queue|queue \S+ does not exist|non-leaf queue', re.IGNORECASE), 400,
+     "The queue does not exist or is not a leaf queue"),
+    (re.compile(r'beyond (?:physical|virtual) memory limits|OutOfMemoryError|exit code is 137', re.IGNORECASE), 500,
+     "The application master exceeded its memory limit"),
+    (re.compile(r'FileNotFoundException|File does not exist|ClassNotFoundException|Could not find or load main class|'
+                r'changed on src filesystem', re.IGNORECASE), 500,
+     "The application's jar or resources are missing or invalid"),
+]
+# The RM reports applications unknown to it (never submitted, or purged from its state store) as not found, via
+# the NotFoundException of its RemoteException payload - a bare 404 (e.g., from a misconfigured proxy) not implying
+# the application has ended.
+unknown_app_pattern = re.compile(r'"exception"\s*:\s*"NotFoundException"')
 
 # Default logging level of the underlying modules produce too much noise - handle levels seperate from app
 logging.getLogger('yarn_api_client').setLevel(os.getenv('YARN_API_CLIENT_LOG_LEVEL', logging.INFO))
@@ -45,15 +112,133 @@ def configure_yarn_api_client_logger():
 configure_yarn_api_client_logger()
 
 
+def classify_failure(diagnostics):
+    """Returns the HTTP status and description of the cause of a failure given its application's diagnostics."""
+    for pattern, http_status_code, cause in failure_causes:
+        if pattern.search(diagnostics or ''):
+            return http_status_code, cause
+    return 500, None
+
+
+class SubmitterOutputReader(object):
+    """Reads the output of the local submitter process (spark-submit, dask-yarn) without blocking the event loop.
+
+    The application ID is captured as soon as the submitter reports it and a bounded tail of the output is
+    retained for use in launch-failure messages.
+    """
+
+    def __init__(self, stream, log, kernel_id, max_lines=launch_output_lines):
+        self.stream = stream
+        self.log = log
+        self.kernel_id = kernel_id
+        self.application_id = None
+        self.tail = deque(maxlen=max_lines)
+        self._partial = b''
+        self._loop = asyncio.get_event_loop()
+        # Resolved once the application ID has been found or the submitter's output has ended
+        self.reported = self._loop.create_future()
+        self._fd = stream.fileno()
+        os.set_blocking(self._fd, False)
+        self._loop.add_reader(self._fd, self._read)
+
+    def _read(self):
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return False
+        except OSError:
+            data = b''
+
+        if not data:  # EOF - submitter has exited
+            self.close()
+            return False
+
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        for line in lines:
+            self._process_line(line)
+        return True
+
+    def _process_line(self, raw_line):
+        line = raw_line.decode('utf-8', errors='replace').rstrip()
+        if not line:
+            return
+        self.tail.append(line)
+        self.log.debug("KernelID: '{}' submitter: {}".format(self.kernel_id, line))
+        if self.application_id is None:
+            match = application_id_pattern.search(line)
+            if match:
+                self.application_id = match.group(1)
+                if not self.reported.done():
+                    self.reported.set_result(self.application_id)
+
+    def get_tail(self):
+        """Returns the retained output after draining what's currently available."""
+        if self._fd is not None:
+            while self._read():
+                pass
+        return '\n'.join(self.tail)
+
+    def close(self):
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+            if self._partial:
+                self._process_line(self._partial)
+                self._partial = b''
+            self.stream.close()
+            if not self.reported.done():
+                self.reported.set_result(self.application_id)
+
+
+class Submission(object):
+    """A submission of a kernel - its submitter process, application and response socket - to a resource manager.
+       Hedged launches entail two submissions, of which one is adopted by the lifecycle manager.
+    """
+
+    def __init__(self, local_proc, submitter_output, response_socket, response_address, resource_mgr, rm_breaker,
+                 yarn_cluster=None, application_id=None):
+        self.local_proc = local_proc
+        self.submitter_output = submitter_output
+        self.response_socket = response_socket
+        self.response_address = response_address
+        self.resource_mgr = resource_mgr
+        self.rm_breaker = rm_breaker
+        self.yarn_cluster = yarn_cluster
+        self.application_id = application_id
+        self.state = None
+
+
 class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
     """Kernel lifecycle management for YARN clusters."""
     initial_states = {'NEW', 'SUBMITTED', 'ACCEPTED', 'RUNNING'}
-    final_states = {'FINISHED', 'KILLED'}  # Don't include FAILED state
+    # Pseudo-state of applications unknown to the RM, which are regarded as having ended
+    unknown_state = 'NOT_FOUND'
+    final_states = {'FINISHED', 'KILLED', unknown_state}  # Don't include FAILED state
 
     def __init__(self, kernel_manager, lifecycle_config):
         super(YarnKernelLifecycleManager, self).__init__(kernel_manager, lifecycle_config)
         self.application_id = None
         self.rm_addr = None
+        self.submitter_output = None
+        self.last_known_state = None
+        self.diagnostics = None
+        self.launch_cmd = None
+        self.launch_kwargs = None
+        self.launch_response_address = None
+        self.submission_kwargs = None
+        self.competing_submission = None
+        self.startup_time = None
+        self.running_observed = False
+        self.defer_connection_setup = False
+        self.deferred_connect_info = None
+        self.stats_key = None
+        self.suspension = None
+        self.last_suspension = None
+        self._resuming = None
+        self._suspending = None
+        self.channel_proxy = None
+        self.idle_monitor = None
 
         # We'd like to have the kernel.json values override the globally configured values but because
         # 'null' is the default value for these (and means to go with the local endpoint), we really
@@ -70,61 +255,303 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
             'yarn_endpoint_security_enabled',
             kernel_manager.provider_config.get('yarn_endpoint_security_enabled', False))
 
-        endpoints = None
-        if self.yarn_endpoint:
-            endpoints = [self.yarn_endpoint]
+        # A kernelspec may instead name a pool of the provider's clusters, in which case the cluster (and
+        # its resource manager) is selected when the kernel is launched.
+        self.yarn_cluster = None
+        self.yarn_cluster_pool = lifecycle_config.get(
+            'yarn_cluster_pool', kernel_manager.provider_config.get('yarn_cluster_pool')) or []
+        if isinstance(self.yarn_cluster_pool, str):
+            self.yarn_cluster_pool = [name.strip() for name in self.yarn_cluster_pool.split(',') if name.strip()]
 
-            # Only check alternate if "primary" is set.
-            if self.alt_yarn_endpoint:
-                endpoints.append(self.alt_yarn_endpoint)
+        if self.yarn_cluster_pool:
+            yarn_cluster_registry.configure(kernel_manager.provider_config.get('yarn_clusters'), log=self.log)
+            self.resource_mgr = None
+            self.rm_breaker = None
+        else:
+            self.resource_mgr = create_resource_manager(self.yarn_endpoint, self.alt_yarn_endpoint,
+                                                        self.yarn_endpoint_security_enabled)
+            self.rm_addr = self.resource_mgr.get_active_endpoint()
+            self.rm_breaker = get_circuit_breaker(self.rm_addr, log=self.log)
 
-        auth = None
-        if self.yarn_endpoint_security_enabled:
-            from requests_kerberos import HTTPKerberosAuth
-            auth = HTTPKerberosAuth()
+        # Optionally direct the kernel's application master to the node label (partition) whose nodes are
+        # least loaded, optionally restricted to the given candidate labels.
+        self.am_node_placement = lifecycle_config.get(
+            'am_node_placement', kernel_manager.provider_config.get('am_node_placement', False))
+        self.am_node_labels = lifecycle_config.get(
+            'am_node_labels', kernel_manager.provider_config.get('am_node_labels'))
 
-        self.resource_mgr = ResourceManager(service_endpoints=endpoints, auth=auth)
+        # Dask kernels may be submitted through a long-lived skein driver shared by the server's Dask kernels.
+        self.shared_skein_driver = lifecycle_config.get(
+            'shared_skein_driver', kernel_manager.provider_config.get('shared_skein_driver', False))
 
-        self.rm_addr = self.resource_mgr.get_active_endpoint()
+        # Kernels idle for this many seconds are suspended, their channels being relayed by the server so that
+        # their next request resumes them.
+        self.suspend_idle_timeout = float(lifecycle_config.get(
+            'suspend_idle_timeout', kernel_manager.provider_config.get('suspend_idle_timeout', suspend_idle_timeout)))
 
-        # TODO - fix wait time - should just add member to k-m.
-        # YARN applications tend to take longer than the default 5 second wait time.  Rather than
-        # require a command-line option for those using YARN, we'll adjust based on a local env that
-        # defaults to 15 seconds.  Note: we'll only adjust if the current wait time is shorter than
-        # the desired value.
-        if kernel_manager.shutdown_wait_time < yarn_shutdown_wait_time:
-            kernel_manager.shutdown_wait_time = yarn_shutdown_wait_time
-            self.log.debug("{class_name} shutdown wait time adjusted to {wait_time} seconds.".
-                           format(class_name=type(self).__name__, wait_time=kernel_manager.shutdown_wait_time))
+        # Kernelspecs installed with a launch description are submitted by running their submitter directly,
+        # with an argv built here, rather than via their run.sh script.
+        self.launch_description = lifecycle_config.get('launch')
+
+        # Launches slow to reach RUNNING may be hedged by a second submission to an alternate queue and/or
+        # cluster, the first to reach RUNNING being adopted.
+        self.hedge_queue = lifecycle_config.get('hedge_queue', kernel_manager.provider_config.get('hedge_queue'))
+        self.hedge_cluster = lifecycle_config.get(
+            'hedge_cluster', kernel_manager.provider_config.get('hedge_cluster'))
+        if self.hedge_cluster:
+            yarn_cluster_registry.configure(kernel_manager.provider_config.get('yarn_clusters'), log=self.log)
+
+        if self.rm_addr:
+            self._adjust_shutdown_wait_time()
+            shared_app_cache.watch(self.rm_addr, self.resource_mgr, self.rm_breaker,
+                                   self.yarn_endpoint_security_enabled)
+
+        # Included in the provider's cluster snapshots for as long as the kernel is managed
+        register_lifecycle_manager(self)
 
     async def launch_process(self, kernel_cmd, **kwargs):
         """Launches the specified process within a YARN cluster environment."""
+        # Retain the launch arguments so a suspended kernel can be resubmitted
+        self.launch_cmd = list(kernel_cmd)
+        self.launch_response_address = self.kernel_manager.response_address
+        self.launch_kwargs = dict(kwargs)
+        if kwargs.get('env'):
+            self.launch_kwargs['env'] = dict(kwargs['env'])
+
         await super(YarnKernelLifecycleManager, self).launch_process(kernel_cmd, **kwargs)
 
-        # launch the local run.sh - which is configured for yarn-cluster...
+        # Launches are admitted fairly across users (per KERNEL_USERNAME) so that one user's burst of
+        # launches does not delay those of others.
+        await launch_scheduler.admit(self.kernel_manager.kernel_username)
+        try:
+            await self._launch(kernel_cmd, **kwargs)
+        finally:
+            launch_scheduler.release(self.kernel_manager.kernel_username)
+
+        return self
+
+    async def _launch(self, kernel_cmd, **kwargs):
+        """Submits the kernel once its launch has been admitted, then confirms its startup."""
+        if self.yarn_cluster_pool:
+            await self._select_cluster()
+            # Direct the submitter to the selected cluster (e.g., via HADOOP_CONF_DIR)
+            kwargs['env'] = dict(kwargs.get('env') or os.environ, **self.yarn_cluster.env)
+
+        if self.shared_skein_driver:
+            await self._use_shared_skein_driver(kwargs)
+
+        if self.am_node_placement:
+            kwargs['env'] = kwargs.get('env') or dict(os.environ)
+            await self._place_application_master(kwargs['env'])
+
+        # launch the submitter (or local run.sh) - which is configured for yarn-cluster...  Unless directed
+        # elsewhere, the submitter's output is captured so the application ID can be taken from it.
+        if 'stdout' not in kwargs:
+            kwargs.update({'stdout': PIPE, 'stderr': STDOUT})
+        self.submission_kwargs = kwargs
+        self._adapt_to_launch_stats(kwargs.get('env') or {})
+        kernel_cmd = self._get_submit_cmd(kernel_cmd, kwargs.get('env') or os.environ)
+        submitted_time = time.monotonic()
         self.local_proc = launch_kernel(kernel_cmd, **kwargs)
         self.pid = self.local_proc.pid
         self.ip = local_ip
+        if self.local_proc.stdout:
+            self.submitter_output = SubmitterOutputReader(self.local_proc.stdout, self.log, self.kernel_id)
 
         self.log.debug("Yarn cluster kernel launched using YARN RM address: {}, pid: {}, Kernel ID: {}, cmd: '{}'"
                        .format(self.rm_addr, self.local_proc.pid, self.kernel_id, kernel_cmd))
-        await self.confirm_remote_startup()
+        try:
+            await self.confirm_remote_startup()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._log_submitter_output()
+            raise
+        get_duration_stats(self.stats_key, 'launch').record(time.monotonic() - submitted_time)
+        if self.yarn_cluster:
+            self.yarn_cluster.record_launch(RemoteKernelLifecycleManager.get_time_diff(self.start_time))
 
-        return self
+    def _log_submitter_output(self):
+        """Logs the retained tail of the submitter's output, otherwise only logged at debug level, once the launch
+           has failed.  A failed submitter's output is already included in its launch failure's error.
+        """
+        if self.submitter_output and self.local_proc is not None:
+            output = self.submitter_output.get_tail()
+            if output:
+                self.log.warning("Launch of KernelID: '{}' failed.  Submitter output:\n{}".
+                                 format(self.kernel_id, output))
+
+    def _get_submit_cmd(self, kernel_cmd, env):
+        """Returns the command submitting the kernel - that built from the kernelspec's launch description, given
+           the kernel's arguments (those following run.sh) and environment, otherwise `kernel_cmd` itself.
+        """
+        if not self.launch_description:
+            return kernel_cmd
+        return build_launch_argv(self.launch_description, kernel_cmd[1:], env)
+
+    def _adapt_to_launch_stats(self, env):
+        """Derives the launch timeout and shutdown wait time from the durations observed for the kernelspec's
+           launches, to its queue on its cluster.  A KERNEL_LAUNCH_TIMEOUT given by the user prevails.
+        """
+        resource_dir = getattr(self.kernel_manager.kernel_spec, 'resource_dir', None)
+        kernelspec = os.path.basename(resource_dir) if isinstance(resource_dir, str) \
+            else self.kernel_manager.kernel_spec.display_name
+        self.stats_key = '{}|{}|{}'.format(self.rm_addr, kernelspec, env.get('KERNEL_QUEUE', ''))
+        self._adjust_shutdown_wait_time()
+
+        stats = get_duration_stats(self.stats_key, 'launch')
+        if len(stats) < adaptive_min_samples:
+            return
+        if not env.get('KERNEL_LAUNCH_TIMEOUT'):
+            self.kernel_launch_timeout = max(stats.percentile(launch_timeout_percentile) * launch_timeout_factor,
+                                             launch_timeout_min)
+        expected = self.get_expected_launch_time()
+        self.log.info("KernelID: '{}' is expected to start within {:.1f} seconds ({:.1f} seconds at the 90th "
+                      "percentile), launch timeout: {:.1f} seconds.".
+                      format(self.kernel_id, expected['median'], expected['p90'], self.kernel_launch_timeout))
+
+    def get_expected_launch_time(self):
+        """Returns the median and 90th percentile of the durations of the kernelspec's launches (to its queue and
+           cluster) - hints of the time the kernel's launch is expected to take - or None if too few are known.
+        """
+        stats = get_duration_stats(self.stats_key, 'launch') if self.stats_key else None
+        if stats is None or len(stats) < adaptive_min_samples:
+            return None
+        return {'median': stats.percentile(50), 'p90': stats.percentile(90), 'samples': len(stats)}
+
+    def _get_startup_poll_interval(self):
+        """Spaces out the queries made during startup until the point at which the kernelspec's launches typically
+           (per their 10th percentile) complete, after which they're made every poll interval.  Since the state
+           monitor awaits this interval between queries, it's capped by the greater of the max startup poll
+           interval and the poll interval - the bound on noticing a terminal state during startup.
+        """
+        stats = get_duration_stats(self.stats_key, 'launch') if self.stats_key else None
+        if stats is None or len(stats) < adaptive_min_samples or self.startup_time is None:
+            return poll_interval
+        remaining = stats.percentile(10) - (time.monotonic() - self.startup_time)
+        return min(max(remaining / 2, poll_interval), max(max_startup_poll_interval, poll_interval))
+
+    async def _select_cluster(self):
+        """Routes the launch to a cluster of the kernelspec's pool, binding to its resource manager."""
+        cluster = await yarn_cluster_registry.select_cluster(self.yarn_cluster_pool, log=self.log)
+        if cluster is None:
+            self.log_and_raise(http_status_code=500, reason="None of the clusters in YARN cluster pool {} "
+                                                            "have been configured.".format(self.yarn_cluster_pool))
+        self._bind_cluster(cluster)
+        self.log.info("KernelID: '{}' routed to YARN cluster '{}' (headroom: {}, launch latency: {}).".
+                      format(self.kernel_id, cluster.name, cluster.get_headroom(), cluster.launch_latency))
+
+    async def _use_shared_skein_driver(self, kwargs):
+        """Directs the submitter to the shared skein driver, provided it's available.  The driver targets the
+           server's cluster, so kernels routed to a cluster of a pool are submitted using their own driver.
+        """
+        if self.yarn_cluster_pool:
+            self.log.debug("The shared skein driver is not used for kernels of a YARN cluster pool.")
+            return
+        address = await skein_driver.get_address()
+        if address:
+            kwargs['env'] = dict(kwargs.get('env') or os.environ, SKEIN_DRIVER_ADDRESS=address)
+
+    async def _place_application_master(self, env):
+        """Selects the node label on which the kernel's AM should be placed using a cached snapshot of the
+           cluster's nodes, directing the submitter to that label via the kernel's environment.
+        """
+        snapshot = get_node_snapshot(self.rm_addr)
+        if snapshot is None:
+            await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+            nodes = self._query_cluster_nodes()
+            if nodes is None:
+                return
+            snapshot = cache_node_snapshot(self.rm_addr, nodes)
+
+        memory_mb = int(env.get('KERNEL_AM_MEMORY_MB', am_memory_mb))
+        vcores = int(env.get('KERNEL_AM_VCORES', am_vcores))
+        label, score = select_node_label(snapshot, memory_mb, vcores, self.am_node_labels)
+        if label is None:
+            self.log.debug("No node can currently host the AM ({} MB, {} vcores) of KernelID: '{}', "
+                           "leaving its placement to YARN.".format(memory_mb, vcores, self.kernel_id))
+            return
+
+        self.log.debug("KernelID: '{}' AM placed on node label '{}' (free fraction: {:.2f}).".
+                       format(self.kernel_id, label, score))
+        env['KERNEL_AM_NODE_LABEL'] = label
+        if label != DEFAULT_PARTITION and self._get_submitter_type(env) == 'spark':
+            # The Spark kernelspecs (including Toree's) include KERNEL_EXTRA_SPARK_OPTS in the options given to
+            # spark-submit.
+            env['KERNEL_EXTRA_SPARK_OPTS'] = ' '.join(filter(None, [
+                env.get('KERNEL_EXTRA_SPARK_OPTS'), '--conf spark.yarn.am.nodeLabelExpression={}'.format(label)]))
+
+    def _bind_cluster(self, cluster):
+        self.yarn_cluster = cluster
+        self.resource_mgr = cluster.resource_mgr
+        self.rm_addr = self.resource_mgr.get_active_endpoint()
+        self.rm_breaker = get_circuit_breaker(self.rm_addr, log=self.log)
+        self._adjust_shutdown_wait_time()
+        shared_app_cache.watch(self.rm_addr, self.resource_mgr, self.rm_breaker, cluster.yarn_endpoint_security_enabled)
+
+    def _adjust_shutdown_wait_time(self):
+        # TODO - fix wait time - should just add member to k-m.
+        # YARN applications tend to take longer than the default 5 second wait time.  Rather than
+        # require a command-line option for those using YARN, we'll set it from the shutdown times
+        # observed on the kernel's cluster - whether longer or shorter.  Until enough have been observed,
+        # a local env that defaults to 15 seconds is used, though only if the current wait time is shorter.
+        wait_time = self._get_shutdown_budget('shutdown')
+        if self._get_shutdown_stats('shutdown') is not None or self.kernel_manager.shutdown_wait_time < wait_time:
+            self.kernel_manager.shutdown_wait_time = wait_time
+            self.log.debug("{class_name} shutdown wait time adjusted to {wait_time} seconds.".
+                           format(class_name=type(self).__name__, wait_time=self.kernel_manager.shutdown_wait_time))
+
+    def _get_shutdown_budget(self, operation):
+        """Returns the seconds to await a final state following the given operation ('shutdown' or 'kill')."""
+        stats = self._get_shutdown_stats(operation)
+        if stats is None:
+            return yarn_shutdown_wait_time if operation == 'shutdown' else max_poll_attempts * poll_interval
+        return max(stats.percentile(shutdown_budget_percentile) * shutdown_budget_factor, poll_interval)
+
+    def _get_shutdown_stats(self, operation):
+        """Returns the observed durations of the operation from which to derive its budget, or None if too few."""
+        if self.stats_key and len(get_duration_stats(self.stats_key, operation)) >= shutdown_min_samples:
+            return get_duration_stats(self.stats_key, operation)  # those of the kernelspec are more specific
+        stats = get_duration_stats(self.rm_addr, operation)
+        return stats if len(stats) >= shutdown_min_samples else None
 
     def poll(self):
         """Submitting a new kernel/app to YARN will take a while to be ACCEPTED.
         Thus application ID will probably not be available immediately for poll.
         So will regard the application as RUNNING when application ID still in ACCEPTED or SUBMITTED state.
 
+        Liveness polls have the lowest priority relative to the RM's rate limit.  When refused, or when the
+        RM is unavailable, the application's last known state is used - which never considers a kernel of
+        unknown state dead.  Applications the RM reports it doesn't know of (e.g., having been purged), on the
+        other hand, are regarded as ended.  When the host's processes share a cache of the RM's active
+        applications, the states of active applications are taken from it rather than the RM.
+
         :return: None if the application's ID is available and state is ACCEPTED/SUBMITTED/RUNNING. Otherwise False.
         """
         result = False
+        state = None
 
-        if self._get_application_id():
+        if self.suspension:  # the kernel remains available, albeit without a YARN application
+            return None
+        if self.resource_mgr is None:  # not yet routed to a cluster (or routing failed) - there's no application
+            return result
+
+        if self.application_id:
+            state = shared_app_cache.get_state(self.rm_addr, self.application_id)
+        if state is not None:
+            self.last_known_state = state
+        elif rm_rate_limiter.try_acquire(RequestPriority.POLL):
+            if not self._get_application_id():
+                return result
             state = self._query_app_state_by_id(self.application_id)
-            if state in YarnKernelLifecycleManager.initial_states:
+
+        if state is None:
+            # The request was refused, short-circuited or has failed - answer from the last known state.
+            state = self.last_known_state
+            if state is None:
                 result = None
+        if state in YarnKernelLifecycleManager.initial_states:
+            result = None
 
         # The following produces too much output (every 3 seconds by default), so commented-out at this time.
         # self.log.debug("YarnKernelLifecycleManager.poll, application ID: {}, kernel ID: {}, state: {}".
@@ -138,6 +565,8 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
         :return:
         """
         self.log.debug("YarnKernelLifecycleManager.send_signal {}".format(signum))
+        if self.suspension and signum != signal.SIGKILL:  # there's nothing to signal
+            return None
         if signum == 0:
             return self.poll()
         elif signum == signal.SIGKILL:
@@ -154,15 +583,16 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
         """
         state = None
         result = False
-        if self._get_application_id():
+        if self.suspension:  # the application has already been killed
+            self.suspension = None
+            return None
+        if not self.application_id and self.resource_mgr is not None:  # discovery by name is necessary
+            await rm_rate_limiter.acquire(RequestPriority.KILL)
+        if self.resource_mgr is not None and self._get_application_id():
+            await rm_rate_limiter.acquire(RequestPriority.KILL)
             self._kill_app_by_id(self.application_id)
             # Check that state has moved to a final state (most likely KILLED)
-            i = 1
-            state = self._query_app_state_by_id(self.application_id)
-            while state not in YarnKernelLifecycleManager.final_states and i <= max_poll_attempts:
-                await asyncio.sleep(poll_interval)
-                state = self._query_app_state_by_id(self.application_id)
-                i = i + 1
+            state = await self._await_final_state('kill')
 
             if state in YarnKernelLifecycleManager.final_states:
                 result = None
@@ -174,6 +604,179 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
                        .format(self.application_id, self.kernel_id, state, result))
         return result
 
+    async def wait(self):
+        """Waits for the application to reach a final state, e.g. following a shutdown request.  The wait
+           completes as soon as a final state is observed, or once the budget derived from the shutdown
+           times observed on the kernel's cluster has been exhausted.
+        """
+        if self.local_proc and self.local_proc.poll() is not None:
+            self.local_proc.wait()  # reap the submitter, which has exited
+
+        if self.suspension or self.resource_mgr is None:
+            return
+        if not self.application_id:  # discovery by name is necessary
+            await rm_rate_limiter.acquire(RequestPriority.KILL)
+        if not self._get_application_id():
+            return
+        state = await self._await_final_state('shutdown')
+        if state not in YarnKernelLifecycleManager.final_states:
+            self.log.warning("ApplicationID: '{}' of KernelID: '{}' has not reached a final state within {:.1f} "
+                             "seconds.  Continuing...".format(self.application_id, self.kernel_id,
+                                                              self._get_shutdown_budget('shutdown')))
+
+    async def _await_final_state(self, operation):
+        """Polls the application's state, at increasing intervals, until it's final or the operation's budget has
+           been exhausted.  The time taken to reach a final state is recorded against the kernel's cluster.
+        """
+        start_time = time.monotonic()
+        budget = self._get_shutdown_budget(operation)
+        delay = min(shutdown_poll_min, poll_interval)
+        await rm_rate_limiter.acquire(RequestPriority.KILL)
+        state = self._query_app_state_by_id(self.application_id)
+        while state not in YarnKernelLifecycleManager.final_states and not self.rm_breaker.is_open:
+            remaining = budget - (time.monotonic() - start_time)
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, poll_interval)
+            await rm_rate_limiter.acquire(RequestPriority.KILL)
+            state = self._query_app_state_by_id(self.application_id)
+
+        if state in YarnKernelLifecycleManager.final_states:
+            get_duration_stats(self.rm_addr, operation).record(time.monotonic() - start_time)
+            if self.stats_key:
+                get_duration_stats(self.stats_key, operation).record(time.monotonic() - start_time)
+        return state
+
+    async def suspend(self):
+        """Suspends the kernel, killing its YARN application to release the cluster resources it holds.
+
+        A placeholder of the kernel's metadata is retained from which `resume()` resubmits the kernel.  The kernel
+        remains alive (per `poll()`) while suspended, although its in-memory state is lost.  Kernels idle for
+        `suspend_idle_timeout` seconds are suspended, their next request resuming them (see `_relay_channels()`).
+
+        :return: The suspension record, including the reclaimed resources and the time taken to suspend.
+        """
+        if self.suspension:
+            return self.suspension
+        if self.launch_cmd is None:
+            self.log_and_raise(http_status_code=409, reason="KernelID: '{}' cannot be suspended since it was not "
+                                                            "launched by this server.".format(self.kernel_id))
+
+        start_time = time.monotonic()
+        self._suspending = asyncio.get_event_loop().create_future()
+        try:
+            lifecycle_info = self.get_lifecycle_info()
+            app = None
+            if self._get_application_id():
+                await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+                app = self._query_app_by_id(self.application_id)
+
+            if self.channel_proxy:  # hold the clients' requests until the kernel is resumed
+                await self.channel_proxy.disconnect()
+            await self.kill()
+            await self.cleanup()
+
+            self.suspension = {
+                'lifecycle_info': lifecycle_info,
+                'suspended_time': RemoteKernelLifecycleManager.get_current_time(),
+                'suspend_latency': time.monotonic() - start_time,
+                'reclaimed_memory_mb': (app or {}).get('allocatedMB', 0),
+                'reclaimed_vcores': (app or {}).get('allocatedVCores', 0),
+            }
+        finally:
+            self._suspending.set_result(None)
+            self._suspending = None
+        self.log.info("KernelID: '{}' suspended in {:.3f} seconds, releasing application '{}' ({} MB, {} vcores).".
+                      format(self.kernel_id, self.suspension['suspend_latency'], lifecycle_info.get('application_id'),
+                             self.suspension['reclaimed_memory_mb'], self.suspension['reclaimed_vcores']))
+        return self.suspension
+
+    async def resume(self):
+        """Resumes a suspended kernel by resubmitting it with the arguments of its original launch.
+
+        Concurrent callers await the same resubmission.  The kernel's new connection info is returned, to which
+        clients must reconnect - unless the kernel's channels are relayed, the relay's being unchanged.
+        """
+        if self.suspension is None:
+            return self.connection_info
+        if self._resuming is None:
+            self._resuming = asyncio.ensure_future(self._resume())
+        resuming = self._resuming
+        try:
+            return await asyncio.shield(resuming)
+        finally:
+            if resuming.done() and self._resuming is resuming:
+                self._resuming = None
+
+    async def _resume(self):
+        start_time = time.monotonic()
+        await self._relaunch()
+
+        suspension, self.suspension = self.suspension, None
+        resume_latency = time.monotonic() - start_time
+        self.log.info("KernelID: '{}' resumed as application '{}' in {:.3f} seconds after being suspended for "
+                      "{:.0f} seconds.".format(self.kernel_id, self.application_id, resume_latency,
+                                               RemoteKernelLifecycleManager.get_time_diff(
+                                                   suspension['suspended_time'])))
+        suspension.update({'resume_latency': resume_latency})
+        self.last_suspension = suspension
+        return self.connection_info
+
+    async def _relay_channels(self):
+        """Relays the kernel's channels, should idle kernels be suspended, so that its activity can be observed
+           and so that requests sent to it while suspended resume it.  Its clients connect to the relay, whose
+           connection info is unchanged by suspensions.
+        """
+        if self.suspend_idle_timeout <= 0:
+            return
+        if self.channel_proxy is None:
+            self.channel_proxy = KernelChannelProxy(local_ip, self._on_suspended_request, log=self.log)
+            self.idle_monitor = asyncio.ensure_future(self._monitor_idle_time())
+        self.connection_info = await self.channel_proxy.connect(self.connection_info)
+
+    async def _monitor_idle_time(self):
+        """Suspends the kernel once no messages have been relayed to or from it for the idle timeout."""
+        check_interval = min(poll_interval, self.suspend_idle_timeout)
+        while True:
+            remaining = self.suspend_idle_timeout - self.channel_proxy.idle_time()
+            if remaining <= 0 and self.channel_proxy.connected and not self.channel_proxy.busy:
+                self.log.info("KernelID: '{}' has been idle for {:.0f} seconds, suspending.".
+                              format(self.kernel_id, self.channel_proxy.idle_time()))
+                try:
+                    await self.suspend()
+                except Exception as e:
+                    self.log.warning("Suspension of idle KernelID '{}' failed: {}".format(self.kernel_id, e))
+            await asyncio.sleep(max(remaining, check_interval))
+
+    def _on_suspended_request(self):
+        asyncio.ensure_future(self._resume_on_request())
+
+    async def _resume_on_request(self):
+        """Resumes the kernel upon the receipt of a request while it's suspended, the relay forwarding the request
+           once the kernel has been resumed.
+        """
+        if self._suspending is not None:
+            await self._suspending
+        try:
+            await self.resume()
+        except Exception as e:
+            self.log.warning("KernelID: '{}' could not be resumed upon its request: {}".format(self.kernel_id, e))
+
+    async def _relaunch(self):
+        """Resubmits the kernel with the arguments of its last launch.  Since the response address embedded in
+           the command was closed once connection info was received, a new one is substituted.
+        """
+        self._prepare_response_socket()
+        kernel_cmd = [arg.replace(self.launch_response_address, self.kernel_manager.response_address)
+                      for arg in self.launch_cmd]
+        launch_kwargs = dict(self.launch_kwargs)
+        if launch_kwargs.get('env'):
+            launch_kwargs['env'] = dict(launch_kwargs['env'])
+
+        self.connection_info = None
+        await self.launch_process(kernel_cmd, **launch_kwargs)
+
     async def cleanup(self):
         """"""
         # we might have a defunct process (if using waitAppCompletion = false) - so poll, kill, wait when we have
@@ -186,8 +789,21 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
             await super(YarnKernelLifecycleManager, self).wait()
             self.local_proc = None
 
-        # reset application id to force new query - handles kernel restarts/interrupts
+        if self.submitter_output:
+            self.submitter_output.close()
+            self.submitter_output = None
+
+        if self._suspending is None:  # the kernel has been shut down
+            unregister_lifecycle_manager(self)
+            if self.channel_proxy:
+                self.idle_monitor.cancel()
+                await self.channel_proxy.close()
+                self.channel_proxy = self.idle_monitor = None
+
+        # reset application id (and its host) to force new query - handles kernel restarts/interrupts
         self.application_id = None
+        self.last_known_state = None
+        self.assigned_host = ''
 
         # for cleanup, we should call the superclass last
         await super(YarnKernelLifecycleManager, self).cleanup()
@@ -196,30 +812,362 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
         """ Confirms the yarn application is in a started state before returning.  Should post-RUNNING states be
             unexpectedly encountered (FINISHED, KILLED) then we must throw, otherwise the rest of the server will
             believe its talking to a valid kernel.
+
+            Application discovery, state monitoring and the reception of the connection info are performed as
+            concurrent tasks so that the kernel is considered started the moment its connection info arrives.
+            Should the launch timeout be exceeded first, the tasks are cancelled and the kernel killed.
         """
         self.start_time = RemoteKernelLifecycleManager.get_current_time()
+        self.startup_time = time.monotonic()
+        self.running_observed = False
+        self.deferred_connect_info = None
+        discovery = asyncio.ensure_future(self._discover_application())
+        monitor = asyncio.ensure_future(self._monitor_application_state(discovery))
+        listener = asyncio.ensure_future(self._listen_for_connection_info(discovery))
+        hedger = None
+        if (self.hedge_queue or self.hedge_cluster) and self.launch_cmd:
+            hedger = asyncio.ensure_future(self._hedge_launch(discovery))
+        try:
+            # The listener completes once connection info has been received, while the monitor only
+            # completes by raising - either due to a launch failure or a final state.  The hedger completes
+            # once its submission has been adopted or is no longer in contention.
+            pending = {monitor, listener, hedger} - {None}
+            while True:
+                done, pending = await asyncio.wait(pending, timeout=max(self._get_launch_time_remaining(), 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if hedger in done:
+                    done.discard(hedger)
+                    if hedger.result():  # the hedge was adopted, monitor it and await its connection info
+                        for task in pending:
+                            task.cancel()
+                        await asyncio.wait(pending)
+                        await self._discard_submission(self.competing_submission)
+                        monitor = asyncio.ensure_future(self._monitor_application_state(discovery))
+                        listener = asyncio.ensure_future(self._listen_for_connection_info(discovery))
+                        pending = {monitor, listener}
+                        continue
+                if done:
+                    break
+                if self._get_launch_time_remaining() <= 0:
+                    running = {task for task in pending | {discovery} if not task.done()}
+                    for task in running:
+                        task.cancel()
+                    if running:
+                        await asyncio.wait(running)
+                    await self._raise_launch_timeout()
+            for task in done:
+                task.result()
+        finally:
+            for task in (listener, monitor, discovery, hedger):
+                if task and not task.done():
+                    task.cancel()
+                elif task and not task.cancelled():
+                    task.exception()  # retrieved, since tasks completing together can each have failed
+            if self.competing_submission:
+                await self._discard_submission(self.competing_submission)
+
+        self.log.debug("Connection info received for KernelID: '{}', ApplicationID: '{}', Host: '{}', {} seconds "
+                       "after starting.".format(self.kernel_id, self.application_id, self.assigned_host,
+                                                RemoteKernelLifecycleManager.get_time_diff(self.start_time)))
+        await self._relay_channels()
+
+    async def _discover_application(self):
+        """Obtains the application ID, checking for launch failures of the local process until it's available."""
+        while True:
+            if not self._awaiting_submitter_output():
+                await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+            if self._get_application_id(True):
+                break
+            self.detect_launch_failure()
+            await self._await_startup_poll(wakeup=self.submitter_output.reported if self.submitter_output else None)
+        return self.application_id
+
+    async def _monitor_application_state(self, discovery):
+        """Once discovered, monitors the application's state and obtains its assigned host.  Should a final
+           state be encountered prior to the receipt of connection info, an exception is raised.
+        """
+        await discovery
         i = 0
-        ready_to_connect = False  # we're ready to connect when we have a connection file to use
-        while not ready_to_connect:
+        while True:
             i += 1
-            await self.handle_timeout()
+            await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+            app_state = self._get_application_state()
+            if app_state == 'RUNNING' and not self.running_observed:
+                self.running_observed = True
+                get_duration_stats(self.rm_addr, 'running').record(time.monotonic() - self.startup_time)
 
-            if self._get_application_id(True):
-                # Once we have an application ID, start monitoring state, obtain assigned host and get connection info
-                app_state = self._get_application_state()
+            # FAILED is terminal during startup, while not regarded as final elsewhere.
+            if app_state in YarnKernelLifecycleManager.final_states or app_state == 'FAILED':
+                self._raise_startup_failure(app_state)
+
+            self.log.debug("{}: State: '{}', Host: '{}', KernelID: '{}', ApplicationID: '{}'".
+                           format(i, app_state, self.assigned_host, self.kernel_id, self.application_id))
+            await self._await_startup_poll()
+
+    def _raise_startup_failure(self, app_state):
+        """Raises the error of an application found in a terminal state during startup, describing its likely cause
+           from the diagnostics obtained along with its state.
+        """
+        http_status_code, cause = classify_failure(self.diagnostics)
+        error_message = "KernelID: '{}', ApplicationID: '{}' unexpectedly found in state '{}' during kernel startup!".\
+            format(self.kernel_id, self.application_id, app_state)
+        if cause:
+            error_message += "  {}.".format(cause)
+        if self.diagnostics:
+            error_message += "  Diagnostics: {}".format(self.diagnostics.strip())
+        self.log_and_raise(http_status_code=http_status_code, reason=error_message)
+
+    async def _hedge_launch(self, discovery):
+        """Hedges a launch that has not reached RUNNING within the time expected on its cluster by submitting the
+           kernel again, to the alternate queue and/or cluster.  Whichever submission reaches RUNNING first is
+           adopted, the other being killed.
+
+        :return: True once the hedge has been adopted (the original submission being left to the caller to discard)
+                 or False should the original submission reach RUNNING first or the hedge fail.
+        """
+        await discovery
+        delay = self._get_hedge_delay()
+        while self.last_known_state != 'RUNNING':
+            remaining = delay - (time.monotonic() - self.startup_time)
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, poll_interval))
+        if self.last_known_state == 'RUNNING':
+            return False
+
+        hedge = self._submit_hedge(delay)
+        if hedge is None:
+            return False
+        while True:
+            await asyncio.sleep(poll_interval)
+            if self.last_known_state == 'RUNNING':
+                self.log.info("ApplicationID: '{}' of KernelID: '{}' reached RUNNING ahead of its hedge '{}'.".
+                              format(self.application_id, self.kernel_id, hedge.application_id))
+                await self._discard_submission(hedge)
+                return False
+
+            exit_code = hedge.local_proc.poll()
+            if not hedge.application_id:
+                hedge.application_id = hedge.submitter_output.application_id
+            if (exit_code and exit_code > 0) or (not hedge.application_id and hedge.submitter_output.reported.done()):
+                self.log.warning("Hedged launch of KernelID: '{}' failed (exit code: {}).  Submitter output:\n{}".
+                                 format(self.kernel_id, exit_code, hedge.submitter_output.get_tail()))
+                await self._discard_submission(hedge)
+                return False
+            if not hedge.application_id:
+                continue
+
+            await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+            hedge.state = self._query_submission_state(hedge)
+            if hedge.state in YarnKernelLifecycleManager.final_states or hedge.state == 'FAILED':
+                self.log.warning("Hedge '{}' of KernelID: '{}' found in state '{}'.".
+                                 format(hedge.application_id, self.kernel_id, hedge.state))
+                await self._discard_submission(hedge)
+                return False
+            if hedge.state == 'RUNNING':
+                self._adopt_submission(hedge)
+                return True
+
+    def _get_submitter_type(self, env):
+        """Returns 'spark' or 'dask' per the kernel's submitter - as named by its launch description, otherwise
+           by the options its kernelspec conveys to run.sh (e.g., Toree's __TOREE_SPARK_OPTS__) - or None.
+        """
+        argv = list((self.launch_description or {}).get('argv', []))
+        while argv:
+            item = argv.pop()
+            if isinstance(item, dict):
+                argv.extend(item.get('then', []) + item.get('else', []))
+            elif os.path.basename(item) == 'spark-submit':
+                return 'spark'
+            elif os.path.basename(item) in ('dask-yarn', 'dask_submit.py'):
+                return 'dask'
+
+        names = set(self._get_kernelspec_env()) | set(env)
+        if names & {'SPARK_OPTS', '__TOREE_SPARK_OPTS__'}:
+            return 'spark'
+        if 'DASK_OPTS' in names:
+            return 'dask'
+        return None
 
-                if app_state in YarnKernelLifecycleManager.final_states:
-                    error_message = "KernelID: '{}', ApplicationID: '{}' unexpectedly found in state '{}'" \
-                                    " during kernel startup!".format(self.kernel_id, self.application_id, app_state)
-                    self.log_and_raise(http_status_code=500, reason=error_message)
+    def _get_kernelspec_env(self):
+        env = getattr(self.kernel_manager.kernel_spec, 'env', None)
+        return env if isinstance(env, dict) else {}
 
-                self.log.debug("{}: State: '{}', Host: '{}', KernelID: '{}', ApplicationID: '{}'".
-                               format(i, app_state, self.assigned_host, self.kernel_id, self.application_id))
+    def _get_hedge_delay(self):
+        """Returns the seconds after which a launch not yet RUNNING is hedged."""
+        stats = get_duration_stats(self.rm_addr, 'running')
+        if len(stats) < hedge_min_samples:
+            return hedge_delay
+        return stats.percentile(hedge_percentile)
 
-                if self.assigned_host != '':
-                    ready_to_connect = await self.receive_connection_info()
+    def _submit_hedge(self, delay):
+        """Submits the kernel to the alternate queue and/or cluster, with a response socket of its own."""
+        resource_mgr, rm_breaker, cluster = self.resource_mgr, self.rm_breaker, None
+        env = dict(self.submission_kwargs.get('env') or os.environ)
+        if self.hedge_cluster:
+            cluster = yarn_cluster_registry.get_cluster(self.hedge_cluster)
+            if cluster is None:
+                self.log.warning("Launch of KernelID: '{}' not hedged since YARN cluster '{}' has not been "
+                                 "configured.".format(self.kernel_id, self.hedge_cluster))
+                return None
+            resource_mgr = cluster.resource_mgr
+            rm_breaker = get_circuit_breaker(resource_mgr.get_active_endpoint(), log=self.log)
+            env.update(cluster.env)
+            # Revert those settings that target the original cluster's skein driver and partitions.
+            original_env = self.launch_kwargs.get('env') or {}
+            for name in ('SKEIN_DRIVER_ADDRESS', 'KERNEL_AM_NODE_LABEL', 'KERNEL_EXTRA_SPARK_OPTS'):
+                if name in original_env:
+                    env[name] = original_env[name]
+                else:
+                    env.pop(name, None)
+        if self.hedge_queue:
+            # The queue is conveyed via the submitter's options, which only the Spark and Dask kernelspecs expose.
+            submitter = self._get_submitter_type(env)
+            if submitter == 'spark':
+                env['KERNEL_EXTRA_SPARK_OPTS'] = ' '.join(filter(None, [
+                    env.get('KERNEL_EXTRA_SPARK_OPTS'), '--queue {}'.format(self.hedge_queue)]))
+            elif submitter == 'dask':
+                dask_opts = env.get('DASK_OPTS') or self._get_kernelspec_env().get('DASK_OPTS', '')
+                env['DASK_OPTS'] = '{} --queue {}'.format(dask_opts, self.hedge_queue)
             else:
-                self.detect_launch_failure()
+                self.log.warning("Launch of KernelID: '{}' not hedged since its submitter's queue cannot be set to "
+                                 "'{}'.".format(self.kernel_id, self.hedge_queue))
+                return None
+            env['KERNEL_QUEUE'] = self.hedge_queue
+
+        # The hedge's launcher responds on a socket of its own so its connection info can't be taken for that
+        # of the original submission.
+        response_socket, response_address = self.response_socket, self.kernel_manager.response_address
+        self._prepare_response_socket()
+        hedge_socket, hedge_address = self.response_socket, self.kernel_manager.response_address
+        self.response_socket, self.kernel_manager.response_address = response_socket, response_address
+
+        kernel_cmd = self._get_submit_cmd([arg.replace(response_address, hedge_address) for arg in self.launch_cmd],
+                                          env)
+        kwargs = dict(self.submission_kwargs, env=env, stdout=PIPE, stderr=STDOUT)
+        local_proc = launch_kernel(kernel_cmd, **kwargs)
+        hedge = Submission(local_proc, SubmitterOutputReader(local_proc.stdout, self.log, self.kernel_id),
+                           hedge_socket, hedge_address, resource_mgr, rm_breaker, yarn_cluster=cluster)
+        self.competing_submission = hedge
+        self.log.info("ApplicationID: '{}' of KernelID: '{}' not RUNNING after {:.1f} seconds, hedging its launch "
+                      "(queue: {}, cluster: {}, pid: {}).".format(self.application_id, self.kernel_id, delay,
+                                                                  self.hedge_queue, self.hedge_cluster,
+                                                                  local_proc.pid))
+        return hedge
+
+    def _adopt_submission(self, hedge):
+        """Adopts the hedge, retaining the original submission as the competing submission to be discarded."""
+        self.log.info("Hedge '{}' of KernelID: '{}' reached RUNNING ahead of ApplicationID: '{}', adopting it.".
+                      format(hedge.application_id, self.kernel_id, self.application_id))
+        # The original submission has taken at least this long to reach RUNNING.
+        get_duration_stats(self.rm_addr, 'running').record(time.monotonic() - self.startup_time)
+        self.running_observed = True
+
+        self.competing_submission = Submission(self.local_proc, self.submitter_output, self.response_socket,
+                                               self.kernel_manager.response_address, self.resource_mgr,
+                                               self.rm_breaker, application_id=self.application_id)
+        self.local_proc = hedge.local_proc
+        self.pid = hedge.local_proc.pid
+        self.submitter_output = hedge.submitter_output
+        self.response_socket = hedge.response_socket
+        self.kernel_manager.response_address = hedge.response_address
+        if hedge.yarn_cluster:
+            self._bind_cluster(hedge.yarn_cluster)
+        self.application_id = hedge.application_id
+        self.last_known_state = hedge.state
+        self.assigned_host = ''
+        self.assigned_ip = None
+
+    async def _discard_submission(self, submission):
+        """Kills the application of a submission that's no longer in contention and releases its local resources."""
+        if submission is self.competing_submission:
+            self.competing_submission = None
+        if submission.application_id:
+            await rm_rate_limiter.acquire(RequestPriority.KILL)
+            if submission.rm_breaker.allow_request():
+                try:
+                    submission.resource_mgr.cluster_application_kill(application_id=submission.application_id)
+                    submission.rm_breaker.record_success()
+                except Exception as e:
+                    self._record_rm_failure(e, breaker=submission.rm_breaker)
+                    self.log.warning("Termination of application '{}' failed with exception: '{}'.  Continuing...".
+                                     format(submission.application_id, e))
+        if submission.local_proc:
+            if submission.local_proc.poll() is None:
+                submission.local_proc.kill()
+            submission.local_proc.wait()
+        if submission.submitter_output:
+            submission.submitter_output.close()
+        if submission.response_socket:
+            submission.response_socket.close()
+
+    async def _listen_for_connection_info(self, discovery=None):
+        """Awaits the connection info sent by the remote launcher without blocking the other startup tasks.  The
+           kernel is only considered started once its application and AM host are also known.
+        """
+        # The response socket's timeout would block the event loop within accept(), so wait for the
+        # launcher's connection to be pending before letting the superclass receive the payload.
+        loop = asyncio.get_event_loop()
+        ready_to_connect = False
+        self.defer_connection_setup = True
+        try:
+            while not ready_to_connect:
+                if self.response_socket:
+                    pending = loop.create_future()
+                    fd = self.response_socket.fileno()
+                    loop.add_reader(fd, lambda: pending.done() or pending.set_result(True))
+                    try:
+                        await pending
+                    finally:
+                        loop.remove_reader(fd)
+                if not self.assigned_ip:  # setup of the connection info will need to query the AM host
+                    await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+                ready_to_connect = await self.receive_connection_info()
+        finally:
+            self.defer_connection_setup = False
+
+        if self.deferred_connect_info is not None:
+            await self._await_assigned_host(discovery)
+            connect_info, self.deferred_connect_info = self.deferred_connect_info, None
+            super(YarnKernelLifecycleManager, self)._setup_connection_info(connect_info)
+        return ready_to_connect
+
+    async def _await_assigned_host(self, discovery=None):
+        """Awaits the application's discovery and AM host, should connection info have arrived ahead of them
+           (e.g., while the submitter's output is awaited or the RM is unavailable).  Should they not be known
+           within the launch timeout, the startup is timed out by `confirm_remote_startup()`.
+        """
+        if discovery is not None:
+            await asyncio.shield(discovery)
+        while not self.assigned_ip:
+            await self._await_startup_poll()
+            await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+            if self._get_application_id(True):
+                self._get_application_state()
+
+    def _setup_connection_info(self, connect_info):
+        """Ensures the assigned host is known prior to setting up the connection info.  Because connection
+           info is received concurrently with state monitoring, it can arrive before the AM host was obtained,
+           in which case its setup is deferred until the host is known.
+        """
+        if not self.assigned_ip and self._get_application_id(True):
+            self._get_application_state()
+        if not self.assigned_ip and self.defer_connection_setup:
+            self.deferred_connect_info = connect_info
+            return
+        super(YarnKernelLifecycleManager, self)._setup_connection_info(connect_info)
+
+    def detect_launch_failure(self):
+        """Includes the tail of the submitter's output in the error raised when the local process has failed."""
+        if self.local_proc and self.submitter_output:
+            poll_result = self.local_proc.poll()
+            if poll_result and poll_result > 0:
+                self.local_proc.wait()
+                self.local_proc = None
+                error_message = "Error occurred during launch of KernelID: {} (exit code: {}).  Submitter output:\n{}".\
+                    format(self.kernel_id, poll_result, self.submitter_output.get_tail())
+                self.log_and_raise(http_status_code=500, reason=error_message)
+        super(YarnKernelLifecycleManager, self).detect_launch_failure()
 
     def _get_application_state(self):
         # Gets the current application state using the application_id already obtained.  Once the assigned host
@@ -230,39 +1178,66 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
         if app:
             if app.get('state'):
                 app_state = app.get('state')
+                self.last_known_state = app_state
+            self.diagnostics = app.get('diagnostics') or None
             if self.assigned_host == '' and app.get('amHostHttpAddress'):
                 self.assigned_host = app.get('amHostHttpAddress').split(':')[0]
                 # Set the kernel manager ip to the actual host where the application landed.
                 self.assigned_ip = socket.gethostbyname(self.assigned_host)
         return app_state
 
-    async def handle_timeout(self):
-        """Checks to see if the kernel launch timeout has been exceeded while awaiting connection info."""
-        await asyncio.sleep(poll_interval)
-        time_interval = RemoteKernelLifecycleManager.get_time_diff(self.start_time)
+    async def handle_timeout(self, wakeup=None):
+        """Checks to see if the kernel launch timeout has been exceeded while awaiting connection info.
+           If a `wakeup` future is provided, the poll interval is cut short should it complete.
+        """
+        await self._await_startup_poll(wakeup)
+        if self._get_launch_time_remaining() <= 0:
+            await self._raise_launch_timeout()
 
-        if time_interval > self.kernel_launch_timeout:
-            reason = "Application ID is None. Failed to submit a new application to YARN within {} seconds.  " \
-                     "Check server log for more information.". \
-                format(self.kernel_launch_timeout)
-            error_http_code = 500
-            if self._get_application_id(True):
-                if self._query_app_state_by_id(self.application_id) != "RUNNING":
-                    reason = "YARN resources unavailable after {} seconds for app {}, launch timeout: {}!  "\
-                        "Check YARN configuration.".format(time_interval, self.application_id,
-                                                           self.kernel_launch_timeout)
-                    error_http_code = 503
-                else:
-                    reason = "App {} is RUNNING, but waited too long ({} secs) to get connection file.  " \
-                        "Check YARN logs for more information.".format(self.application_id, self.kernel_launch_timeout)
-            await self.kill()
-            timeout_message = "KernelID: '{}' launch timeout due to: {}".format(self.kernel_id, reason)
-            self.log_and_raise(http_status_code=error_http_code, reason=timeout_message)
+    async def _await_startup_poll(self, wakeup=None):
+        """Awaits the startup poll interval, cut short should a `wakeup` future be provided and complete."""
+        interval = self._get_startup_poll_interval()
+        if wakeup is not None and not wakeup.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(wakeup), interval)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(interval)
+
+    def _get_launch_time_remaining(self):
+        return self.kernel_launch_timeout - (time.monotonic() - self.startup_time)
+
+    async def _raise_launch_timeout(self):
+        """Kills the kernel whose launch has timed out, raising the error describing the likely cause."""
+        time_interval = round(time.monotonic() - self.startup_time, 3)
+        reason = "Application ID is None. Failed to submit a new application to YARN within {} seconds.  " \
+                 "Check server log for more information.". \
+            format(self.kernel_launch_timeout)
+        error_http_code = 500
+        await rm_rate_limiter.acquire(RequestPriority.DISCOVERY)
+        if self._get_application_id(True):
+            if self._query_app_state_by_id(self.application_id) != "RUNNING":
+                reason = "YARN resources unavailable after {} seconds for app {}, launch timeout: {}!  "\
+                    "Check YARN configuration.".format(time_interval, self.application_id,
+                                                       self.kernel_launch_timeout)
+                error_http_code = 503
+            else:
+                reason = "App {} is RUNNING, but waited too long ({} secs) to get connection file.  " \
+                    "Check YARN logs for more information.".format(self.application_id, self.kernel_launch_timeout)
+        await self.kill()
+        timeout_message = "KernelID: '{}' launch timeout due to: {}".format(self.kernel_id, reason)
+        self.log_and_raise(http_status_code=error_http_code, reason=timeout_message)
 
     def _get_application_id(self, ignore_final_states=False):
         # Return the kernel's YARN application ID if available, otherwise None.  If we're obtaining application_id
         # from scratch, do not consider kernels in final states.
-        if not self.application_id:
+        if not self.application_id and self.submitter_output and self.submitter_output.application_id:
+            self.application_id = self.submitter_output.application_id
+            time_interval = RemoteKernelLifecycleManager.get_time_diff(self.start_time)
+            self.log.info("ApplicationID: '{}' assigned for KernelID: '{}' from submitter output, {} seconds after "
+                          "starting.".format(self.application_id, self.kernel_id, time_interval))
+        if not self.application_id and not self._awaiting_submitter_output():
             app = self._query_app_by_name(self.kernel_id)
             state_condition = True
             if type(app) is dict and ignore_final_states:
@@ -277,16 +1252,32 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
                 self.log.debug("ApplicationID not yet assigned for KernelID: '{}' - retrying...".format(self.kernel_id))
         return self.application_id
 
+    def _awaiting_submitter_output(self):
+        # The RM is only searched by name once the submitter's output has ended without an application ID,
+        # or it has failed to report one within the expected time.
+        return self.submitter_output is not None and not self.submitter_output.reported.done() and \
+            RemoteKernelLifecycleManager.get_time_diff(self.start_time) < submitter_id_timeout
+
     def get_lifecycle_info(self):
         """Captures the base information necessary for kernel persistence relative to YARN clusters."""
         lifecycle_info = super(YarnKernelLifecycleManager, self).get_lifecycle_info()
         lifecycle_info.update({'application_id': self.application_id})
+        if self.yarn_cluster:
+            lifecycle_info.update({'yarn_cluster': self.yarn_cluster.name})
         return lifecycle_info
 
     def load_lifecycle_info(self, lifecycle_info):
         """Loads the base information necessary for kernel persistence relative to YARN clusters."""
         super(YarnKernelLifecycleManager, self).load_lifecycle_info(lifecycle_info)
         self.application_id = lifecycle_info['application_id']
+        if self.yarn_cluster_pool:
+            # Kernels persisted prior to their cluster being recorded are assumed to reside on the pool's first.
+            cluster_name = lifecycle_info.get('yarn_cluster', self.yarn_cluster_pool[0])
+            cluster = yarn_cluster_registry.get_cluster(cluster_name)
+            if cluster is None:
+                self.log_and_raise(http_status_code=500, reason="YARN cluster '{}' of KernelID: '{}' has not been "
+                                                                "configured.".format(cluster_name, self.kernel_id))
+            self._bind_cluster(cluster)
 
     def _query_app_by_name(self, kernel_id):
         """Retrieve application by using kernel_id as the unique app name.
@@ -295,16 +1286,25 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
         Note: if a kernel restarts with the same kernel id as app name, multiple applications will be returned.
         For now, the app/kernel with the top most application ID will be returned as the target app, assuming the app
         ID will be incremented automatically on the YARN side.
+        The response is parsed as it streams in, retaining only the id, name and state of each application.
 
         :param kernel_id: as the unique app name for query
-        :return: The JSON object of an application.
+        :return: The JSON object of an application (containing its id, name and state).
         """
         top_most_app_id = ''
         target_app = None
-        data = None
+        if not self._allow_rm_request():
+            return target_app
         try:
-            data = self.resource_mgr.cluster_applications(started_time_begin=str(self.start_time)).data
+            for app in stream_applications(self.resource_mgr, startedTimeBegin=str(self.start_time),
+                                           deSelects='resourceRequests'):
+                if (app.get('name') or '').find(kernel_id) >= 0 and app.get('id') > top_most_app_id:
+                    target_app = app
+                    top_most_app_id = app.get('id')
+            self.rm_breaker.record_success()
         except socket.error as sock_err:
+            target_app = None
+            self._record_rm_failure(sock_err)
             if sock_err.errno == errno.ECONNREFUSED:
                 self.log.warning("YARN RM address: '{}' refused the connection.  Is the resource manager running?".
                                  format(self.rm_addr))
@@ -312,28 +1312,29 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
                 self.log.warning("Query for kernel ID '{}' failed with exception: {} - '{}'.  Continuing...".
                                  format(kernel_id, type(sock_err), sock_err))
         except Exception as e:
+            target_app = None
+            self._record_rm_failure(e)
             self.log.warning("Query for kernel ID '{}' failed with exception: {} - '{}'.  Continuing...".
                              format(kernel_id, type(e), e))
-
-        if type(data) is dict and type(data.get("apps")) is dict and 'app' in data.get("apps"):
-            for app in data['apps']['app']:
-                if app.get('name', '').find(kernel_id) >= 0 and app.get('id') > top_most_app_id:
-                    target_app = app
-                    top_most_app_id = app.get('id')
         return target_app
 
     def _query_app_by_id(self, app_id):
         """Retrieve an application by application ID.
 
         :param app_id
-        :return: The JSON object of an application.
+        :return: The JSON object of an application - only its ID and pseudo-state should the RM not know of it.
         """
         data = None
+        if not self._allow_rm_request():
+            return None
         try:
             data = self.resource_mgr.cluster_application(application_id=app_id).data
+            self.rm_breaker.record_success()
         except Exception as e:
-            self.log.warning("Query for application ID '{}' failed with exception: '{}'.  Continuing...".
-                             format(app_id, e))
+            self._record_rm_failure(e)
+            state = self._get_unknown_app_state(app_id, e)
+            if state:
+                data = {'app': {'id': app_id, 'state': state}}
         if type(data) is dict and 'app' in data:
             return data['app']
         return None
@@ -342,16 +1343,63 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
         """Return the state of an application.
 
         :param app_id:
-        :return:
+        :return: The application's state or None if it could not be determined.
         """
-        response = None
+        state = None
+        if not self._allow_rm_request():
+            return state
         try:
-            response = self.resource_mgr.cluster_application_state(application_id=app_id)
+            state = self.resource_mgr.cluster_application_state(application_id=app_id).data.get('state')
+            self.rm_breaker.record_success()
         except Exception as e:
-            self.log.warning("Query for application '{}' state failed with exception: '{}'.  Continuing...".
-                             format(app_id, e))
+            self._record_rm_failure(e)
+            state = self._get_unknown_app_state(app_id, e)
 
-        return response.data['state']
+        if state and app_id == self.application_id:
+            self.last_known_state = state
+        return state
+
+    def _query_submission_state(self, submission):
+        """Return the state of a competing submission's application, or None if it could not be determined."""
+        state = None
+        if not submission.rm_breaker.allow_request():
+            return state
+        try:
+            state = submission.resource_mgr.cluster_application_state(
+                application_id=submission.application_id).data.get('state')
+            submission.rm_breaker.record_success()
+        except Exception as e:
+            self._record_rm_failure(e, breaker=submission.rm_breaker)
+            state = self._get_unknown_app_state(submission.application_id, e)
+        return state
+
+    def _get_unknown_app_state(self, app_id, e):
+        """Returns the pseudo-state of an application whose query failed because the RM doesn't know of it,
+           or None (its state being undetermined) should the query have failed otherwise.
+        """
+        if isinstance(e, APIError) and unknown_app_pattern.search(str(e)):
+            self.log.warning("Application '{}' is unknown to the RM, regarding it as ended: '{}'".format(app_id, e))
+            return YarnKernelLifecycleManager.unknown_state
+        self.log.warning("Query for application '{}' state failed with exception: '{}'.  Continuing...".
+                         format(app_id, e))
+        return None
+
+    def _query_cluster_nodes(self):
+        """Retrieve the cluster's RUNNING nodes.
+
+        :return: The list of node JSON objects or None if they could not be retrieved.
+        """
+        nodes = None
+        if not self._allow_rm_request():
+            return nodes
+        try:
+            data = self.resource_mgr.cluster_nodes(states=['RUNNING']).data
+            nodes = ((data or {}).get('nodes') or {}).get('node') or []
+            self.rm_breaker.record_success()
+        except Exception as e:
+            self._record_rm_failure(e)
+            self.log.warning("Query for cluster nodes failed with exception: '{}'.  Continuing...".format(e))
+        return nodes
 
     def _kill_app_by_id(self, app_id):
         """Kill an application. If the app's state is FINISHED or FAILED, it won't be changed to KILLED.
@@ -361,10 +1409,24 @@ class YarnKernelLifecycleManager(RemoteKernelLifecycleManager):
         """
 
         response = None
+        if not self._allow_rm_request():
+            return response
         try:
             response = self.resource_mgr.cluster_application_kill(application_id=app_id)
+            self.rm_breaker.record_success()
         except Exception as e:
+            self._record_rm_failure(e)
             self.log.warning("Termination of application '{}' failed with exception: '{}'.  Continuing...".
                              format(app_id, e))
 
         return response
+
+    def _allow_rm_request(self):
+        """Returns True if a request may be issued to the kernel's RM - there being none until a kernel of a
+           cluster pool has been routed to one of its clusters.
+        """
+        return self.resource_mgr is not None and self.rm_breaker.allow_request()
+
+    def _record_rm_failure(self, e, breaker=None):
+        """Reports a failed request to the RM's circuit breaker (see `record_rm_failure()`)."""
+        record_rm_failure(breaker or self.rm_breaker, e)